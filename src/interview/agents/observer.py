@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-import re
 from dataclasses import dataclass
 from typing import Optional, Literal, Any, List
 
 from ..core.prompts import OBSERVER_SYSTEM, OBSERVER_USER_TEMPLATE
-from ..core.utils import safe_json, one_sentence, one_question
+from ..core.utils import one_sentence, one_question
+from ..core.structured import parse_structured
+from ..llm.base import LLMUnavailable
+from ..llm.budget import BudgetedLLM
+from ..core.deadline import call_with_deadline
+from ..core.conversation import ask
+from ..core.analysis import AnalyzedMessage, analyze_message
 from ..core.prompts import OBSERVER_SYSTEM, OBSERVER_USER_TEMPLATE, VERIFIER_SYSTEM, VERIFIER_USER_TEMPLATE
+from ..core.prompts import OBSERVER_TURN_TEMPLATE, VERIFIER_TURN_TEMPLATE, VERIFIER_REFERENCE_TEMPLATE
 
 Kind = Literal[
     "STRONG", "NORMAL", "WEAK",
@@ -30,66 +36,52 @@ class ObserverResult:
 
 
 
-
-_STOP_WORDS = {
-    "и", "в", "на", "что", "это", "как", "чем", "когда", "где", "почему",
-    "the", "a", "an", "to", "in", "on", "and", "or", "of", "for",
-}
-
-def _normalize(text: str) -> str:
-    t = (text or "").lower().strip()
-    t = re.sub(r"\s+", " ", t)
-    return t
-
-def _tokens(text: str) -> List[str]:
-    t = _normalize(text)
-    t = re.sub(r"[^a-zа-я0-9_+\s-]", " ", t)
-    parts = []
-    for p in t.split():
-        p = p.strip("-_+")
-        if len(p) >= 3 and p not in _STOP_WORDS:
-            parts.append(p)
-    return parts
-
-def _keywords(text: str) -> set[str]:
-    return set(_tokens(text))
-
-
-def _looks_like_gibberish(text: str) -> bool:
-    s = (text or "").strip()
-    if not s:
-        return True
-    if len(s) <= 2:
-        return True
-    alpha = sum(ch.isalpha() for ch in s)
-    if alpha == 0:
-        return True
-    if alpha / max(1, len(s)) < 0.30:
-        return True
-    if s.startswith("/") and not re.match(r"^/(stop|help)\b", s.lower()):
-        return True
-    return False
-
-def _looks_relevant(answer: str, last_question: str) -> bool:
-
-    if not answer or not last_question:
-        return False
-    a = _keywords(answer)
-    q = _keywords(last_question)
-    if not a or not q:
-        return False
-    return len(a.intersection(q)) >= 1
+# правила разбора реплики живут в core/analysis.py (AnalyzedMessage)
 
 def _bridge_back(last_question: Optional[str]) -> str:
     if last_question:
         return f"Понял(а), давай вернёмся к интервью: {last_question}"
     return "Понял(а), давай вернёмся к интервью и продолжим."
 
-def _contains_word(text: str, word: str) -> bool:
-    """
-    Match by word boundary (RU+EN). Avoid substring false positives.
-    """
-    return re.search(rf"(^|[^a-zа-я0-9_]){re.escape(word)}([^a-zа-я0-9_]|$)", text) is not None
+_VERDICT_KINDS = {
+    "STRONG", "NORMAL", "WEAK",
+    "OFFTOPIC", "HALLUCINATION",
+    "ROLE_REVERSAL", "REFUSAL",
+}
+
+
+def _result_from_kind(
+    kind: str,
+    mem,
+    reason: str,
+    instruction: str,
+    need_followup: bool = False,
+    followup: Optional[str] = None,
+    fact: Optional[str] = None,
+    bridge: Optional[str] = None,
+) -> ObserverResult:
+    if kind in {"OFFTOPIC", "HALLUCINATION"} and not bridge:
+        bridge = one_sentence(_bridge_back(mem.last_question))
+
+    if kind == "STRONG":
+        diff = "UP"
+    elif kind in {"WEAK", "OFFTOPIC", "HALLUCINATION", "REFUSAL"}:
+        diff = "DOWN"
+    else:
+        diff = "SAME"
+
+    return ObserverResult(
+        kind=kind,
+        reason=reason,
+        instruction=instruction,
+        difficulty_action=diff,
+        topic_hint=mem.last_topic,
+        need_followup=need_followup,
+        followup_question=followup,
+        fact_check_notes=fact,
+        return_to_topic_text=bridge,
+        expected_answer_short=None,
+    )
 
 
 class ObserverAgent:
@@ -112,12 +104,73 @@ class ObserverAgent:
         "не знаю", "не уверен", "затрудняюсь", "не помню", "сложно сказать",
     ]
 
-    def __init__(self, llm: Any):
+    def __init__(
+        self,
+        llm: Any,
+        classifier: Any = None,
+        classifier_min_confidence: float = 0.9,
+        verifier_batcher: Any = None,
+        verifier_min_confidence: int = 70,
+        relevance_min_overlap: int = 1,
+        use_verifier: bool = True,
+        use_observer_llm: bool = True,
+        knowledge: Any = None,
+        knowledge_top_k: int = 3,
+        references: Any = None,
+    ):
         self.llm = llm
-    def _verify_with_llm(self, text: str, mem) -> Optional[dict]:
+        self.verifier_batcher = verifier_batcher
+        self.classifier = classifier
+        self.classifier_min_confidence = classifier_min_confidence
+        # рабочая точка каскада (см. interview.tools.eval_observer)
+        self.verifier_min_confidence = verifier_min_confidence
+        self.relevance_min_overlap = relevance_min_overlap
+        self.use_verifier = use_verifier
+        self.use_observer_llm = use_observer_llm
+        # локальная база знаний (core.knowledge.KnowledgeIndex): ложные утверждения и справки для Verifier
+        self.knowledge = knowledge
+        self.knowledge_top_k = knowledge_top_k
+        # эталонные ответы на вопросы банка (core.references.ReferenceStore)
+        self.references = references
+
+    def _classify_locally(self, text: str, mem) -> Optional[ObserverResult]:
+        if not self.classifier:
+            return None
+        kind, prob = self.classifier.predict(mem.last_question or "", text)
+        if prob < self.classifier_min_confidence or kind not in _VERDICT_KINDS:
+            return None
+
+        need_followup = kind in {"WEAK", "OFFTOPIC", "ROLE_REVERSAL", "REFUSAL"}
+        return _result_from_kind(
+            kind,
+            mem,
+            reason=f"classifier(p={prob:.2f})",
+            instruction="Следовать вердикту локального классификатора.",
+            need_followup=need_followup,
+            followup=mem.last_question if need_followup else None,
+        )
+
+    def _verify_with_llm(self, text: str, mem, reference: Optional[List[str]] = None) -> Optional[dict]:
         if not self.llm:
             return None
 
+        extra = ""
+        if reference:
+            extra = VERIFIER_REFERENCE_TEMPLATE.format(snippets="\n".join(f"- {s}" for s in reference))
+
+        if mem.conversations is not None and not self.verifier_batcher:
+            # история сообщений: профиль уже в префиксе, в ход уходит только новый ответ
+            try:
+                raw = ask(
+                    self.llm, mem, "verifier", VERIFIER_SYSTEM,
+                    VERIFIER_TURN_TEMPLATE.format(last_question=mem.last_question or "-", user_message=text) + extra,
+                    temperature=0.0,
+                )
+            except LLMUnavailable:
+                mem.mark_degraded("verifier")
+                return None
+            return parse_structured(raw, "verifier")
+
         user = VERIFIER_USER_TEMPLATE.format(
             position=mem.position,
             grade=mem.grade,
@@ -126,15 +179,38 @@ class ObserverAgent:
             last_question=mem.last_question or "-",
             user_message=text,
             recent_questions="\n".join(mem.asked_questions[-12:]) or "-",
-        )
-        raw = self.llm.generate(VERIFIER_SYSTEM, user, temperature=0.0)
-        return safe_json(raw) or None
-
-    def analyze(self, user_message: str, mem) -> ObserverResult:
+        ) + extra
+        try:
+            if self.verifier_batcher:
+                verify = self.verifier_batcher.verify
+                if isinstance(self.llm, BudgetedLLM):
+                    # батчер общий на процесс — расход этой сессии учитываем здесь
+                    return call_with_deadline(mem.deadline, self.llm.guard, VERIFIER_SYSTEM, user, lambda: verify(user))
+                return call_with_deadline(mem.deadline, verify, user)
+            raw = call_with_deadline(
+                mem.deadline, self.llm.generate, VERIFIER_SYSTEM, user, temperature=0.0, json_mode=True
+            )
+        except LLMUnavailable:
+            mem.mark_degraded("verifier")
+            return None
+        return parse_structured(raw, "verifier")
+
+    def analyze(self, user_message: str, mem, msg: Optional[AnalyzedMessage] = None) -> ObserverResult:
+        expected = self.references.get(mem.last_question) if self.references is not None else None
+        result = self._analyze(user_message, mem, msg, expected)
+        # эталон из хранилища точнее шаблона «Схема ответа…» и не стоит вызова LLM
+        if expected and result.kind in {"WEAK", "HALLUCINATION"}:
+            result.expected_answer_short = expected
+        return result
+
+    def _analyze(
+        self, user_message: str, mem, msg: Optional[AnalyzedMessage], expected: Optional[str]
+    ) -> ObserverResult:
         text = user_message or ""
-        low = _normalize(text)
+        # разбор реплики общий на весь ход; без него считаем здесь
+        msg = msg if msg is not None else analyze_message(text)
 
-        if _looks_like_gibberish(text):
+        if msg.gibberish:
             return ObserverResult(
                 kind="OFFTOPIC",
                 reason="empty/gibberish input",
@@ -148,53 +224,64 @@ class ObserverAgent:
                 expected_answer_short=None,
             )
 
-        for ph in self.REFUSAL_WORDS:
-            if ph in low:
-                return ObserverResult(
-                    kind="REFUSAL",
-                    reason="candidate refusal",
-                    instruction="Предложи /stop или вернуться к интервью по стеку.",
-                    difficulty_action="SAME",
-                    topic_hint=mem.last_topic,
-                    need_followup=True,
-                    followup_question="Хочешь завершить интервью командой /stop или продолжим?",
-                    fact_check_notes=None,
-                    return_to_topic_text="Ок, понимаю.",
-                    expected_answer_short=None,
+        if msg.first_phrase(self.REFUSAL_WORDS):
+            return ObserverResult(
+                kind="REFUSAL",
+                reason="candidate refusal",
+                instruction="Предложи /stop или вернуться к интервью по стеку.",
+                difficulty_action="SAME",
+                topic_hint=mem.last_topic,
+                need_followup=True,
+                followup_question="Хочешь завершить интервью командой /stop или продолжим?",
+                fact_check_notes=None,
+                return_to_topic_text="Ок, понимаю.",
+                expected_answer_short=None,
+            )
+
+        if msg.first_phrase(self.ROLE_REVERSAL_WORDS):
+            return ObserverResult(
+                kind="ROLE_REVERSAL",
+                reason="role reversal",
+                instruction="Коротко ответь 1 предложением и верни к интервью.",
+                difficulty_action="SAME",
+                topic_hint=mem.last_topic,
+                need_followup=True,
+                followup_question=mem.last_question or "Вернёмся к интервью: ответь на последний вопрос?",
+                fact_check_notes=None,
+                return_to_topic_text="Коротко: это тренажёр, без реального оффера — давай продолжим интервью.",
+                expected_answer_short=None,
+            )
+
+        # известные ложные утверждения ловим до guardrail релевантности:
+        # «POST идемпотентен» отвечает на вопрос, но остаётся ошибкой
+        check = None
+        if self.knowledge is not None:
+            check = self.knowledge.fact_check(msg, mem.last_question, top_k=self.knowledge_top_k)
+            if check.contradiction is not None:
+                return _result_from_kind(
+                    "HALLUCINATION",
+                    mem,
+                    reason=f"knowledge:{check.contradiction.id}",
+                    instruction="Мягко поправь неверное утверждение по справке и вернись к вопросу.",
+                    fact=one_sentence(check.correction),
                 )
 
-        for ph in self.ROLE_REVERSAL_WORDS:
-            if ph in low:
+        # Это правило ставим ДО off-topic слов.
+        if mem.last_question and msg.relevant_to(mem.last_question, self.relevance_min_overlap):
+            # если есть маркеры "не знаю"  WEAK, иначе STRONG/NORMAL
+            if msg.first_phrase(self.WEAK_WORDS):
                 return ObserverResult(
-                    kind="ROLE_REVERSAL",
-                    reason="role reversal",
-                    instruction="Коротко ответь 1 предложением и верни к интервью.",
-                    difficulty_action="SAME",
+                    kind="WEAK",
+                    reason="relevant but uncertain",
+                    instruction="Упрости вопрос и уточни в этой же теме.",
+                    difficulty_action="DOWN",
                     topic_hint=mem.last_topic,
                     need_followup=True,
-                    followup_question=mem.last_question or "Вернёмся к интервью: ответь на последний вопрос?",
+                    followup_question=mem.last_question,
                     fact_check_notes=None,
-                    return_to_topic_text="Коротко: это тренажёр, без реального оффера — давай продолжим интервью.",
-                    expected_answer_short=None,
+                    return_to_topic_text=None,
+                    expected_answer_short="Схема ответа: определение → 2–3 ключевых пункта → короткий пример.",
                 )
-
-        # Это правило ставим ДО off-topic слов.
-        if mem.last_question and _looks_relevant(text, mem.last_question):
-            # если есть маркеры "не знаю"  WEAK, иначе STRONG/NORMAL
-            for ph in self.WEAK_WORDS:
-                if ph in low:
-                    return ObserverResult(
-                        kind="WEAK",
-                        reason="relevant but uncertain",
-                        instruction="Упрости вопрос и уточни в этой же теме.",
-                        difficulty_action="DOWN",
-                        topic_hint=mem.last_topic,
-                        need_followup=True,
-                        followup_question=mem.last_question,
-                        fact_check_notes=None,
-                        return_to_topic_text=None,
-                        expected_answer_short="Схема ответа: определение → 2–3 ключевых пункта → короткий пример.",
-                    )
             return ObserverResult(
                 kind="STRONG",
                 reason="relevant answer (guardrail)",
@@ -207,83 +294,82 @@ class ObserverAgent:
                 return_to_topic_text=None,
                 expected_answer_short=None,
             )
+        # локальный классификатор: если уверен — обходимся без LLM
+        local = self._classify_locally(text, mem)
+        if local:
+            return local
+
         # Mistral
-        verdict = self._verify_with_llm(user_message, mem)
+        reference = [f"Эталонный ответ: {expected}"] if expected else []
+        if check is not None:
+            reference += [p.text for p in check.snippets]
+        verdict = self._verify_with_llm(user_message, mem, reference) if self.use_verifier else None
         if verdict:
             kind = str(verdict.get("kind", "")).upper()
             confidence = int(verdict.get("confidence", 0) or 0)
 
-            if confidence >= 70 and kind in {
-                "STRONG", "NORMAL", "WEAK",
-                "OFFTOPIC", "HALLUCINATION",
-                "ROLE_REVERSAL", "REFUSAL",
-            }:
+            if confidence >= self.verifier_min_confidence and kind in _VERDICT_KINDS:
                 need_followup = bool(verdict.get("need_followup", False))
                 followup = (
                     one_question(verdict.get("followup_question"))
                     if need_followup else None
                 )
 
-                fact = one_sentence(verdict.get("fact_check_notes"))
-                bridge = one_sentence(verdict.get("return_to_topic_text"))
-
-                if kind in {"OFFTOPIC", "HALLUCINATION"} and not bridge:
-                    bridge = one_sentence(_bridge_back(mem.last_question))
-
-                if kind == "STRONG":
-                    diff = "UP"
-                elif kind in {"WEAK", "OFFTOPIC", "HALLUCINATION", "REFUSAL"}:
-                    diff = "DOWN"
-                else:
-                    diff = "SAME"
-
-                return ObserverResult(
-                    kind=kind,
+                return _result_from_kind(
+                    kind,
+                    mem,
                     reason=f"verifier(conf={confidence})",
                     instruction="Следовать вердикту verifier.",
-                    difficulty_action=diff,
-                    topic_hint=mem.last_topic,
                     need_followup=need_followup,
-                    followup_question=followup,
-                    fact_check_notes=fact,
-                    return_to_topic_text=bridge,
-                    expected_answer_short=None,
+                    followup=followup,
+                    fact=one_sentence(verdict.get("fact_check_notes")),
+                    bridge=one_sentence(verdict.get("return_to_topic_text")),
                 )
 
 
         # 4) строго по словам
-        for w in self.OFFTOPIC_WORDS:
-            if _contains_word(low, w):
-                return ObserverResult(
-                    kind="OFFTOPIC",
-                    reason="off-topic keyword",
-                    instruction="Мягко верни к последнему вопросу.",
-                    difficulty_action="SAME",
-                    topic_hint=mem.last_topic,
-                    need_followup=True,
-                    followup_question=mem.last_question or "Ответь, пожалуйста, по теме интервью?",
-                    fact_check_notes=None,
-                    return_to_topic_text=one_sentence(_bridge_back(mem.last_question)),
-                    expected_answer_short=None,
-                )
+        if any(msg.has_word(w) for w in self.OFFTOPIC_WORDS):
+            return ObserverResult(
+                kind="OFFTOPIC",
+                reason="off-topic keyword",
+                instruction="Мягко верни к последнему вопросу.",
+                difficulty_action="SAME",
+                topic_hint=mem.last_topic,
+                need_followup=True,
+                followup_question=mem.last_question or "Ответь, пожалуйста, по теме интервью?",
+                fact_check_notes=None,
+                return_to_topic_text=one_sentence(_bridge_back(mem.last_question)),
+                expected_answer_short=None,
+            )
 
         # 5) weak (но уже не релевантный) — всё равно уточняем
-        for ph in self.WEAK_WORDS:
-            if ph in low:
-                return ObserverResult(
-                    kind="WEAK",
-                    reason="candidate unsure",
-                    instruction="Упрости вопрос/задай уточнение в той же теме.",
-                    difficulty_action="DOWN",
-                    topic_hint=mem.last_topic,
-                    need_followup=True,
-                    followup_question=mem.last_question or "Можешь объяснить проще, своими словами?",
-                    fact_check_notes=None,
-                    return_to_topic_text=None,
-                    expected_answer_short="Схема ответа: определение → 2–3 пункта → пример.",
-                )
+        if msg.first_phrase(self.WEAK_WORDS):
+            return ObserverResult(
+                kind="WEAK",
+                reason="candidate unsure",
+                instruction="Упрости вопрос/задай уточнение в той же теме.",
+                difficulty_action="DOWN",
+                topic_hint=mem.last_topic,
+                need_followup=True,
+                followup_question=mem.last_question or "Можешь объяснить проще, своими словами?",
+                fact_check_notes=None,
+                return_to_topic_text=None,
+                expected_answer_short="Схема ответа: определение → 2–3 пункта → пример.",
+            )
 
-        if self.llm:
+        raw = None
+        llm = self.llm if self.use_observer_llm else None
+        if llm and mem.conversations is not None:
+            try:
+                raw = ask(
+                    llm, mem, "observer", OBSERVER_SYSTEM,
+                    OBSERVER_TURN_TEMPLATE.format(last_question=mem.last_question or "-", user_message=text),
+                    temperature=0.2,
+                )
+            except LLMUnavailable:
+                mem.mark_degraded("observer")
+                raw = None
+        elif llm:
             user = OBSERVER_USER_TEMPLATE.format(
                 name=mem.candidate_name,
                 position=mem.position,
@@ -295,14 +381,22 @@ class ObserverAgent:
                 recent_questions="\n".join(mem.asked_questions[-20:]) or "-",
                 user_message=text,
             )
-            raw = self.llm.generate(OBSERVER_SYSTEM, user, temperature=0.2)
-            data = safe_json(raw) or {}
+            try:
+                raw = call_with_deadline(
+                    mem.deadline, llm.generate, OBSERVER_SYSTEM, user, temperature=0.2, json_mode=True
+                )
+            except LLMUnavailable:
+                mem.mark_degraded("observer")
+                raw = None
+
+        if raw is not None:
+            data = parse_structured(raw, "observer") or {}
 
             kind = (data.get("kind") or "NORMAL").upper()
             if kind not in {"STRONG","NORMAL","WEAK","OFFTOPIC","HALLUCINATION","ROLE_REVERSAL","NO_STACK","REFUSAL"}:
                 kind = "NORMAL"
 
-            if kind == "OFFTOPIC" and mem.last_question and _looks_relevant(text, mem.last_question):
+            if kind == "OFFTOPIC" and mem.last_question and msg.relevant_to(mem.last_question, self.relevance_min_overlap):
                 kind = "NORMAL"
 
             difficulty_action = (str(data.get("difficulty_action") or "SAME").upper())
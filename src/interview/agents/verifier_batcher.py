@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ..llm.base import report_usage, take_usage
+from ..core.prompts import VERIFIER_SYSTEM, VERIFIER_BATCH_SYSTEM, VERIFIER_BATCH_ITEM_TEMPLATE
+from ..core.structured import parse_structured, validate
+
+
+@dataclass
+class _Pending:
+    user: str
+    item_id: str = ""
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[BaseException] = None
+    usage: Dict[str, int] = field(default_factory=dict)
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+class VerifierBatcher:
+    """
+    Общий для всех сессий микро-батчер запросов Verifier: копит запросы до
+    max_wait_ms или max_items и отправляет одним промптом, затем раздаёт
+    вердикты ожидающим сессиям. Расход пакетного вызова делится между
+    пунктами пропорционально длине и сообщается в потоке каждого вызывающего —
+    бюджет сессии (BudgetedLLM.guard) видит только свою долю.
+    """
+
+    def __init__(self, llm: Any, max_wait_ms: int = 50, max_items: int = 8):
+        self.llm = llm
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self.max_items = max(1, max_items)
+
+        self._lock = threading.Lock()
+        self._pending: List[_Pending] = []
+        self._timer: Optional[threading.Timer] = None
+        self._seq = 0
+
+        self.stats = {"requests": 0, "batches": 0, "llm_calls": 0, "fallback_calls": 0}
+
+    def verify(self, user: str) -> Optional[Dict[str, Any]]:
+        p = _Pending(user=user)
+        batch: Optional[List[_Pending]] = None
+
+        with self._lock:
+            self._seq += 1
+            p.item_id = str(self._seq)
+            self._pending.append(p)
+            self.stats["requests"] += 1
+            if len(self._pending) >= self.max_items:
+                batch = self._take_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.max_wait, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch:
+            self._run(batch)
+        p.done.wait()
+        if p.usage:
+            report_usage(p.usage["prompt_tokens"], p.usage["completion_tokens"], p.usage["cached_tokens"])
+        if p.error is not None:
+            # LLMUnavailable и прочее — вызывающему, как при прямом запросе (mark_degraded и т.п.)
+            raise p.error
+        return p.result
+
+    def _count(self, key: str) -> None:
+        # _run идёт в потоках таймера и вызывающих сессий одновременно
+        with self._lock:
+            self.stats[key] += 1
+
+    def _take_locked(self) -> List[_Pending]:
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take_locked()
+        if batch:
+            self._run(batch)
+
+    @staticmethod
+    def _charge(items: List[_Pending], usage: Optional[Dict[str, int]]) -> None:
+        # доли по длине пункта; остаток от деления достаётся последнему
+        if not usage or not items:
+            return
+        total = sum(len(p.user) for p in items) or len(items)
+        for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+            left = int(usage.get(key) or 0)
+            for i, p in enumerate(items):
+                share = left if i == len(items) - 1 else int(usage.get(key) or 0) * (len(p.user) or 1) // total
+                p.usage[key] = p.usage.get(key, 0) + share
+                left -= share
+
+    def _single(self, p: _Pending) -> Optional[Dict[str, Any]]:
+        self._count("llm_calls")
+        take_usage()
+        try:
+            raw = self.llm.generate(VERIFIER_SYSTEM, p.user, temperature=0.0, json_mode=True)
+        finally:
+            self._charge([p], take_usage())
+        return parse_structured(raw, "verifier")
+
+    def _run(self, batch: List[_Pending]):
+        try:
+            self._count("batches")
+            if len(batch) == 1:
+                batch[0].result = self._single(batch[0])
+                return
+
+            user = "\n".join(
+                VERIFIER_BATCH_ITEM_TEMPLATE.format(item_id=p.item_id, body=p.user) for p in batch
+            )
+            self._count("llm_calls")
+            take_usage()
+            try:
+                raw = self.llm.generate(VERIFIER_BATCH_SYSTEM, user, temperature=0.0, json_mode=True)
+            finally:
+                self._charge(batch, take_usage())
+            data = parse_structured(raw, "verifier_batch") or {}
+
+            by_id: Dict[str, Dict[str, Any]] = {}
+            for r in data.get("results") or []:
+                if isinstance(r, dict) and r.get("id") is not None:
+                    item, _ = validate(r, "verifier")
+                    if item is not None:
+                        by_id[str(r["id"])] = item
+
+            for p in batch:
+                p.result = by_id.get(p.item_id)
+                # пункт потерялся в пакетном ответе — добираем одиночным запросом
+                if p.result is None:
+                    self._count("fallback_calls")
+                    p.result = self._single(p)
+        except Exception as e:
+            # пакет или добор одиночным запросом упал — ошибка тем, кто остался без вердикта
+            for p in batch:
+                if p.result is None:
+                    p.error = e
+        finally:
+            for p in batch:
+                p.done.set()
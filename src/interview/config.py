@@ -1,10 +1,36 @@
 from __future__ import annotations
 from dataclasses import dataclass
 import os
+from typing import Optional
 
-from dotenv import load_dotenv
 
-load_dotenv()
+def _find_env_file() -> Optional[str]:
+    # те же места, что смотрит load_dotenv(): вверх от пакета, плюс текущая папка
+    d = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(d, ".env")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(d)
+        if parent == d:
+            break
+        d = parent
+    candidate = os.path.join(os.getcwd(), ".env")
+    return candidate if os.path.isfile(candidate) else None
+
+
+def _load_env() -> None:
+    # dotenv импортируем только если .env действительно есть: это ускоряет холодный старт
+    if os.getenv("INTERVIEW_SKIP_DOTENV"):
+        return
+    path = _find_env_file()
+    if not path:
+        return
+    from dotenv import load_dotenv
+    load_dotenv(path)
+
+
+_load_env()
 
 @dataclass
 class Settings:
@@ -13,5 +39,110 @@ class Settings:
     use_mistral: bool = True
     mistral_api_key: str = os.getenv("MISTRAL_API_KEY", "")
     mistral_model: str = os.getenv("MISTRAL_MODEL", "mistral-small-latest")
+    mistral_server_url: str = os.getenv("MISTRAL_SERVER_URL", "")
+
+    # auto (mistral при наличии ключа, иначе dummy) | mistral | dummy | sim | openai | router
+    llm_backend: str = os.getenv("LLM_BACKEND", "auto")
+
+    # любой OpenAI-совместимый локальный эндпоинт
+    openai_base_url: str = os.getenv("OPENAI_COMPAT_BASE_URL", "http://127.0.0.1:8000/v1")
+    openai_model: str = os.getenv("OPENAI_COMPAT_MODEL", "local")
+    openai_api_key: str = os.getenv("OPENAI_COMPAT_API_KEY", "")
+
+    # роутер: список бэкендов, маршруты по типу промпта и hedged-запросы
+    router_backends: str = os.getenv("LLM_ROUTER_BACKENDS", "mistral,openai")
+    router_routes: str = os.getenv("LLM_ROUTES", "")  # verifier=mistral,openai;question_gen=openai,mistral
+    router_hedge: bool = os.getenv("LLM_HEDGE", "1") not in {"0", "false", "no"}
+    router_hedge_percentile: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+    router_hedge_min_ms: int = int(os.getenv("LLM_HEDGE_MIN_MS", "200"))
+
+    # локальный классификатор ответов (см. interview.tools.train_classifier)
+    classifier_path: str = os.getenv(
+        "ANSWER_CLASSIFIER_PATH",
+        os.path.join(os.path.dirname(__file__), "data", "answer_classifier.json"),
+    )
+    classifier_min_confidence: float = float(os.getenv("ANSWER_CLASSIFIER_MIN_CONFIDENCE", "0.9"))
+
+    # рабочая точка каскада Observer (подбирается interview.tools.eval_observer)
+    observer_verifier_min_confidence: int = int(os.getenv("OBSERVER_VERIFIER_MIN_CONFIDENCE", "70"))
+    observer_relevance_min_overlap: int = int(os.getenv("OBSERVER_RELEVANCE_MIN_OVERLAP", "1"))
+    observer_use_verifier: bool = os.getenv("OBSERVER_USE_VERIFIER", "1") not in {"0", "false", "no"}
+    observer_use_llm: bool = os.getenv("OBSERVER_USE_LLM", "1") not in {"0", "false", "no"}
+
+    # локальная база знаний для проверки фактов (см. interview.tools.build_knowledge)
+    knowledge_fact_check: bool = os.getenv("KNOWLEDGE_FACT_CHECK", "0") == "1"
+    knowledge_top_k: int = int(os.getenv("KNOWLEDGE_TOP_K", "3"))
+
+    # теневой режим: выборка вызовов verifier/observer повторяется на кандидате (см. interview.tools.shadow_report)
+    shadow_backend: str = os.getenv("SHADOW_BACKEND", "")  # пусто — выключено
+    shadow_model: str = os.getenv("SHADOW_MODEL", "")  # другая модель того же бэкенда
+    shadow_prompts: str = os.getenv("SHADOW_PROMPTS", "")  # JSON {kind: system} — ревизия промпта
+    shadow_sample: float = float(os.getenv("SHADOW_SAMPLE", "0.1"))
+    shadow_kinds: str = os.getenv("SHADOW_KINDS", "verifier,observer")
+    shadow_queue: int = int(os.getenv("SHADOW_QUEUE", "100"))
+    shadow_workers: int = int(os.getenv("SHADOW_WORKERS", "1"))
+    shadow_report: str = os.getenv("SHADOW_REPORT", os.path.join("shadow", "shadow.jsonl"))
+
+    # эталонные ответы на вопросы банка (см. interview.tools.build_references); нет файла — не используются
+    reference_answers_path: str = os.getenv(
+        "REFERENCE_ANSWERS",
+        os.path.join(os.path.dirname(__file__), "data", "references.bin"),
+    )
+
+    # микро-батчинг Verifier между сессиями (0 — выключено)
+    verifier_batch_ms: int = int(os.getenv("VERIFIER_BATCH_MS", "0"))
+    verifier_batch_size: int = int(os.getenv("VERIFIER_BATCH_SIZE", "8"))
+
+    # общий лимит запросов к LLM (0 — без планировщика)
+    llm_rate_per_sec: float = float(os.getenv("LLM_RATE_PER_SEC", "0"))
+    llm_burst: float = float(os.getenv("LLM_BURST", "5"))
+    llm_latency_budget_ms: int = int(os.getenv("LLM_LATENCY_BUDGET_MS", "3000"))
+    llm_tenant_rate_per_sec: float = float(os.getenv("LLM_TENANT_RATE_PER_SEC", "0"))
+    llm_tenant_burst: float = float(os.getenv("LLM_TENANT_BURST", "3"))
+
+    # бюджеты LLM на сессию и на тенанта за окно (0 — без ограничения), цены — за 1M токенов
+    llm_session_max_calls: int = int(os.getenv("LLM_SESSION_MAX_CALLS", "0"))
+    llm_session_max_input_tokens: int = int(os.getenv("LLM_SESSION_MAX_INPUT_TOKENS", "0"))
+    llm_session_max_output_tokens: int = int(os.getenv("LLM_SESSION_MAX_OUTPUT_TOKENS", "0"))
+    llm_session_max_cost: float = float(os.getenv("LLM_SESSION_MAX_COST", "0"))
+    llm_tenant_max_calls: int = int(os.getenv("LLM_TENANT_MAX_CALLS", "0"))
+    llm_tenant_max_input_tokens: int = int(os.getenv("LLM_TENANT_MAX_INPUT_TOKENS", "0"))
+    llm_tenant_max_output_tokens: int = int(os.getenv("LLM_TENANT_MAX_OUTPUT_TOKENS", "0"))
+    llm_tenant_max_cost: float = float(os.getenv("LLM_TENANT_MAX_COST", "0"))
+    llm_tenant_budget_window_s: float = float(os.getenv("LLM_TENANT_BUDGET_WINDOW_S", "86400"))
+    llm_price_input_per_mtok: float = float(os.getenv("LLM_PRICE_INPUT_PER_MTOK", "0"))
+    llm_price_cached_per_mtok: float = float(os.getenv("LLM_PRICE_CACHED_PER_MTOK", "0"))
+    llm_price_output_per_mtok: float = float(os.getenv("LLM_PRICE_OUTPUT_PER_MTOK", "0"))
+
+    # бюджет на обработку одного хода, мс (0 — без ограничения)
+    turn_budget_ms: int = int(os.getenv("TURN_BUDGET_MS", "0"))
+
+    # multi-turn история сообщений вместо одного большого user-промпта (кеш префикса у провайдера)
+    use_message_history: bool = os.getenv("LLM_MESSAGE_HISTORY", "0") == "1"
+
+    # выбор сложности: ladder — шаг вверх/вниз по вердикту, irt — адаптивно по оценке способности
+    question_strategy: str = os.getenv("QUESTION_STRATEGY", "ladder").strip().lower()
+
+    # досрочное завершение, когда решение не изменится за early_stop_horizon ходов
+    early_stop: bool = os.getenv("EARLY_STOP", "0") == "1"
+    early_stop_horizon: int = int(os.getenv("EARLY_STOP_HORIZON", "10"))
+    early_stop_min_turns: int = int(os.getenv("EARLY_STOP_MIN_TURNS", "3"))
+    early_stop_strict: bool = os.getenv("EARLY_STOP_STRICT", "0") == "1"
+
+    # один пакетный запрос на вопросы по всем темам и уровням сразу после first_message
+    batch_question_gen: bool = os.getenv("QUESTION_GEN_BATCH", "0") == "1"
+    # фоновая догенерация темы, когда в пуле остаётся не больше N неиспользованных вопросов
+    question_refill_watermark: int = int(os.getenv("QUESTION_REFILL_WATERMARK", "2"))
+
+    # кассеты LLM: запись вызовов по сессиям и воспроизведение (LLM_BACKEND=replay)
+    cassette_dir: str = os.getenv("LLM_CASSETTE_DIR", "")
+    replay_cassette: str = os.getenv("LLM_CASSETTE", "")
+    replay_latency: bool = os.getenv("LLM_REPLAY_LATENCY", "0") == "1"
+
+    # профилирование ходов: каждый N-й ход под cProfile, медленные — семплером
+    profile_every_n: int = int(os.getenv("PROFILE_EVERY_N", "0"))
+    profile_slow_ms: int = int(os.getenv("PROFILE_SLOW_MS", "0"))
+    profile_interval_ms: int = int(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    profile_dir: str = os.getenv("PROFILE_DIR", "profiles")
 
 settings = Settings()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Адаптивный выбор сложности (IRT, модель 2PL). Способность кандидата θ
+# оценивается апостериорным средним (EAP) на сетке; у вопросов банка
+# параметр трудности задан уровнем. Следующий уровень выбирается так,
+# чтобы после ответа неопределённость грейда (Junior/Middle/Senior) была минимальной.
+
+GRID: List[float] = [round(-3.0 + 0.1 * i, 1) for i in range(61)]
+
+LEVEL_B: Dict[str, float] = {"easy": -1.0, "medium": 0.0, "hard": 1.0}
+GRADE_PRIOR: Dict[str, float] = {"junior": -0.6, "middle": 0.0, "senior": 0.8}
+
+# границы грейдов по θ
+GRADE_CUTS: Tuple[Tuple[float, str], ...] = ((-0.5, "Junior"), (0.5, "Middle"))
+TOP_GRADE = "Senior"
+
+# доля «правильности» ответа; None — ответ не несёт информации о знаниях
+KIND_SCORE: Dict[str, Optional[float]] = {
+    "STRONG": 1.0,
+    "NORMAL": 0.75,
+    "WEAK": 0.0,
+    "HALLUCINATION": 0.0,
+    "REFUSAL": 0.0,
+    "OFFTOPIC": None,
+    "ROLE_REVERSAL": None,
+    "NO_STACK": None,
+}
+
+
+def p_correct(theta: float, b: float, a: float) -> float:
+    return 1.0 / (1.0 + math.exp(-a * (theta - b)))
+
+
+def grade_of(theta: float) -> str:
+    for cut, name in GRADE_CUTS:
+        if theta < cut:
+            return name
+    return TOP_GRADE
+
+
+def _normalize(log_post: List[float]) -> List[float]:
+    m = max(log_post)
+    w = [math.exp(v - m) for v in log_post]
+    z = sum(w)
+    return [x / z for x in w]
+
+
+def _bands(weights: List[float]) -> Dict[str, float]:
+    bands: Dict[str, float] = {}
+    for theta, w in zip(GRID, weights):
+        g = grade_of(theta)
+        bands[g] = bands.get(g, 0.0) + w
+    return bands
+
+
+def _entropy(probs) -> float:
+    return -sum(p * math.log(p) for p in probs if p > 0)
+
+
+@dataclass
+class AbilityEstimate:
+    prior_mean: float = 0.0
+    prior_sd: float = 1.0
+    discrimination: float = 1.5
+    answers: int = 0
+    log_post: List[float] = field(default_factory=list)
+
+    def __post_init__(self):
+        if not self.log_post:
+            self.log_post = [-0.5 * ((t - self.prior_mean) / self.prior_sd) ** 2 for t in GRID]
+
+    @classmethod
+    def for_grade(cls, grade: str) -> "AbilityEstimate":
+        return cls(prior_mean=GRADE_PRIOR.get(grade, 0.0))
+
+    def weights(self) -> List[float]:
+        return _normalize(self.log_post)
+
+    def update(self, difficulty: Optional[str], kind: str) -> bool:
+        score = KIND_SCORE.get((kind or "").upper())
+        if score is None or difficulty not in LEVEL_B:
+            return False
+        b, a = LEVEL_B[difficulty], self.discrimination
+        for i, theta in enumerate(GRID):
+            p = p_correct(theta, b, a)
+            # дробный ответ — «взвешенное» бернуллиевское правдоподобие
+            self.log_post[i] += score * math.log(p) + (1.0 - score) * math.log(1.0 - p)
+        self.answers += 1
+        return True
+
+    @property
+    def mean(self) -> float:
+        return sum(t * w for t, w in zip(GRID, self.weights()))
+
+    @property
+    def sd(self) -> float:
+        w = self.weights()
+        m = sum(t * x for t, x in zip(GRID, w))
+        return math.sqrt(max(0.0, sum(x * (t - m) ** 2 for t, x in zip(GRID, w))))
+
+    def grade(self) -> Tuple[str, float]:
+        bands = _bands(self.weights())
+        name = max(bands, key=bands.get)
+        return name, bands[name]
+
+    def expected_entropy(self, difficulty: str) -> float:
+        # ожидаемая неопределённость грейда (энтропия по Junior/Middle/Senior) после ответа
+        w = self.weights()
+        b, a = LEVEL_B[difficulty], self.discrimination
+        ps = [p_correct(t, b, a) for t in GRID]
+        out = 0.0
+        for post in ([x * p for x, p in zip(w, ps)], [x * (1.0 - p) for x, p in zip(w, ps)]):
+            z = sum(post)
+            if z > 0:
+                out += z * _entropy(v / z for v in _bands(post).values())
+        return out
+
+    def best_difficulty(self, levels: Tuple[str, ...] = ("easy", "medium", "hard")) -> str:
+        return min(levels, key=self.expected_entropy)
+
+    def to_dict(self) -> Dict[str, object]:
+        grade, conf = self.grade()
+        return {
+            "theta": round(self.mean, 3),
+            "sd": round(self.sd, 3),
+            "grade": grade,
+            "grade_confidence": round(conf, 3),
+            "answers": self.answers,
+        }
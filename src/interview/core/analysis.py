@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+from .feedback import CLARITY_MARKERS
+from .topics import extract_tech_stack
+
+# Разбор реплики кандидата один раз за ход. Раньше одно и то же сообщение
+# заново нормализовали и токенизировали: STOP_RE и extract_tech_stack в step,
+# нормализация и проверка на мусор в observer, ключевые слова для релевантности,
+# отдельный regex на каждое off-topic слово, _short и маркеры ясности в Scorecard.
+# Результаты совпадают с прежними функциями один в один.
+
+STATUS_RE = re.compile(r"^\s*/status\b", re.I)
+STOP_RE = re.compile(r"(^/stop\b|\bстоп интервью\b|\bстоп\b)", re.I)
+
+STOP_WORDS = {
+    "и", "в", "на", "что", "это", "как", "чем", "когда", "где", "почему",
+    "the", "a", "an", "to", "in", "on", "and", "or", "of", "for",
+}
+
+_SPACE_RE = re.compile(r"\s+")
+_TOKEN_JUNK_RE = re.compile(r"[^a-zа-я0-9_+\s-]")
+_WORD_RE = re.compile(r"[a-zа-я0-9_]+")
+_COMMAND_RE = re.compile(r"^/(stop|help)\b")
+
+
+def normalize_text(text: str) -> str:
+    t = (text or "").lower().strip()
+    return _SPACE_RE.sub(" ", t)
+
+
+def tokenize(normalized: str) -> List[str]:
+    # на вход — уже нормализованный текст (normalize_text)
+    parts = []
+    for p in _TOKEN_JUNK_RE.sub(" ", normalized).split():
+        p = p.strip("-_+")
+        if len(p) >= 3 and p not in STOP_WORDS:
+            parts.append(p)
+    return parts
+
+
+def is_gibberish(stripped: str, alpha: Optional[int] = None) -> bool:
+    if not stripped:
+        return True
+    if len(stripped) <= 2:
+        return True
+    if alpha is None:
+        alpha = sum(ch.isalpha() for ch in stripped)
+    if alpha == 0:
+        return True
+    if alpha / max(1, len(stripped)) < 0.30:
+        return True
+    if stripped.startswith("/") and not _COMMAND_RE.match(stripped.lower()):
+        return True
+    return False
+
+
+@lru_cache(maxsize=4096)
+def question_keywords(question: str) -> FrozenSet[str]:
+    # вопросы повторяются (банк, follow-up) — их ключевые слова кешируем
+    return frozenset(tokenize(normalize_text(question)))
+
+
+@dataclass
+class AnalyzedMessage:
+    """
+    Реплика кандидата, разобранная один раз: нормализованный текст, токены,
+    ключевые слова, доля букв, найденный стек, команды и длины.
+    Токены и множество слов считаются лениво — при первом обращении.
+    """
+    text: str
+    lower: str
+    normalized: str
+    compact_length: int              # длина без лишних пробелов (как у _short)
+    alpha_ratio: float
+    gibberish: bool
+    is_stop: bool
+    is_status: bool
+    has_question: bool
+    clarity_marker: bool
+    tech_stack: List[str] = field(default_factory=list)
+
+    @cached_property
+    def tokens(self) -> Tuple[str, ...]:
+        return tuple(tokenize(self.normalized))
+
+    @cached_property
+    def keywords(self) -> FrozenSet[str]:
+        return frozenset(self.tokens)
+
+    @cached_property
+    def words(self) -> FrozenSet[str]:
+        # слова по границам [a-zа-я0-9_] — то же разбиение, что у поиска по границе слова
+        return frozenset(_WORD_RE.findall(self.normalized))
+
+    def has_phrase(self, phrase: str) -> bool:
+        return phrase in self.normalized
+
+    def first_phrase(self, phrases: Iterable[str]) -> Optional[str]:
+        for ph in phrases:
+            if ph in self.normalized:
+                return ph
+        return None
+
+    def has_word(self, word: str) -> bool:
+        if _WORD_RE.fullmatch(word):
+            return word in self.words
+        # фразы и слова с другими символами — прежним regex по границам
+        return re.search(rf"(^|[^a-zа-я0-9_]){re.escape(word)}([^a-zа-я0-9_]|$)", self.normalized) is not None
+
+    def relevant_to(self, question: Optional[str], min_overlap: int = 1) -> bool:
+        if not self.text or not question:
+            return False
+        q = question_keywords(question)
+        if not self.keywords or not q:
+            return False
+        if min_overlap <= 1:
+            return not self.keywords.isdisjoint(q)
+        return len(self.keywords & q) >= min_overlap
+
+
+def analyze_message(text: str) -> AnalyzedMessage:
+    text = text or ""
+    lower = text.lower()
+    stripped = text.strip()
+    compact = _SPACE_RE.sub(" ", stripped)
+    alpha = sum(ch.isalpha() for ch in stripped)
+    return AnalyzedMessage(
+        text=text,
+        lower=lower,
+        normalized=compact.lower(),
+        compact_length=len(compact),
+        alpha_ratio=alpha / max(1, len(stripped)),
+        gibberish=is_gibberish(stripped, alpha),
+        is_stop=STOP_RE.search(text) is not None,
+        is_status=STATUS_RE.search(text) is not None,
+        has_question="?" in text,
+        clarity_marker=any(x in lower for x in CLARITY_MARKERS),
+        tech_stack=extract_tech_stack(text, lowered=lower),
+    )
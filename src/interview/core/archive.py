@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+# Компактный архив интервью. Поток записей с префиксом длины (varint);
+# повторяющиеся строки (вопросы, темы, роли, причины) пишутся один раз
+# и дальше идут ссылками, kind/diff Observer — маленькими целыми.
+# Формат без потерь относительно InterviewLog.to_public_dict(); прочие
+# ключи старых логов (session_meta, meta) сохраняются как JSON-хвост.
+#
+#   файл    := MAGIC flags:u8 body        (body сжат zstd, если flags & 1)
+#   body    := record*
+#   record  := len:varint payload
+#   payload := STR text | BEGIN name participant extra | TURN ... extra | END feedback [null:u8]
+#
+# final_feedback: null (интервью не завершено) пишется как пустой текст и байт 1
+# в конце END; в архивах без этого байта null не отличить от "".
+
+MAGIC = b"IVA1"
+FLAG_ZSTD = 1
+
+REC_STR = 1
+REC_BEGIN = 2
+REC_TURN = 3
+REC_END = 4
+
+THOUGHTS_RAW = 0
+THOUGHTS_LINES = 1
+THOUGHTS_JSON = 2  # старые логи со списком {"role", "content"} вместо строки
+
+LINE_TEXT = 0
+LINE_OBSERVER = 1
+
+KINDS = ("STRONG", "NORMAL", "WEAK", "OFFTOPIC", "HALLUCINATION", "ROLE_REVERSAL", "REFUSAL")
+DIFFS = ("UP", "SAME", "DOWN")
+
+_LINE_RE = re.compile(r"\[([^\]\n]*)\]: ([^\n]*)\n")
+_OBSERVER_RE = re.compile(r"kind=([A-Z_]+) diff=([A-Z]+) reason=(.*)\Z")
+
+
+_CHUNK = 1 << 16
+
+_LOG_KEYS = ("participant_name", "turns", "final_feedback")
+_TURN_KEYS = ("turn_id", "agent_visible_message", "user_message", "internal_thoughts")
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:  # pragma: no cover - зависит от окружения
+        raise ArchiveError("zstd-архив требует пакет `zstandard`") from e
+    return zstandard
+
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _put_bytes(out: bytearray, text: str) -> None:
+    b = text.encode("utf-8")
+    _put_varint(out, len(b))
+    out += b
+
+
+class _Cursor:
+    __slots__ = ("buf", "pos")
+
+    def __init__(self, buf: bytes):
+        self.buf = buf
+        self.pos = 0
+
+    def varint(self) -> int:
+        shift = n = 0
+        while True:
+            b = self.buf[self.pos]
+            self.pos += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def text(self) -> str:
+        n = self.varint()
+        s = self.buf[self.pos:self.pos + n].decode("utf-8")
+        self.pos += n
+        return s
+
+
+def _put_extra(out: bytearray, data: Dict[str, Any], known: Tuple[str, ...]) -> None:
+    extra = {k: v for k, v in data.items() if k not in known}
+    _put_bytes(out, json.dumps(extra, ensure_ascii=False) if extra else "")
+
+
+def _split_thoughts(text: str) -> Optional[List[Tuple[str, str]]]:
+    # только если строки ровно в формате _format_internal_thoughts
+    lines: List[Tuple[str, str]] = []
+    pos = 0
+    while pos < len(text):
+        m = _LINE_RE.match(text, pos)
+        if not m:
+            return None
+        lines.append((m.group(1), m.group(2)))
+        pos = m.end()
+    return lines
+
+
+class ArchiveWriter:
+    """
+    Потоковая запись: write() на каждое интервью, close() в конце.
+    Таблица строк общая на весь файл.
+    """
+
+    def __init__(self, target: Union[str, BinaryIO], compress: bool = False, level: int = 3):
+        self._own = isinstance(target, str)
+        self._raw: BinaryIO = open(target, "wb") if isinstance(target, str) else target
+        self._raw.write(MAGIC + bytes([FLAG_ZSTD if compress else 0]))
+        self._zw = None
+        self._out: BinaryIO = self._raw
+        if compress:
+            self._zw = _zstd().ZstdCompressor(level=level).stream_writer(self._raw, closefd=False)
+            self._out = self._zw
+        self._strings: Dict[str, int] = {}
+
+    def _emit(self, payload: bytearray) -> None:
+        head = bytearray()
+        _put_varint(head, len(payload))
+        self._out.write(bytes(head) + bytes(payload))
+
+    def _ref(self, text: str) -> int:
+        idx = self._strings.get(text)
+        if idx is None:
+            idx = self._strings[text] = len(self._strings)
+            rec = bytearray([REC_STR])
+            _put_bytes(rec, text)
+            self._emit(rec)
+        return idx
+
+    def _put_thoughts(self, rec: bytearray, text: Any) -> None:
+        if not isinstance(text, str):
+            rec.append(THOUGHTS_JSON)
+            _put_bytes(rec, json.dumps(text, ensure_ascii=False))
+            return
+        lines = _split_thoughts(text)
+        if lines is None:
+            rec.append(THOUGHTS_RAW)
+            _put_bytes(rec, text)
+            return
+        rec.append(THOUGHTS_LINES)
+        _put_varint(rec, len(lines))
+        for role, content in lines:
+            _put_varint(rec, self._ref(role))
+            m = _OBSERVER_RE.match(content)
+            if m and m.group(1) in KINDS and m.group(2) in DIFFS:
+                rec.append(LINE_OBSERVER)
+                rec.append(KINDS.index(m.group(1)))
+                rec.append(DIFFS.index(m.group(2)))
+                _put_varint(rec, self._ref(m.group(3)))
+            else:
+                rec.append(LINE_TEXT)
+                _put_varint(rec, self._ref(content))
+
+    def write(self, data: Dict[str, Any], name: str = "") -> None:
+        rec = bytearray([REC_BEGIN])
+        _put_bytes(rec, name)
+        _put_varint(rec, self._ref(str(data.get("participant_name") or "")))
+        _put_extra(rec, data, _LOG_KEYS)
+        self._emit(rec)
+
+        for t in data.get("turns", []):
+            rec = bytearray([REC_TURN])
+            _put_varint(rec, int(t["turn_id"]))
+            _put_varint(rec, self._ref(t.get("agent_visible_message") or ""))
+            _put_bytes(rec, t.get("user_message") or "")
+            self._put_thoughts(rec, t.get("internal_thoughts", ""))
+            _put_extra(rec, t, _TURN_KEYS)
+            self._emit(rec)
+
+        rec = bytearray([REC_END])
+        feedback = data.get("final_feedback")
+        _put_bytes(rec, feedback or "")
+        if feedback is None and "final_feedback" in data:
+            rec.append(1)
+        self._emit(rec)
+
+    def close(self) -> None:
+        if self._zw is not None:
+            self._zw.close()
+        if self._own:
+            self._raw.close()
+        else:
+            self._raw.flush()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ArchiveReader:
+    """Потоковое чтение: итерация отдаёт (name, public_dict) по одному интервью."""
+
+    def __init__(self, source: Union[str, BinaryIO]):
+        self._own = isinstance(source, str)
+        self._raw: BinaryIO = open(source, "rb") if isinstance(source, str) else source
+        head = self._raw.read(len(MAGIC) + 1)
+        if len(head) != len(MAGIC) + 1 or head[:len(MAGIC)] != MAGIC:
+            raise ArchiveError("not an interview archive")
+        self._in: BinaryIO = self._raw
+        if head[-1] & FLAG_ZSTD:
+            self._in = _zstd().ZstdDecompressor().stream_reader(self._raw, closefd=False)
+        self._strings: List[str] = []
+        self._buf = b""
+        self._pos = 0
+
+    def _fill(self, need: int) -> bool:
+        # дочитываем блоками: побайтовое чтение из потока заметно медленнее
+        while len(self._buf) - self._pos < need:
+            chunk = self._in.read(max(_CHUNK, need))
+            if not chunk:
+                return False
+            self._buf = self._buf[self._pos:] + chunk
+            self._pos = 0
+        return True
+
+    def _records(self) -> Iterator[_Cursor]:
+        while True:
+            if not self._fill(1):
+                if self._pos < len(self._buf):
+                    raise ArchiveError("truncated archive")
+                return
+            shift = n = 0
+            while True:
+                if not self._fill(1):
+                    raise ArchiveError("truncated archive")
+                b = self._buf[self._pos]
+                self._pos += 1
+                n |= (b & 0x7F) << shift
+                if b < 0x80:
+                    break
+                shift += 7
+            if not self._fill(n):
+                raise ArchiveError("truncated archive")
+            yield _Cursor(self._buf[self._pos:self._pos + n])
+            self._pos += n
+
+    @staticmethod
+    def _extra(cur: _Cursor) -> Dict[str, Any]:
+        raw = cur.text()
+        return json.loads(raw) if raw else {}
+
+    def _thoughts(self, cur: _Cursor) -> Any:
+        mode = cur.buf[cur.pos]
+        cur.pos += 1
+        if mode == THOUGHTS_RAW:
+            return cur.text()
+        if mode == THOUGHTS_JSON:
+            return json.loads(cur.text())
+        parts: List[str] = []
+        for _ in range(cur.varint()):
+            role = self._strings[cur.varint()]
+            kind = cur.buf[cur.pos]
+            cur.pos += 1
+            if kind == LINE_OBSERVER:
+                k, d = KINDS[cur.buf[cur.pos]], DIFFS[cur.buf[cur.pos + 1]]
+                cur.pos += 2
+                content = f"kind={k} diff={d} reason={self._strings[cur.varint()]}"
+            else:
+                content = self._strings[cur.varint()]
+            parts.append(f"[{role}]: {content}\n")
+        return "".join(parts)
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        name = ""
+        current: Optional[Dict[str, Any]] = None
+        for cur in self._records():
+            rtype = cur.buf[0]
+            cur.pos = 1
+            if rtype == REC_STR:
+                self._strings.append(cur.text())
+            elif rtype == REC_BEGIN:
+                name = cur.text()
+                current = {"participant_name": self._strings[cur.varint()], "turns": [], "final_feedback": ""}
+                current.update(self._extra(cur))
+            elif current is None:
+                raise ArchiveError("turn record outside of an interview")
+            elif rtype == REC_TURN:
+                turn = {
+                    "turn_id": cur.varint(),
+                    "agent_visible_message": self._strings[cur.varint()],
+                    "user_message": cur.text(),
+                    "internal_thoughts": self._thoughts(cur),
+                }
+                turn.update(self._extra(cur))
+                current["turns"].append(turn)
+            elif rtype == REC_END:
+                feedback: Optional[str] = cur.text()
+                if cur.pos < len(cur.buf) and cur.buf[cur.pos] == 1:
+                    feedback = None
+                current["final_feedback"] = feedback
+                yield name, current
+                current = None
+            else:
+                raise ArchiveError(f"unknown record type {rtype}")
+        if current is not None:
+            raise ArchiveError("truncated archive")
+
+    def close(self) -> None:
+        if self._own:
+            self._raw.close()
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import glob
+import json
+import math
+import os
+import random
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .logging import load_log
+
+# Локальный классификатор ответов: логистическая регрессия (softmax)
+# над хешированными n-граммами. Обучается офлайн по логам, где kind уже
+# проставлен Observer/Verifier.
+
+DIM = 1 << 18
+
+_KIND_RE = re.compile(r"\[Observer\]:\s*kind=([A-Z_]+)")
+_WORD_RE = re.compile(r"[a-zа-яё0-9_+#]+")
+
+
+@dataclass
+class Example:
+    question: str
+    answer: str
+    kind: str
+
+
+def _hash(s: str) -> int:
+    return zlib.crc32(s.encode("utf-8")) % DIM
+
+
+def features(question: str, answer: str) -> Dict[int, float]:
+    a = (answer or "").lower()
+    q = (question or "").lower()
+    aw = _WORD_RE.findall(a)
+    qw = set(_WORD_RE.findall(q))
+
+    feats: Dict[int, float] = {}
+
+    def add(name: str, value: float = 1.0):
+        i = _hash(name)
+        feats[i] = feats.get(i, 0.0) + value
+
+    for w in aw:
+        add("w:" + w)
+    for w1, w2 in zip(aw, aw[1:]):
+        add("b:" + w1 + " " + w2)
+    padded = f" {a[:400]} "
+    for i in range(len(padded) - 2):
+        add("c:" + padded[i:i + 3], 0.2)
+
+    # пересечение с вопросом и длина — грубые, но полезные признаки
+    overlap = sum(1 for w in set(aw) if len(w) >= 3 and w in qw)
+    add(f"ov:{min(overlap, 5)}")
+    add(f"len:{min(len(aw) // 5, 10)}")
+    add("bias")
+
+    norm = math.sqrt(sum(v * v for v in feats.values())) or 1.0
+    return {k: v / norm for k, v in feats.items()}
+
+
+def _softmax(scores: List[float], temperature: float = 1.0) -> List[float]:
+    t = max(temperature, 1e-6)
+    m = max(scores)
+    ex = [math.exp((s - m) / t) for s in scores]
+    z = sum(ex)
+    return [e / z for e in ex]
+
+
+@dataclass
+class AnswerClassifier:
+    classes: List[str]
+    weights: List[Dict[int, float]] = field(default_factory=list)
+    temperature: float = 1.0
+    n_train: int = 0
+    n_val: int = 0  # размер отложенной выборки калибровки; 0 — не откалиброван
+
+    def _scores(self, x: Dict[int, float]) -> List[float]:
+        return [sum(w.get(i, 0.0) * v for i, v in x.items()) for w in self.weights]
+
+    def predict_proba(self, question: str, answer: str) -> Dict[str, float]:
+        probs = _softmax(self._scores(features(question, answer)), self.temperature)
+        return dict(zip(self.classes, probs))
+
+    def predict(self, question: str, answer: str) -> Tuple[str, float]:
+        probs = self.predict_proba(question, answer)
+        kind = max(probs, key=probs.get)
+        return kind, probs[kind]
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": 1,
+            "dim": DIM,
+            "classes": self.classes,
+            "temperature": self.temperature,
+            "n_train": self.n_train,
+            "n_val": self.n_val,
+            "weights": [{str(k): round(v, 6) for k, v in w.items() if abs(v) > 1e-6} for w in self.weights],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AnswerClassifier":
+        if data.get("dim") != DIM:
+            raise ValueError("classifier was trained with a different feature dimension")
+        return cls(
+            classes=list(data["classes"]),
+            weights=[{int(k): float(v) for k, v in w.items()} for w in data["weights"]],
+            temperature=float(data.get("temperature", 1.0)),
+            n_train=int(data.get("n_train", 0)),
+            n_val=int(data.get("n_val", 0)),
+        )
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "AnswerClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+_LOADED: Dict[Tuple[str, float], AnswerClassifier] = {}
+
+
+def load_classifier(path: Optional[str]) -> Optional[AnswerClassifier]:
+    if not path or not os.path.exists(path):
+        return None
+    key = (path, os.path.getmtime(path))
+    if key not in _LOADED:
+        try:
+            model = AnswerClassifier.load(path)
+        except Exception:
+            return None
+        if model.n_val == 0:
+            # без отложенной выборки уверенность не откалибрована — порог Observer ей верить не может
+            return None
+        _LOADED[key] = model
+    return _LOADED[key]
+
+
+def export_examples(paths: Iterable[str]) -> List[Example]:
+    """
+    (question, answer, kind) из логов интервью. Понимает и публичный JSON
+    (kind берётся из internal_thoughts), и ходы с meta.
+    """
+    out: List[Example] = []
+    files: List[str] = []
+    for p in paths:
+        files.extend(sorted(glob.glob(p)) if any(ch in p for ch in "*?[") else [p])
+
+    for path in files:
+        try:
+            data = load_log(path)  # meta ходов — из служебного файла рядом с логом
+        except Exception:
+            continue
+        if data is None:
+            continue
+        for t in data.get("turns", []):
+            meta = t.get("meta") or {}
+            kind = meta.get("kind")
+            if not kind:
+                m = _KIND_RE.search(str(t.get("internal_thoughts") or ""))
+                kind = m.group(1) if m else None
+            question = meta.get("question_answered") or t.get("agent_visible_message") or ""
+            answer = t.get("user_message") or ""
+            if kind and answer.strip():
+                out.append(Example(question=question, answer=answer, kind=kind.upper()))
+    return out
+
+
+def _nll(model: AnswerClassifier, data: List[Tuple[Dict[int, float], int]], temperature: float) -> float:
+    total = 0.0
+    for x, y in data:
+        p = _softmax(model._scores(x), temperature)[y]
+        total -= math.log(max(p, 1e-12))
+    return total / max(1, len(data))
+
+
+MIN_CALIBRATION_EXAMPLES = 20
+# без отложенной выборки откалибровать нечем: берём самую «плоскую» температуру
+# сетки, чтобы уверенность модели не проходила порог Observer
+UNCALIBRATED_TEMPERATURE = 5.0
+
+
+def train(
+    examples: List[Example],
+    epochs: int = 30,
+    lr: float = 0.5,
+    l2: float = 1e-4,
+    holdout: float = 0.2,
+    seed: int = 13,
+) -> AnswerClassifier:
+    if not examples:
+        raise ValueError("no training examples")
+
+    classes = sorted({e.kind for e in examples})
+    idx = {c: i for i, c in enumerate(classes)}
+    data = [(features(e.question, e.answer), idx[e.kind]) for e in examples]
+
+    rng = random.Random(seed)
+    rng.shuffle(data)
+    n_val = int(len(data) * holdout) if len(data) >= MIN_CALIBRATION_EXAMPLES else 0
+    val, tr = data[:n_val], data[n_val:]
+
+    model = AnswerClassifier(classes=classes, weights=[{} for _ in classes], n_train=len(tr), n_val=len(val))
+
+    for epoch in range(epochs):
+        rng.shuffle(tr)
+        step = lr / (1.0 + epoch * 0.1)
+        for x, y in tr:
+            probs = _softmax(model._scores(x))
+            for c, w in enumerate(model.weights):
+                g = probs[c] - (1.0 if c == y else 0.0)
+                if abs(g) < 1e-9:
+                    continue
+                for i, v in x.items():
+                    w[i] = w.get(i, 0.0) * (1.0 - step * l2) - step * g * v
+
+    # калибровка температурой на отложенной выборке
+    if val:
+        grid = [0.5 + 0.25 * i for i in range(19)]
+        model.temperature = min(grid, key=lambda t: _nll(model, val, t))
+    else:
+        model.temperature = UNCALIBRATED_TEMPERATURE
+
+    return model
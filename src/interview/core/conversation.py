@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from typing import Any, Callable, List, Optional
+
+from ..llm.base import Message
+from .deadline import call_with_deadline
+from .prompts import PROFILE_ACK, PROFILE_TEMPLATE
+
+_TURN_BUDGET = object()  # «взять бюджет текущего хода из mem.deadline»
+
+
+class Conversation:
+    """
+    История одной стадии (Observer, Verifier, генератор вопросов) в сессии:
+    неизменный префикс из system и профиля кандидата плюс append-only ходы.
+    Префикс запросов совпадает от хода к ходу, и провайдер берёт его из кеша.
+    """
+
+    def __init__(self, system: str, profile: str, max_history: int = 24):
+        self.prefix: List[Message] = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": profile},
+            {"role": "assistant", "content": PROFILE_ACK},
+        ]
+        self.history: List[Message] = []
+        self.max_history = max_history
+
+    def messages(self, user: str) -> List[Message]:
+        return self.prefix + self.history + [{"role": "user", "content": user}]
+
+    def commit(self, user: str, reply: str) -> None:
+        self.history.append({"role": "user", "content": user})
+        self.history.append({"role": "assistant", "content": reply})
+        if len(self.history) > self.max_history:
+            # срезаем сразу половину: префикс ломается редко, а не на каждом ходу
+            self.history = self.history[-(self.max_history // 2):]
+
+
+def conversation_for(mem, stage: str, system: str) -> Conversation:
+    conv = mem.conversations.get(stage)
+    if conv is None:
+        profile = PROFILE_TEMPLATE.format(
+            name=mem.candidate_name,
+            position=mem.position,
+            grade=mem.grade,
+            experience=mem.experience,
+            tech_stack=", ".join(mem.tech_stack) or "-",
+        )
+        conv = mem.conversations[stage] = Conversation(system, profile)
+    return conv
+
+
+def ask(
+    llm,
+    mem,
+    stage: str,
+    system: str,
+    user: str,
+    temperature: float = 0.3,
+    remember: bool = True,
+    on_late: Optional[Callable[[Any], None]] = None,
+    deadline: Any = _TURN_BUDGET,
+) -> str:
+    """
+    Запрос к LLM в рамках истории стадии (по умолчанию — с бюджетом хода).
+    remember=False — только общий префикс, без записи хода (для независимых запросов).
+    """
+    if deadline is _TURN_BUDGET:
+        deadline = getattr(mem, "deadline", None)
+    conv = conversation_for(mem, stage, system)
+    raw = call_with_deadline(
+        deadline,
+        llm.chat, conv.messages(user), temperature=temperature, json_mode=True,
+        on_late=on_late,
+    )
+    if remember:
+        conv.commit(user, raw)
+    return raw
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Optional
+
+from ..llm.base import LLMUnavailable
+
+
+class DeadlineExceeded(LLMUnavailable):
+    pass
+
+
+_WORKERS = 16
+_MAX_QUEUED = 64  # сверх занятых воркеров; дальше вызов отклоняется сразу, а не копится в очереди
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots = threading.BoundedSemaphore(_WORKERS + _MAX_QUEUED)
+
+_current = threading.local()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="llm-deadline")
+    return _executor
+
+
+class Deadline:
+    """Бюджет времени на один ход интервью."""
+
+    def __init__(self, budget_ms: int):
+        self.budget = budget_ms / 1000.0
+        self.started = time.monotonic()
+
+    def remaining(self) -> float:
+        return self.budget - (time.monotonic() - self.started)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+def current_deadline() -> Optional[Deadline]:
+    # бюджет хода, под которым идёт вызов в текущем потоке (см. call_with_deadline)
+    return getattr(_current, "deadline", None)
+
+
+def _run_under(deadline: Deadline, fn: Callable[..., Any], args: Any, kwargs: Any) -> Any:
+    _current.deadline = deadline
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _current.deadline = None
+
+
+def call_with_deadline(
+    deadline: Optional[Deadline],
+    fn: Callable[..., Any],
+    *args: Any,
+    on_late: Optional[Callable[[Any], None]] = None,
+    **kwargs: Any,
+) -> Any:
+    """
+    Вызывает fn, но ждёт не дольше остатка бюджета хода. Опоздавший вызов без
+    on_late отменяется (если ещё не начался); с on_late он дорабатывает в фоне,
+    и его результат можно положить в кеш для следующих ходов. Очередь пула
+    ограничена: при переполнении — сразу DeadlineExceeded.
+    """
+    if deadline is None:
+        return fn(*args, **kwargs)
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded("turn budget already spent")
+
+    if not _slots.acquire(blocking=False):
+        raise DeadlineExceeded("deadline pool is saturated")
+    try:
+        # воркер знает бюджет хода: очередь планировщика не ждёт токен дольше него
+        future = _pool().submit(_run_under, deadline, fn, args, kwargs)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=remaining)
+    except FutureTimeout:
+        if on_late is None:
+            future.cancel()
+        else:
+            def _done(f):
+                if not f.cancelled() and f.exception() is None:
+                    on_late(f.result())
+            future.add_done_callback(_done)
+        raise DeadlineExceeded("LLM call missed the turn deadline")
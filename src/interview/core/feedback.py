@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from collections import defaultdict
+from dataclasses import dataclass, field
 import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .analysis import AnalyzedMessage
 
 
 def _short(text: str, limit: int = 180) -> str:
@@ -33,110 +38,176 @@ def _decision_from_counts(counts: Dict[str, int], grade_hint: str) -> Tuple[str,
     return grade, "Hire", 75
 
 
-def build_feedback(turns: List[Dict[str, Any]], grade_hint: str) -> str:
-    counts = defaultdict(int)
-
-    topics = defaultdict(lambda: {
-        "confirmed": 0,
-        "gaps": 0,
-        "examples": [],       # (question_answered, answer)
-        "gaps_items": [],     # (question_answered, answer, expected)
-        "offtopic_items": [], # (question_answered, answer)
-    })
-
-    off_topic_events = 0
-    clarity_good = 0
-    clarity_bad = 0
-
-    for t in turns:
-        meta = t.get("meta") or {}
-        kind = (meta.get("kind") or "").upper()
-        topic = meta.get("topic") or "generic"
-
-        counts[kind] += 1
-
-        q_answered = meta.get("question_answered") or ""
-        a = t.get("user_message", "")
-
-        # clarity proxy
-        if len(_short(a)) >= 40 and any(x in a.lower() for x in ["это", "потому", "например", "отличается", "затем", "в итоге"]):
-            clarity_good += 1
-        elif len(_short(a)) < 10:
-            clarity_bad += 1
+CLARITY_MARKERS = ["это", "потому", "например", "отличается", "затем", "в итоге"]
+
+
+@dataclass
+class TopicScore:
+    confirmed: int = 0
+    gaps: int = 0
+    offtopic: int = 0
+    # для фидбэка нужны только первые примеры — храним их, а не все ходы
+    example: Optional[Tuple[str, str]] = None                   # (question_answered, answer)
+    gaps_items: List[Tuple[str, str, str]] = field(default_factory=list)  # (question_answered, answer, expected)
+    offtopic_example: Optional[Tuple[str, str]] = None
+
+
+@dataclass
+class Scorecard:
+    """
+    Накопительный скоринг интервью: обновляется за O(1) на каждом ходе,
+    поэтому финальный фидбэк и промежуточный /status не перебирают историю.
+    """
+    counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    topics: Dict[str, TopicScore] = field(default_factory=dict)
+    off_topic_events: int = 0
+    clarity_good: int = 0
+    clarity_bad: int = 0
+    asked_by_candidate: int = 0
+    turns: int = 0
+
+    def add(
+        self,
+        kind: str,
+        topic: Optional[str],
+        question_answered: str,
+        answer: str,
+        expected: Optional[str] = None,
+        msg: Optional["AnalyzedMessage"] = None,
+    ):
+        kind = (kind or "").upper()
+        topic = topic or "generic"
+        q_answered = question_answered or ""
+        a = answer or ""
+
+        self.turns += 1
+        self.counts[kind] += 1
+        if (msg.has_question if msg is not None else "?" in a):
+            self.asked_by_candidate += 1
+
+        # clarity proxy; разбор ответа берём из хода, если он есть
+        if msg is not None:
+            short_len, clear = msg.compact_length, msg.clarity_marker
+        else:
+            short_len, clear = len(_short(a)), any(x in a.lower() for x in CLARITY_MARKERS)
+        if short_len >= 40 and clear:
+            self.clarity_good += 1
+        elif short_len < 10:
+            self.clarity_bad += 1
 
         if kind == "STRONG":
-            topics[topic]["confirmed"] += 1
-            if q_answered and a:
-                topics[topic]["examples"].append((q_answered, a))
+            st = self._topic(topic)
+            st.confirmed += 1
+            if q_answered and a and st.example is None:
+                st.example = (q_answered, a)
 
         elif kind in {"WEAK", "HALLUCINATION"}:
-            topics[topic]["gaps"] += 1
-            expected = meta.get("expected_answer_short") or ""
-            topics[topic]["gaps_items"].append((q_answered, a, expected))
+            st = self._topic(topic)
+            st.gaps += 1
+            if len(st.gaps_items) < 2:
+                st.gaps_items.append((q_answered, a, expected or ""))
 
         elif kind == "OFFTOPIC":
-            off_topic_events += 1
-            topics[topic]["offtopic_items"].append((q_answered, a))
-
-    grade, rec, conf = _decision_from_counts(counts, grade_hint)
-
-    lines = []
-    lines.append("## A) Decision")
-    lines.append(f"- Grade: **{grade}**")
-    lines.append(f"- Hiring Recommendation: **{rec}**")
-    lines.append(f"- Confidence Score: **{conf}%**")
-    lines.append("")
-
-    lines.append("## B) Hard Skills (Technical Review)")
-    if not topics:
-        lines.append("- Недостаточно данных.")
-    else:
-        for topic, st in topics.items():
-            lines.append(f"- **{topic}**")
-
-            if st["confirmed"]:
-                lines.append(f"  - ✅ Confirmed Skills: {st['confirmed']}")
-                q, a = st["examples"][0]
-                lines.append(f"    - Пример: Q: {_short(q)} | A: {_short(a)}")
-
-            if st["gaps"]:
-                lines.append(f"  - ❌ Knowledge Gaps: {st['gaps']}")
-                for q, a, expected in st["gaps_items"][:2]:
-                    if q:
-                        lines.append(f"    - Вопрос: {_short(q)}")
-                    if a:
-                        lines.append(f"      Ответ: {_short(a)}")
-                    if expected:
-                        lines.append(f"      Правильно: {_short(expected)}")
-
-            if st["offtopic_items"]:
-                lines.append(f"  - ⚠️ Off-topic/уход от вопроса: {len(st['offtopic_items'])}")
-                q, a = st["offtopic_items"][0]
-                lines.append(f"    - Пример: Q: {_short(q)} | A: {_short(a)}")
-
-    lines.append("")
-    lines.append("## C) Soft Skills & Communication")
-    clarity = "в целом хорошо: ответы чаще структурные" if clarity_good >= clarity_bad else "есть проблемы: ответы часто короткие/обрывочные"
-    lines.append(f"- Clarity: {clarity} (good={clarity_good}, weak={clarity_bad}).")
-    lines.append("- Honesty: честное «не знаю» — нормально; плохо, когда вместо ответа идёт уход в сторону.")
-    asked_by_candidate = sum(1 for t in turns if "?" in (t.get("user_message") or ""))
-    lines.append(f"- Engagement: встречные вопросы от кандидата: {asked_by_candidate}.")
-    if off_topic_events:
-        lines.append(f"- Focus: были попытки сменить тему/оффтопик: {off_topic_events} (снижает оценку коммуникации).")
-    else:
-        lines.append("- Focus: оффтопика почти не было — плюс.")
-
-    lines.append("")
-    lines.append("## D) Next Steps (Roadmap)")
-    gap_topics = [tp for tp, st in topics.items() if st["gaps"] > 0]
-    if gap_topics:
-        lines.append("- Темы для подтягивания по результатам интервью:")
-        for tp in gap_topics:
-            lines.append(f"  - {tp}: закрыть пробелы по вопросам из раздела Hard Skills (5–10 практических задач).")
-    else:
-        lines.append("- Явных технических провалов по заданным вопросам не видно. Следующий шаг — расширить покрытие тем и усложнить кейсы.")
-
-    if off_topic_events:
-        lines.append("- Отдельно: тренировать дисциплину ответа (сначала по вопросу, потом уточнения/контекст).")
-
-    return "\n".join(lines)
+            st = self._topic(topic)
+            self.off_topic_events += 1
+            st.offtopic += 1
+            if st.offtopic_example is None:
+                st.offtopic_example = (q_answered, a)
+
+    def add_turn(self, turn: Dict[str, Any]):
+        meta = turn.get("meta") or {}
+        self.add(
+            kind=meta.get("kind") or "",
+            topic=meta.get("topic"),
+            question_answered=meta.get("question_answered") or "",
+            answer=turn.get("user_message", ""),
+            expected=meta.get("expected_answer_short"),
+        )
+
+    def _topic(self, topic: str) -> TopicScore:
+        if topic not in self.topics:
+            self.topics[topic] = TopicScore()
+        return self.topics[topic]
+
+    def decision(self, grade_hint: str) -> Tuple[str, str, int]:
+        return _decision_from_counts(self.counts, grade_hint)
+
+    def status(self, grade_hint: str) -> str:
+        grade, rec, conf = self.decision(grade_hint)
+        counts = ", ".join(f"{k}={v}" for k, v in sorted(self.counts.items()) if v) or "-"
+        return (
+            f"Промежуточный статус (ходов: {self.turns}): {grade}, {rec}, уверенность {conf}%.\n"
+            f"Классификация ответов: {counts}."
+        )
+
+    def render(self, grade_hint: str) -> str:
+        grade, rec, conf = self.decision(grade_hint)
+        topics = self.topics
+
+        lines = []
+        lines.append("## A) Decision")
+        lines.append(f"- Grade: **{grade}**")
+        lines.append(f"- Hiring Recommendation: **{rec}**")
+        lines.append(f"- Confidence Score: **{conf}%**")
+        lines.append("")
+
+        lines.append("## B) Hard Skills (Technical Review)")
+        if not topics:
+            lines.append("- Недостаточно данных.")
+        else:
+            for topic, st in topics.items():
+                lines.append(f"- **{topic}**")
+
+                if st.confirmed:
+                    lines.append(f"  - ✅ Confirmed Skills: {st.confirmed}")
+                    if st.example:
+                        q, a = st.example
+                        lines.append(f"    - Пример: Q: {_short(q)} | A: {_short(a)}")
+
+                if st.gaps:
+                    lines.append(f"  - ❌ Knowledge Gaps: {st.gaps}")
+                    for q, a, expected in st.gaps_items[:2]:
+                        if q:
+                            lines.append(f"    - Вопрос: {_short(q)}")
+                        if a:
+                            lines.append(f"      Ответ: {_short(a)}")
+                        if expected:
+                            lines.append(f"      Правильно: {_short(expected)}")
+
+                if st.offtopic:
+                    lines.append(f"  - ⚠️ Off-topic/уход от вопроса: {st.offtopic}")
+                    q, a = st.offtopic_example
+                    lines.append(f"    - Пример: Q: {_short(q)} | A: {_short(a)}")
+
+        lines.append("")
+        lines.append("## C) Soft Skills & Communication")
+        clarity = "в целом хорошо: ответы чаще структурные" if self.clarity_good >= self.clarity_bad else "есть проблемы: ответы часто короткие/обрывочные"
+        lines.append(f"- Clarity: {clarity} (good={self.clarity_good}, weak={self.clarity_bad}).")
+        lines.append("- Honesty: честное «не знаю» — нормально; плохо, когда вместо ответа идёт уход в сторону.")
+        lines.append(f"- Engagement: встречные вопросы от кандидата: {self.asked_by_candidate}.")
+        if self.off_topic_events:
+            lines.append(f"- Focus: были попытки сменить тему/оффтопик: {self.off_topic_events} (снижает оценку коммуникации).")
+        else:
+            lines.append("- Focus: оффтопика почти не было — плюс.")
+
+        lines.append("")
+        lines.append("## D) Next Steps (Roadmap)")
+        gap_topics = [tp for tp, st in topics.items() if st.gaps > 0]
+        if gap_topics:
+            lines.append("- Темы для подтягивания по результатам интервью:")
+            for tp in gap_topics:
+                lines.append(f"  - {tp}: закрыть пробелы по вопросам из раздела Hard Skills (5–10 практических задач).")
+        else:
+            lines.append("- Явных технических провалов по заданным вопросам не видно. Следующий шаг — расширить покрытие тем и усложнить кейсы.")
+
+        if self.off_topic_events:
+            lines.append("- Отдельно: тренировать дисциплину ответа (сначала по вопросу, потом уточнения/контекст).")
+
+        return "\n".join(lines)
+
+
+def build_feedback(turns: List[Dict[str, Any]], grade_hint: str) -> str:
+    card = Scorecard()
+    for t in turns:
+        card.add_turn(t)
+    return card.render(grade_hint)
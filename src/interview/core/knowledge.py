@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import marshal
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .analysis import AnalyzedMessage, normalize_text, question_keywords, tokenize
+
+# Локальная база знаний для проверки фактов. Корпус — data/knowledge.jsonl:
+# короткие справки по темам и регулярки типичных ложных утверждений, которые
+# им противоречат. Инвертированный индекс BM25 строится офлайн
+# (interview.tools.build_knowledge) и грузится готовым; устаревший или
+# отсутствующий индекс собирается в памяти при первом обращении.
+
+INDEX_VERSION = 1
+_DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+CORPUS_PATH = os.getenv("KNOWLEDGE_CORPUS", os.path.join(_DATA, "knowledge.jsonl"))
+INDEX_PATH = os.getenv("KNOWLEDGE_INDEX", os.path.join(_DATA, "knowledge.marshal"))
+
+K1 = 1.2
+B = 0.75
+
+# «не» рядом с утверждением переворачивает его смысл: «POST не идемпотентен»
+_NEGATION_RE = re.compile(r"(^|[^a-zа-я])(не|нет|ни)([^a-zа-я]|$)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def stem(token: str) -> str:
+    # грубая обрезка окончаний: «индекс/индексы/индексом» -> «индекс»
+    return token[:6] if len(token) > 6 else token
+
+
+def terms(text: str) -> List[str]:
+    return [stem(t) for t in tokenize(normalize_text(text))]
+
+
+@dataclass
+class Passage:
+    id: str
+    topic: str
+    text: str
+    contradicts: List[str] = field(default_factory=list)
+
+
+@dataclass
+class FactCheck:
+    snippets: List[Passage]
+    contradiction: Optional[Passage] = None
+    claim: Optional[str] = None          # фрагмент ответа, совпавший с ложным утверждением
+
+    @property
+    def correction(self) -> Optional[str]:
+        # предложение справки, ближе всего к ложному утверждению (по общим основам слов);
+        # при равенстве — с отрицанием: поправка обычно звучит как «X не Y»
+        if self.contradiction is None:
+            return None
+        sentences = [s.strip() for s in _SENTENCE_RE.split(self.contradiction.text) if s.strip()]
+        claim = set(terms(self.claim or ""))
+        return max(sentences, key=lambda s: (len(claim & set(terms(s))), _NEGATION_RE.search(s.lower()) is not None))
+
+
+def read_corpus(path: str = CORPUS_PATH) -> List[Passage]:
+    out: List[Passage] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                out.append(Passage(item["id"], item.get("topic", ""), item["text"], list(item.get("contradicts") or [])))
+    return out
+
+
+def corpus_fingerprint(path: str = CORPUS_PATH) -> str:
+    h = hashlib.sha1(str(INDEX_VERSION).encode())
+    with open(path, "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def build_index(passages: List[Passage], fingerprint: str = "") -> Dict[str, Any]:
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    lengths: List[int] = []
+    for doc_id, p in enumerate(passages):
+        tf: Dict[str, int] = {}
+        for t in terms(f"{p.topic} {p.text}"):
+            tf[t] = tf.get(t, 0) + 1
+        lengths.append(sum(tf.values()))
+        for t, n in tf.items():
+            postings.setdefault(t, []).append((doc_id, n))
+    n_docs = len(passages)
+    idf = {t: math.log(1.0 + (n_docs - len(ps) + 0.5) / (len(ps) + 0.5)) for t, ps in postings.items()}
+    return {
+        "version": INDEX_VERSION,
+        "fingerprint": fingerprint,
+        "passages": [(p.id, p.topic, p.text, p.contradicts) for p in passages],
+        "postings": postings,
+        "lengths": lengths,
+        "avgdl": (sum(lengths) / n_docs) if n_docs else 0.0,
+        "idf": idf,
+    }
+
+
+def save_index(data: Dict[str, Any], path: str = INDEX_PATH) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        marshal.dump(data, f)
+    os.replace(tmp, path)
+
+
+class KnowledgeIndex:
+    """BM25 по справкам корпуса и проверка ответа на известные ложные утверждения."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.passages = [Passage(i, t, x, list(c)) for i, t, x, c in data["passages"]]
+        self.postings: Dict[str, List[Tuple[int, int]]] = data["postings"]
+        self.lengths: List[int] = data["lengths"]
+        self.avgdl: float = data["avgdl"] or 1.0
+        self.idf: Dict[str, float] = data["idf"]
+        # регулярки компилируем лениво: проверяются только найденные справки
+        self._patterns: Dict[int, List[re.Pattern]] = {}
+
+    def _claims(self, doc_id: int) -> List[re.Pattern]:
+        patterns = self._patterns.get(doc_id)
+        if patterns is None:
+            patterns = self._patterns[doc_id] = [re.compile(c) for c in self.passages[doc_id].contradicts]
+        return patterns
+
+    @classmethod
+    def load(cls, index_path: str = INDEX_PATH, corpus_path: str = CORPUS_PATH) -> "KnowledgeIndex":
+        fp = corpus_fingerprint(corpus_path)
+        if index_path and os.path.exists(index_path):
+            try:
+                with open(index_path, "rb") as f:
+                    data = marshal.load(f)
+                if data.get("version") == INDEX_VERSION and data.get("fingerprint") == fp:
+                    return cls(data)
+            except Exception:
+                pass
+        # индекса нет или корпус поменялся — строим в памяти
+        return cls(build_index(read_corpus(corpus_path), fp))
+
+    def search(self, query_terms: List[str], top_k: int = 3) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+        for t in set(query_terms):
+            idf = self.idf.get(t)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[t]:
+                norm = K1 * (1.0 - B + B * self.lengths[doc_id] / self.avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1.0) / (tf + norm)
+        return sorted(scores.items(), key=lambda kv: -kv[1])[:top_k]
+
+    def fact_check(
+        self,
+        msg: AnalyzedMessage,
+        question: Optional[str] = None,
+        top_k: int = 3,
+        check_k: int = 5,
+        min_score: float = 1.0,
+    ) -> FactCheck:
+        # справки для Verifier — по ответу и вопросу; ложные утверждения ищем в check_k лучших по ответу
+        answer = [stem(t) for t in msg.tokens]
+        query = answer + [stem(t) for t in question_keywords(question)] if question else answer
+        hits = [self.passages[d] for d, score in self.search(query, top_k=top_k) if score >= min_score]
+        for d, _ in self.search(answer, top_k=check_k):
+            p = self.passages[d]
+            for rx in self._claims(d):
+                m = rx.search(msg.normalized)
+                if m is None:
+                    continue
+                # «не»/«нет» внутри совпадения переворачивают смысл, если само утверждение без отрицания
+                if _NEGATION_RE.search(m.group(0)) and not _NEGATION_RE.search(rx.pattern):
+                    continue
+                return FactCheck(snippets=hits, contradiction=p, claim=m.group(0))
+        return FactCheck(snippets=hits)
+
+
+_shared: Optional[KnowledgeIndex] = None
+_shared_lock = threading.Lock()
+
+
+def shared_index() -> KnowledgeIndex:
+    # индекс неизменяем — один на процесс
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = KnowledgeIndex.load()
+        return _shared
@@ -1,10 +1,45 @@
 from __future__ import annotations
 
 import json
+import os
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Union
 
 
+# Публичный лог — строгая структура под финальный тест. Служебное (session_meta:
+# расход LLM, деградации, досрочная остановка; meta ходов) пишется рядом, в
+# <лог>.meta.json, и подмешивается обратно через load_log.
+META_SUFFIX = ".meta.json"
+
+
+def meta_path(log_path: str) -> str:
+    base = log_path[:-len(".json")] if log_path.endswith(".json") else log_path
+    return base + META_SUFFIX
+
+
+def is_meta_path(path: str) -> bool:
+    return path.endswith(META_SUFFIX)
+
+
+def load_log(path: str) -> Optional[Dict[str, Any]]:
+    """Лог интервью вместе со служебным файлом (если он есть); для самого служебного файла — None."""
+    if is_meta_path(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    side = meta_path(path)
+    if os.path.exists(side):
+        with open(side, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if "session_meta" not in data:
+            data["session_meta"] = meta.get("session_meta")
+        by_turn = {t.get("turn_id"): t.get("meta") for t in meta.get("turns", [])}
+        for t in data.get("turns", []):
+            if "meta" not in t and by_turn.get(t.get("turn_id")) is not None:
+                t["meta"] = by_turn[t["turn_id"]]
+    return data
+
+
 def _format_internal_thoughts(thoughts: Union[str, List[Dict[str, str]], None]) -> str:
 
     if thoughts is None:
@@ -62,7 +97,18 @@ class InterviewLog:
             "final_feedback": self.final_feedback or "",
         }
 
+    def to_meta_dict(self) -> Dict[str, Any]:
+        return {
+            "participant_name": self.participant_name,
+            "session_meta": self.session_meta or {},
+            "turns": [{"turn_id": t.turn_id, "meta": t.meta} for t in self.turns if t.meta is not None],
+        }
+
     def save(self, path: str) -> None:
         data = self.to_public_dict()
         with open(path, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def save_meta(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_meta_dict(), f, ensure_ascii=False, indent=2)
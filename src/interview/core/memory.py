@@ -28,6 +28,7 @@ class Memory:
     difficulty: str = "easy"
     last_question: Optional[str] = None
     last_topic: Optional[str] = None
+    last_difficulty: Optional[str] = None  # уровень последнего заданного вопроса
 
     last_user_messages: List[str] = field(default_factory=list)
     asked_questions: List[str] = field(default_factory=list)
@@ -39,6 +40,21 @@ class Memory:
     topic_strong_streak: Dict[str, int] = field(default_factory=dict)
 
     llm: Optional[Any] = None
+    shared_pool: Optional[Any] = None  # dict-подобный пул вопросов, общий для воркеров
+    pending_generation: Optional[Any] = None  # Future пакетной генерации вопросов (topics.prefetch_questions)
+    refills: Dict[Any, Any] = field(default_factory=dict)  # фоновые дозаправки пулов: (topic, difficulty) -> Future
+    refill_wanted: List[Any] = field(default_factory=list)  # (topic, difficulty, watermark), ждущие schedule_refills
+    closed: bool = False  # сессия завершена: фоновые дозаправки не нужны
+
+    # бюджет текущего хода и стадии, которые в нём откатились на правила
+    deadline: Optional[Any] = None
+    degraded: List[str] = field(default_factory=list)
+
+    # история сообщений по стадиям (observer/verifier/question_gen); None — режим выключен
+    conversations: Optional[Dict[str, Any]] = None
+
+    # оценка способности для адаптивного выбора вопросов (core.adaptive); None — «лесенка» bump_up/bump_down
+    ability: Optional[Any] = None
 
     def apply_defaults(self):
         self.grade = normalize_grade(self.grade)
@@ -66,6 +82,10 @@ class Memory:
         self.asked_questions.append(q)
         self.asked_questions = self.asked_questions[-60:]
 
+    def mark_degraded(self, stage: str):
+        if stage not in self.degraded:
+            self.degraded.append(stage)
+
     def mark_topic(self, topic: Optional[str], kind: str):
         if not topic:
             return
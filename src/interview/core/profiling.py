@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Профилирование отдельных ходов: каждый N-й ход целиком под cProfile,
+# а для медленных ходов — лёгкий семплер стеков, который пишет файл,
+# только если ход действительно превысил порог.
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    # один поток на процесс снимает стеки только зарегистрированных потоков ходов;
+    # пока регистраций нет, потока нет
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._targets: Dict[int, Counter] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, thread_id: int) -> Counter:
+        samples: Counter = Counter()
+        with self._lock:
+            self._targets[thread_id] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="turn-sampler", daemon=True)
+                self._thread.start()
+        return samples
+
+    def unregister(self, thread_id: int) -> Counter:
+        # после снятия регистрации семплы потока больше не меняются
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                targets = list(self._targets)
+            frames = sys._current_frames()
+            stacks = {}
+            for tid in targets:
+                frame = frames.get(tid)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    stacks[tid] = ";".join(reversed(stack))
+            del frames
+            with self._lock:
+                for tid, stack in stacks.items():
+                    samples = self._targets.get(tid)
+                    if samples is not None:
+                        samples[stack] += 1
+
+
+# cProfile в 3.12+ (sys.monitoring) не включить в двух потоках сразу: полный профиль
+# снимает один ход на процесс, остальные в это время идут под семплером
+_cprofile_lock = threading.Lock()
+
+
+class _Probe:
+    def __init__(self, profiler: "TurnProfiler", full: bool):
+        self.profiler = profiler
+        self.started = time.perf_counter()
+        self.cprofile: Optional[cProfile.Profile] = None
+        self.thread_id: Optional[int] = None
+        if full and _cprofile_lock.acquire(blocking=False):
+            try:
+                self.cprofile = cProfile.Profile()
+                self.cprofile.enable()
+            except ValueError:
+                # профилировщик уже включил кто-то вне TurnProfiler
+                self.cprofile = None
+                _cprofile_lock.release()
+        if self.cprofile is None and profiler.slow_ms > 0:
+            self.thread_id = threading.get_ident()
+            profiler.sampler.register(self.thread_id)
+
+    def finish(self, session_id: str, turn_id: int) -> Optional[str]:
+        elapsed_ms = (time.perf_counter() - self.started) * 1000.0
+        base = os.path.join(self.profiler.out_dir, f"{session_id}_turn{turn_id:04d}")
+
+        if self.cprofile is not None:
+            try:
+                self.cprofile.disable()
+            finally:
+                _cprofile_lock.release()
+            os.makedirs(self.profiler.out_dir, exist_ok=True)
+            path = f"{base}.pstats"
+            self.cprofile.dump_stats(path)
+            return path
+
+        if self.thread_id is not None:
+            samples = self.profiler.sampler.unregister(self.thread_id)
+            if elapsed_ms >= self.profiler.slow_ms and samples:
+                os.makedirs(self.profiler.out_dir, exist_ok=True)
+                path = f"{base}_{int(elapsed_ms)}ms.collapsed"
+                with open(path, "w", encoding="utf-8") as f:
+                    for stack, n in samples.most_common():
+                        f.write(f"{stack} {n}\n")
+                return path
+        return None
+
+
+class TurnProfiler:
+    def __init__(self, out_dir: str, every_n: int = 0, slow_ms: int = 0, interval_ms: int = 5):
+        self.out_dir = out_dir
+        self.every_n = every_n
+        self.slow_ms = slow_ms
+        self.interval = max(1, interval_ms) / 1000.0
+        self.sampler = StackSampler(self.interval)
+        self._turns = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.every_n > 0 or self.slow_ms > 0
+
+    def start(self) -> _Probe:
+        with self._lock:
+            self._turns += 1
+            n = self._turns
+        return _Probe(self, full=self.every_n > 0 and n % self.every_n == 0)
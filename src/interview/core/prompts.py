@@ -87,6 +87,26 @@ QUESTION_GEN_USER_TEMPLATE = """Сгенерируй 3–5 вопросов.
 {already_asked}
 """
 
+QUESTION_GEN_BATCH_SYSTEM = QUESTION_GEN_SYSTEM + """
+Пакетный режим:
+- В запросе список тем и уровней сложности (easy/medium/hard).
+- Верни ТОЛЬКО JSON вида {"topics": {"<тема>": {"easy": ["...?"], "medium": ["...?"], "hard": ["...?"]}}}
+  — по 3–5 вопросов на каждую запрошенную пару тема/сложность, ключи тем как в запросе.
+"""
+
+QUESTION_GEN_BATCH_USER_TEMPLATE = """Сгенерируй вопросы сразу для всех пар тема/сложность.
+
+Запрошено:
+{requested}
+
+Позиция: {position}
+Грейд: {grade}
+Опыт: {experience}
+
+Уже задавали:
+{already_asked}
+"""
+
 VERIFIER_SYSTEM = """Ты — Verifier (критик) на техсобеседовании.
 Твоя задача: по последнему вопросу и ответу кандидата определить:
 1) ответ по теме или нет
@@ -130,3 +150,98 @@ VERIFIER_USER_TEMPLATE = """Контекст интервью:
 
 Верни JSON строго по schema из system.
 """
+
+# эталонные ответы на вопросы банка генерируются офлайн (interview.tools.build_references)
+REFERENCE_SYSTEM = """Ты — эксперт, готовишь эталонные ответы для тренажёра тех-интервью (RU).
+Верни ТОЛЬКО JSON без markdown.
+
+Формат:
+{ "answer": "эталонный ответ в 1–3 предложениях", "key_points": ["...", "..."] }
+
+Правила:
+- Ответ фактически точный, без воды и без оговорок про будущие версии.
+- answer — то, что интервьюер ожидает услышать на этом уровне сложности.
+- key_points — 2–4 ключевых пункта, по которым видно, что кандидат понимает тему.
+"""
+
+REFERENCE_USER_TEMPLATE = """Тема: {topic}
+Сложность: {difficulty}
+
+Вопрос:
+{question}
+"""
+
+# справки из локальной базы знаний (core.knowledge) — дописываются к запросу Verifier
+VERIFIER_REFERENCE_TEMPLATE = """
+Справки по теме (проверенные факты, опирайся на них при проверке):
+{snippets}
+"""
+
+VERIFIER_BATCH_SYSTEM = VERIFIER_SYSTEM + """
+Режим пакетной проверки:
+- В сообщении несколько независимых пунктов, каждый начинается строкой "### item <id>".
+- Проверь каждый пункт отдельно, не смешивая контекст между пунктами.
+- Верни ТОЛЬКО JSON вида {"results": [{"id": "<id>", ...поля schema...}, ...]} — по одному объекту на каждый пункт.
+"""
+
+VERIFIER_BATCH_ITEM_TEMPLATE = """### item {item_id}
+{body}
+"""
+
+# Режим истории сообщений: стабильный префикс (system + профиль) и по
+# одному короткому сообщению на ход — чтобы работал кеш префикса у провайдера.
+PROFILE_TEMPLATE = """Вводные по кандидату:
+- Имя: {name}
+- Позиция: {position}
+- Грейд: {grade}
+- Опыт: {experience}
+- Стек: {tech_stack}
+
+Дальше идут сообщения по ходам интервью, на каждое отвечай строго по формату из system.
+"""
+
+PROFILE_ACK = "Принято."
+
+OBSERVER_TURN_TEMPLATE = """Вопрос интервьюера:
+{last_question}
+
+Ответ кандидата:
+{user_message}
+
+Сделай анализ и верни JSON строго по формату.
+"""
+
+VERIFIER_TURN_TEMPLATE = """Последний вопрос интервьюера (на него отвечает кандидат):
+{last_question}
+
+Ответ кандидата:
+{user_message}
+
+Верни JSON строго по schema из system.
+"""
+
+QUESTION_GEN_TURN_TEMPLATE = """Сгенерируй 3–5 вопросов.
+
+Тема: {topic}
+Сложность: {difficulty}
+
+Уже задавали:
+{already_asked}
+"""
+
+
+def prompt_kind(system: str) -> str:
+    # тип запроса по системному промпту: нужен планировщику, роутеру и т.п.
+    s = system or ""
+    # пакетный промпт начинается с одиночного — проверяем его первым
+    if s.startswith(QUESTION_GEN_BATCH_SYSTEM):
+        return "question_gen_batch"
+    if s.startswith(VERIFIER_SYSTEM):
+        return "verifier"
+    if s.startswith(OBSERVER_SYSTEM):
+        return "observer"
+    if s.startswith(QUESTION_GEN_SYSTEM):
+        return "question_gen"
+    if s.startswith(REFERENCE_SYSTEM):
+        return "reference"
+    return "other"
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .analysis import normalize_text
+from .prompts import REFERENCE_SYSTEM, REFERENCE_USER_TEMPLATE
+
+# Эталонные ответы на вопросы банка. Генерируются офлайн одной пачкой
+# (interview.tools.build_references) и лежат в одном файле:
+#   b"IREF" | версия формата | длина заголовка | заголовок JSON | тексты UTF-8
+# Заголовок — оглавление id вопроса -> (смещение, длина). Файл открывается
+# через mmap: воркеры одного хоста делят страницы в кеше ОС, а тексты
+# декодируются только по запросу.
+
+REFERENCES_VERSION = 1
+REFERENCES_PATH = os.getenv(
+    "REFERENCE_ANSWERS",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "references.bin"),
+)
+
+_MAGIC = b"IREF"
+_HEAD = struct.Struct("<4sII")
+
+
+def question_id(question: str) -> str:
+    # id по нормализованному тексту: переживает перестановки банка и лишние пробелы
+    return hashlib.sha1(normalize_text(question).encode("utf-8")).hexdigest()[:16]
+
+
+def prompt_fingerprint() -> str:
+    # поменялся промпт — эталоны стоит перегенерировать (build_references сам это видит)
+    h = hashlib.sha1(str(REFERENCES_VERSION).encode())
+    h.update(REFERENCE_SYSTEM.encode("utf-8"))
+    h.update(REFERENCE_USER_TEMPLATE.encode("utf-8"))
+    return h.hexdigest()
+
+
+def write_store(
+    path: str,
+    entries: Iterable[Tuple[str, Dict[str, Any]]],
+    meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """entries: (question_id, {"answer", "question", "topic", "difficulty"})."""
+    blob = bytearray()
+    index: Dict[str, Any] = {}
+    for qid, item in entries:
+        data = item["answer"].encode("utf-8")
+        index[qid] = [len(blob), len(data), item.get("topic", ""), item.get("difficulty", ""), item.get("question", "")]
+        blob += data
+    header = dict(meta or {})
+    header.update({"version": REFERENCES_VERSION, "entries": index})
+    raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEAD.pack(_MAGIC, REFERENCES_VERSION, len(raw)))
+        f.write(raw)
+        f.write(blob)
+    os.replace(tmp, path)
+    return header
+
+
+class ReferenceStore:
+    """Эталонные ответы из файла через mmap; неизвестный вопрос — None."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = _HEAD.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != REFERENCES_VERSION:
+            self._mm.close()
+            raise ValueError(f"unsupported reference store: {path}")
+        self.meta: Dict[str, Any] = json.loads(self._mm[_HEAD.size:_HEAD.size + size].decode("utf-8"))
+        self._entries: Dict[str, list] = self.meta.pop("entries")
+        self._base = _HEAD.size + size
+
+    @classmethod
+    def open(cls, path: str = REFERENCES_PATH) -> Optional["ReferenceStore"]:
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except Exception:
+            return None  # битый или чужой формат — работаем без эталонов
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, qid: str) -> bool:
+        return qid in self._entries
+
+    @property
+    def stale(self) -> bool:
+        return self.meta.get("prompt_fingerprint") != prompt_fingerprint()
+
+    def get_by_id(self, qid: str) -> Optional[str]:
+        entry = self._entries.get(qid)
+        if entry is None:
+            return None
+        offset, length = entry[0], entry[1]
+        start = self._base + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def get(self, question: Optional[str]) -> Optional[str]:
+        if not question:
+            return None
+        return self.get_by_id(question_id(question))
+
+    def items(self) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        for qid, (_, _, topic, difficulty, question) in self._entries.items():
+            yield qid, {
+                "answer": self.get_by_id(qid),
+                "question": question,
+                "topic": topic,
+                "difficulty": difficulty,
+            }
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+_shared: Optional[ReferenceStore] = None
+_shared_loaded = False
+_shared_lock = threading.Lock()
+
+
+def shared_store(path: str = REFERENCES_PATH) -> Optional[ReferenceStore]:
+    # одно отображение файла на процесс; файла нет — None
+    global _shared, _shared_loaded
+    with _shared_lock:
+        if not _shared_loaded:
+            _shared = ReferenceStore.open(path)
+            _shared_loaded = True
+        return _shared
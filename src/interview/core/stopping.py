@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+
+from .feedback import _decision_from_counts
+
+# Последовательное правило остановки: после каждого хода перебираем все
+# исходы следующих `horizon` ответов и проверяем, может ли ещё измениться
+# решение _decision_from_counts. Если не может — интервью можно завершать.
+
+# на решение влияют только эти виды ответов (HALLUCINATION считается как WEAK),
+# остальные (NORMAL и т.п.) нейтральны
+_OUTCOMES = ("STRONG", "WEAK", "OFFTOPIC", "REFUSAL")
+
+
+def _futures(horizon: int) -> Iterator[Tuple[int, ...]]:
+    # добавки к счётчикам _OUTCOMES с суммой не больше horizon (остаток — нейтральные ответы)
+    def rec(i: int, left: int, acc: Tuple[int, ...]):
+        if i == len(_OUTCOMES):
+            yield acc
+            return
+        for n in range(left + 1):
+            yield from rec(i + 1, left - n, acc + (n,))
+
+    yield from rec(0, horizon, ())
+
+
+@lru_cache(maxsize=4096)
+def _settled(base: Tuple[int, ...], grade_hint: str, horizon: int, strict: bool) -> Optional[Tuple[str, str, int]]:
+    keys = _OUTCOMES + ("HALLUCINATION",)
+    now = _decision_from_counts(dict(zip(keys, base)), grade_hint)
+    for extra in _futures(horizon):
+        counts = dict(zip(keys, base))
+        for k, n in zip(_OUTCOMES, extra):
+            counts[k] += n
+        future = _decision_from_counts(counts, grade_hint)
+        if future[1] != now[1] or (strict and future[2] != now[2]):
+            return None
+    return now
+
+
+def settled_decision(
+    counts: Dict[str, int],
+    grade_hint: str,
+    horizon: int,
+    strict: bool = False,
+) -> Optional[Tuple[str, str, int]]:
+    """
+    Решение (grade, recommendation, confidence), если никакие `horizon`
+    следующих ответов его не изменят, иначе None. strict=True требует,
+    чтобы не менялась и уверенность, а не только рекомендация.
+    """
+    base = tuple(int(counts.get(k, 0)) for k in _OUTCOMES + ("HALLUCINATION",))
+    return _settled(base, grade_hint or "", max(0, horizon), strict)
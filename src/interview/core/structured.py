@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Структурированный вывод LLM: сканер сбалансированных скобок вместо
+# жадного \{.*\}, локальный ремонт типичных дефектов и проверка по схеме.
+
+
+def scan_json_object(text: str) -> Optional[str]:
+    """Первый JSON-объект в тексте; для оборванного ответа — хвост от '{' (дочинит repair)."""
+    if not text:
+        return None
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    in_str: Optional[str] = None
+    escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == in_str:
+                in_str = None
+            continue
+        if ch in "\"'":
+            in_str = ch
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S | re.I)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _outside_strings(s: str, fn) -> str:
+    # применяем fn только к кускам вне строковых литералов
+    out: List[str] = []
+    buf: List[str] = []
+    in_str = False
+    escape = False
+    for ch in s:
+        if in_str:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            out.append(fn("".join(buf)))
+            buf = []
+            out.append(ch)
+            in_str = True
+        else:
+            buf.append(ch)
+    out.append(fn("".join(buf)))
+    return "".join(out)
+
+
+def _close_brackets(s: str) -> str:
+    stack: List[str] = []
+    in_str = False
+    escape = False
+    for ch in s:
+        if in_str:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+    if in_str:
+        s += '"'
+    s = re.sub(r",\s*$", "", s.rstrip())
+    s = re.sub(r':\s*$', ": null", s)
+    return s + "".join(reversed(stack))
+
+
+def repair(text: str) -> str:
+    s = text.strip()
+    m = _FENCE_RE.search(s)
+    if m:
+        s = m.group(1)
+    s = s.replace("“", '"').replace("”", '"').replace("«", '"').replace("»", '"')
+    if '"' not in s and "'" in s:
+        s = s.replace("'", '"')
+    s = _outside_strings(s, lambda chunk: re.sub(r"\b(True|False|None)\b", lambda m: _PY_LITERALS[m.group(1)], chunk))
+    s = _close_brackets(s)
+    s = _outside_strings(s, lambda chunk: _TRAILING_COMMA_RE.sub(r"\1", chunk))
+    return s
+
+
+# Схемы: поле -> (тип, обязательное, допустимые значения)
+_KINDS_VERIFIER = ["STRONG", "NORMAL", "WEAK", "OFFTOPIC", "HALLUCINATION", "ROLE_REVERSAL", "REFUSAL"]
+_KINDS_OBSERVER = _KINDS_VERIFIER + ["NO_STACK"]
+
+SCHEMAS: Dict[str, Dict[str, Tuple[str, bool, Optional[List[str]]]]] = {
+    "verifier": {
+        "kind": ("enum", True, _KINDS_VERIFIER),
+        "confidence": ("int", True, None),
+        "reason": ("str", False, None),
+        "fact_check_notes": ("str", False, None),
+        "return_to_topic_text": ("str", False, None),
+        "need_followup": ("bool", False, None),
+        "followup_question": ("str", False, None),
+    },
+    "observer": {
+        "kind": ("enum", True, _KINDS_OBSERVER),
+        "reason": ("str", False, None),
+        "instruction": ("str", False, None),
+        "difficulty_action": ("enum", False, ["UP", "DOWN", "SAME"]),
+        "topic_hint": ("str", False, None),
+        "need_followup": ("bool", False, None),
+        "followup_question": ("str", False, None),
+        "fact_check_notes": ("str", False, None),
+        "return_to_topic_text": ("str", False, None),
+        "expected_answer_short": ("str", False, None),
+    },
+    "question_gen": {
+        "questions": ("list[str]", True, None),
+    },
+    "verifier_batch": {
+        "results": ("list", True, None),
+    },
+    "question_gen_batch": {
+        "topics": ("dict", True, None),
+    },
+    "reference": {
+        "answer": ("str", True, None),
+        "key_points": ("list[str]", False, None),
+    },
+}
+
+
+def _coerce(value: Any, typ: str, allowed: Optional[List[str]]) -> Tuple[Any, bool]:
+    if value is None:
+        return None, True
+    if typ == "enum":
+        v = str(value).strip().upper()
+        return (v, True) if v in (allowed or []) else (None, False)
+    if typ == "int":
+        if isinstance(value, bool):
+            return None, False
+        if isinstance(value, (int, float)):
+            return int(value), True
+        m = re.search(r"-?\d+", str(value))
+        return (int(m.group(0)), True) if m else (None, False)
+    if typ == "bool":
+        if isinstance(value, bool):
+            return value, True
+        v = str(value).strip().lower()
+        if v in {"true", "1", "yes", "да"}:
+            return True, True
+        if v in {"false", "0", "no", "нет", ""}:
+            return False, True
+        return None, False
+    if typ == "str":
+        return (value if isinstance(value, str) else str(value)), True
+    if typ == "list[str]":
+        if isinstance(value, list):
+            return [x for x in value if isinstance(x, str)], True
+        return None, False
+    if typ == "list":
+        return (value, True) if isinstance(value, list) else (None, False)
+    if typ == "dict":
+        return (value, True) if isinstance(value, dict) else (None, False)
+    return value, True
+
+
+def validate(data: Any, schema_name: str) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    if not isinstance(data, dict):
+        return None, ["not an object"]
+    schema = SCHEMAS[schema_name]
+    out = dict(data)
+    errors: List[str] = []
+    for key, (typ, required, allowed) in schema.items():
+        if key not in data or data[key] is None or data[key] == "":
+            if required:
+                errors.append(f"missing {key}")
+            continue
+        value, ok = _coerce(data[key], typ, allowed)
+        if not ok:
+            errors.append(f"bad {key}")
+            out.pop(key, None)
+        else:
+            out[key] = value
+    required = {k for k, (_, req, _) in schema.items() if req}
+    fatal = any(e.split(" ", 1)[1] in required for e in errors)
+    return (None if fatal else out), errors
+
+
+class ParseStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, schema_name: str, outcome: str):
+        with self._lock:
+            self.counts[schema_name]["total"] += 1
+            self.counts[schema_name][outcome] += 1
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            out: Dict[str, Dict[str, float]] = {}
+            for name, c in self.counts.items():
+                total = c.get("total", 0) or 1
+                out[name] = dict(c)
+                out[name]["failure_rate"] = round((c.get("unparsable", 0) + c.get("invalid", 0)) / total, 4)
+            return out
+
+
+# счётчики общие на процесс: батчер верификатора разбирает ответы сразу нескольких сессий,
+# поэтому долю неразобранных ответов отчитывает loadgen, а не лог отдельной сессии
+PARSE_STATS = ParseStats()
+
+
+def loads_lenient(text: str) -> Tuple[Optional[Any], bool]:
+    """(данные, был ли нужен ремонт)."""
+    if not text:
+        return None, False
+    candidate = scan_json_object(text)
+    if candidate is None:
+        return None, False
+    try:
+        return json.loads(candidate), False
+    except Exception:
+        pass
+    try:
+        return json.loads(repair(candidate)), True
+    except Exception:
+        return None, True
+
+
+def parse_structured(raw: Optional[str], schema_name: str) -> Optional[Dict[str, Any]]:
+    data, repaired = loads_lenient(raw or "")
+    if data is None:
+        PARSE_STATS.add(schema_name, "unparsable")
+        return None
+    valid, _ = validate(data, schema_name)
+    if valid is None:
+        PARSE_STATS.add(schema_name, "invalid")
+        return None
+    PARSE_STATS.add(schema_name, "repaired" if repaired else "ok")
+    return valid
+
+
+def parse_stats() -> Dict[str, Dict[str, float]]:
+    return PARSE_STATS.report()
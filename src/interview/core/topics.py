@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from typing import List, Dict, Optional, Tuple
 
-from .prompts import QUESTION_GEN_SYSTEM, QUESTION_GEN_USER_TEMPLATE
-from .utils import safe_json
+from .prompts import QUESTION_GEN_SYSTEM, QUESTION_GEN_USER_TEMPLATE, QUESTION_GEN_TURN_TEMPLATE
+from .prompts import QUESTION_GEN_BATCH_SYSTEM, QUESTION_GEN_BATCH_USER_TEMPLATE
+from .structured import parse_structured
+from ..llm.base import LLMUnavailable
+from .deadline import call_with_deadline
+from .conversation import ask
 
 
 # словарь
@@ -193,28 +199,53 @@ GENERIC: Dict[str, List[str]] = {
 }
 
 
-def _norm_text(text: str) -> str:
-    t = (text or "").lower()
+_vocab_re: Optional["re.Pattern[str]"] = None
+_alias_map: Dict[str, List[str]] = {}
+
+
+_BOUNDARY = "a-zа-я0-9_"
+
+
+def _vocab_matcher() -> "re.Pattern[str]":
+    # один общий regex вместо отдельного поиска по каждому алиасу; собирается
+    # лениво, при первом разборе ответа, а не при импорте
+    global _vocab_re, _alias_map
+    if _vocab_re is None:
+        alias_map: Dict[str, List[str]] = {}
+        for canonical, aliases in VOCAB_ALIASES.items():
+            for a in aliases:
+                alias_map.setdefault(a, [])
+                if canonical not in alias_map[a]:
+                    alias_map[a].append(canonical)
+        # длинные алиасы первыми, чтобы альтернатива не останавливалась на префиксе
+        alts = "|".join(re.escape(a) for a in sorted(alias_map, key=len, reverse=True))
+        _alias_map = alias_map
+        _vocab_re = re.compile(rf"(?<![{_BOUNDARY}])({alts})(?![{_BOUNDARY}])")
+    return _vocab_re
+
+
+def _norm_text(text: str, lowered: Optional[str] = None) -> str:
+    t = (text or "").lower() if lowered is None else lowered
     # normalize common aliases quickly
     t = t.replace("postgresql", "postgres")
     return t
 
 
-def extract_tech_stack(text: str) -> List[str]:
-
-    t = _norm_text(text)
+def extract_tech_stack(text: str, lowered: Optional[str] = None) -> List[str]:
+    # lowered — text.lower(), если он уже посчитан (AnalyzedMessage)
+    t = _norm_text(text, lowered)
     found: List[str] = []
 
     def add(x: str):
         if x not in found:
             found.append(x)
 
-
-    for canonical, aliases in VOCAB_ALIASES.items():
-        for a in aliases:
-            if re.search(rf"(^|[^a-zа-я0-9_]){re.escape(a)}([^a-zа-я0-9_]|$)", t):
-                add(canonical)
-                break
+    hits = set()
+    for m in _vocab_matcher().finditer(t):
+        hits.update(_alias_map[m.group(1)])
+    for canonical in VOCAB_ALIASES:
+        if canonical in hits:
+            add(canonical)
 
 
     if ("postgres" in found or "mysql" in found) and "sql" not in found:
@@ -247,19 +278,100 @@ def _topic_candidates(mem) -> List[str]:
     return cands
 
 
-def _ensure_generated(mem, topic: str, difficulty: str) -> None:
+def _unasked_count(questions: List[str], asked: List[str]) -> int:
+    return sum(1 for q in questions if q not in asked)
+
+
+# пул (topic, difficulty) пополняют и ход, и фоновые дозаправки, и опоздавшие ответы
+_pool_lock = threading.Lock()
+
+
+def _merge_generated(mem, topic: str, difficulty: str, questions: List[str]) -> List[str]:
+    # новые вопросы дописываются в конец пула: ещё не заданные не пропадают
+    with _pool_lock:
+        pool = mem.generated_questions.setdefault(topic, {}).setdefault(difficulty, [])
+        pool.extend(q for q in questions if q not in pool)
+        return list(pool)
+
+
+def _ensure_generated(
+    mem,
+    topic: str,
+    difficulty: str,
+    background: bool = False,
+    asked: Optional[List[str]] = None,
+    watermark: int = 0,
+) -> None:
+    """
+    Догенерировать вопросы (topic, difficulty), если неиспользованных сгенерированных
+    осталось не больше watermark (для хода — 0: только когда пул пуст).
+    background=True — фоновая дозаправка: без бюджета хода и без пометки деградации.
+    asked — снимок заданных вопросов: фоновый поток не читает список, который меняет ход,
+    и текст запроса (и ключ кассеты) не зависит от того, когда поток проснулся.
+    """
+    if background and getattr(mem, "closed", False):
+        return  # сессия завершена — пул больше не нужен
+    asked = list(mem.asked_questions) if asked is None else asked
     if not hasattr(mem, "generated_questions"):
         mem.generated_questions = {}
     if topic not in mem.generated_questions:
         mem.generated_questions[topic] = {}
-    if difficulty in mem.generated_questions[topic] and mem.generated_questions[topic][difficulty]:
+
+    def enough() -> bool:
+        return _unasked_count(mem.generated_questions[topic].get(difficulty) or [], asked) > watermark
+
+    if enough():
         return
+    deadline = None if background else getattr(mem, "deadline", None)
+
+    def degrade():
+        mem.generated_questions[topic].setdefault(difficulty, [])
+        if not background and hasattr(mem, "mark_degraded"):
+            mem.mark_degraded("question_gen")
+
+    # пакетная генерация после first_message ещё идёт — ждём её, а не делаем отдельный запрос
+    pending = getattr(mem, "pending_generation", None)
+    if pending is not None and (topic, difficulty) in getattr(pending, "pairs", ()) and not pending.done():
+        try:
+            pending.result(timeout=max(0.0, deadline.remaining()) if deadline else None)
+        except FutureTimeout:
+            # пакет дольёт пулы в фоне, а этот ход обойдётся банком вопросов
+            degrade()
+            return
+        except Exception:
+            pass
+        if enough():
+            return
+
+    # фоновая дозаправка этой пары уже идёт — ждём её, а не шлём второй такой же запрос;
+    # ещё не начавшуюся снимаем и генерируем сами
+    refill = None if background else getattr(mem, "refills", {}).get((topic, difficulty))
+    if refill is not None and not refill.cancel() and not refill.done():
+        try:
+            refill.result(timeout=max(0.0, deadline.remaining()) if deadline else None)
+        except FutureTimeout:
+            degrade()
+            return
+        except Exception:
+            pass
+        if enough():
+            return
+
+    # общий между процессами пул уже сгенерированных вопросов (см. interview.workers)
+    shared = getattr(mem, "shared_pool", None)
+    key = f"{topic}/{difficulty}"
+    if shared is not None:
+        cached = [q for q in shared.get(key, []) if q not in asked]
+        if cached:
+            _merge_generated(mem, topic, difficulty, cached)
+            if enough():
+                return
 
     if not mem.llm:
-        mem.generated_questions[topic][difficulty] = []
+        mem.generated_questions[topic].setdefault(difficulty, [])
         return
 
-    already = "\n".join(mem.asked_questions[-25:]) or "-"
+    already = "\n".join(asked[-25:]) or "-"
     user = QUESTION_GEN_USER_TEMPLATE.format(
         topic=topic,
         difficulty=difficulty,
@@ -268,10 +380,40 @@ def _ensure_generated(mem, topic: str, difficulty: str) -> None:
         experience=mem.experience,
         already_asked=already,
     )
-    raw = mem.llm.generate(QUESTION_GEN_SYSTEM, user, temperature=0.4)
-    data = safe_json(raw) or {}
-    qs = data.get("questions", [])
+    def _store(raw: str):
+        out = _parse_generated(raw, asked)
+        pool = _merge_generated(mem, topic, difficulty, out)
+        if shared is not None and out:
+            shared[key] = pool
+
+    try:
+        # опоздавшая генерация не пропадает: дописывает пул в фоне для следующих ходов
+        if getattr(mem, "conversations", None) is not None:
+            # запросы независимы: общий только префикс с профилем, историю не копим
+            raw = ask(
+                mem.llm, mem, "question_gen", QUESTION_GEN_SYSTEM,
+                QUESTION_GEN_TURN_TEMPLATE.format(topic=topic, difficulty=difficulty, already_asked=already),
+                temperature=0.4, remember=False, on_late=_store, deadline=deadline,
+            )
+        else:
+            raw = call_with_deadline(
+                deadline,
+                mem.llm.generate, QUESTION_GEN_SYSTEM, user, temperature=0.4, json_mode=True,
+                on_late=_store,
+            )
+    except LLMUnavailable:
+        # квота занята или ход не укладывается в бюджет — остаёмся на банке вопросов
+        degrade()
+        return
+    _store(raw)
+
 
+def _parse_generated(raw: str, asked: List[str]) -> List[str]:
+    data = parse_structured(raw, "question_gen") or {}
+    return _clean_questions(data.get("questions", []), asked)
+
+
+def _clean_questions(qs, asked: List[str]) -> List[str]:
     out: List[str] = []
     if isinstance(qs, list):
         for q in qs:
@@ -279,28 +421,176 @@ def _ensure_generated(mem, topic: str, difficulty: str) -> None:
                 q = re.sub(r"\s+", " ", q).strip()
                 if q and not q.endswith("?"):
                     q += "?"
-                if q and q not in out and q not in mem.asked_questions:
+                if q and q not in out and q not in asked:
                     out.append(q[:180])
+    return out
+
 
-    mem.generated_questions[topic][difficulty] = out
+DIFFICULTIES = ("easy", "medium", "hard")
 
+_prefetch_executor: Optional[ThreadPoolExecutor] = None
 
-def pick_next_question(mem, topic_hint: Optional[str] = None, force_difficulty: Optional[str] = None) -> Tuple[str, Optional[str], str]:
+
+def _prefetch_pool() -> ThreadPoolExecutor:
+    global _prefetch_executor
+    if _prefetch_executor is None:
+        _prefetch_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="question-prefetch")
+    return _prefetch_executor
+
+
+def prefetch_questions(mem) -> Optional[Future]:
+    """
+    Один LLM-запрос на все темы кандидата и все уровни сложности сразу.
+    Выполняется в фоне; пулы generated_questions (и общий пул воркеров)
+    заполняются по готовности, _ensure_generated дожидается результата.
+    """
+    if not mem.llm:
+        return None
+    if not hasattr(mem, "generated_questions"):
+        mem.generated_questions = {}
+    shared = getattr(mem, "shared_pool", None)
+
+    pairs = [
+        (t, d)
+        for t in _topic_candidates(mem)
+        for d in DIFFICULTIES
+        if not mem.generated_questions.get(t, {}).get(d) and not (shared is not None and shared.get(f"{t}/{d}"))
+    ]
+    if not pairs:
+        return None
+
+    user = QUESTION_GEN_BATCH_USER_TEMPLATE.format(
+        requested="\n".join(f"- {t}: {d}" for t, d in pairs),
+        position=mem.position,
+        grade=mem.grade,
+        experience=mem.experience,
+        already_asked="\n".join(mem.asked_questions[-25:]) or "-",
+    )
+    asked = list(mem.asked_questions)
+
+    def run() -> int:
+        raw = mem.llm.generate(QUESTION_GEN_BATCH_SYSTEM, user, temperature=0.4, json_mode=True)
+        topics = (parse_structured(raw, "question_gen_batch") or {}).get("topics") or {}
+        filled = 0
+        for t, d in pairs:
+            by_level = topics.get(t)
+            out = _clean_questions(by_level.get(d) if isinstance(by_level, dict) else None, asked)
+            if not out:
+                continue
+            pool = _merge_generated(mem, t, d, out)
+            if shared is not None:
+                shared[f"{t}/{d}"] = pool
+            filled += 1
+        return filled
+
+    future = _prefetch_pool().submit(run)
+    future.pairs = set(pairs)
+    mem.pending_generation = future
+    return future
+
+
+REFILL_WATERMARK = 2
+
+
+def _refill_async(mem, topic: str, difficulty: str, watermark: int = REFILL_WATERMARK) -> None:
+    # дозаправки пары (topic, difficulty) идут по очереди: следующая ждёт предыдущую и
+    # не делает запрос, если та уже пополнила пул. Набор запросов не зависит от того,
+    # успела ли предыдущая закончиться к этому ходу, — кассета воспроизводится
+    if getattr(mem, "closed", False):
+        return
+    previous = mem.refills.get((topic, difficulty))
+    asked = list(mem.asked_questions)
+
+    def run() -> None:
+        if previous is not None:
+            try:
+                previous.result()
+            except Exception:
+                pass  # фоновая дозаправка: ошибку предыдущей здесь не поднимаем
+        _ensure_generated(mem, topic, difficulty, True, asked, watermark)
+
+    mem.refills[(topic, difficulty)] = _prefetch_pool().submit(run)
+
+
+def schedule_refills(mem) -> None:
+    """
+    Запустить дозаправки, которые запросил pick_next_question. Вызывается после
+    remember_question: снимок заданных вопросов уже включает только что выбранный.
+    """
+    wanted, mem.refill_wanted = mem.refill_wanted, []
+    for topic, difficulty, watermark in wanted:
+        _refill_async(mem, topic, difficulty, watermark)
+
+
+def cancel_refills(mem) -> None:
+    # сессия завершена: новые дозаправки не ставим, ещё не начавшиеся снимаем
+    mem.closed = True
+    mem.refill_wanted = []
+    for f in mem.refills.values():
+        f.cancel()
+
+
+def _generate_concurrently(mem, pairs: List[Tuple[str, str]]) -> None:
+    # исчерпаны все темы — генерируем их параллельно, а не по очереди
+    # недоступный LLM каждая генерация обрабатывает сама (degrade); прочие ошибки —
+    # как и при одной теме: ход помечается деградировавшим, исключение поднимается
+    asked = list(mem.asked_questions)
+    if len(pairs) == 1:
+        try:
+            _ensure_generated(mem, *pairs[0], asked=asked)
+        except Exception:
+            mem.mark_degraded("question_gen")
+            raise
+        return
+    futures = [_prefetch_pool().submit(_ensure_generated, mem, t, d, False, asked) for t, d in pairs]
+    error: Optional[BaseException] = None
+    for f in futures:
+        try:
+            f.result()
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        mem.mark_degraded("question_gen")
+        raise error
+
+
+def _first_unasked(mem, topic: str, difficulty: str) -> Tuple[Optional[str], int]:
+    bank = QUESTION_BANK.get(topic, {}).get(difficulty, [])
+    gen = list(getattr(mem, "generated_questions", {}).get(topic, {}).get(difficulty, []))
+    pool = [q for q in (bank + gen) if q and q not in mem.asked_questions]
+    return (pool[0] if pool else None), len(pool)
+
+
+def pick_next_question(
+    mem,
+    topic_hint: Optional[str] = None,
+    force_difficulty: Optional[str] = None,
+    refill_watermark: int = REFILL_WATERMARK,
+) -> Tuple[str, Optional[str], str]:
     difficulty = force_difficulty or mem.difficulty
     candidates = _topic_candidates(mem)
 
     if topic_hint and topic_hint in TOPICS:
         candidates = [topic_hint] + [c for c in candidates if c != topic_hint]
 
+    # LLM не на критическом пути, пока в банке есть вопросы: дозаправка — заранее и в фоне
     for topic in candidates:
-        _ensure_generated(mem, topic, difficulty)
-
-        bank = QUESTION_BANK.get(topic, {}).get(difficulty, [])
-        gen = getattr(mem, "generated_questions", {}).get(topic, {}).get(difficulty, [])
-
-        pool = [q for q in (bank + gen) if q and q not in mem.asked_questions]
-        if pool:
-            return pool[0], topic, "bank/gen"
+        q, left = _first_unasked(mem, topic, difficulty)
+        # до исчерпания пары осталось не больше порога. Сама дозаправка решает по запасу
+        # сгенерированных (не больше того же порога) и дописывает пул; запускает её
+        # schedule_refills — после того, как вопрос записан
+        wanted = {(t, d) for t, d, _ in mem.refill_wanted}
+        if q and mem.llm and left <= refill_watermark and (topic, difficulty) not in wanted:
+            mem.refill_wanted.append((topic, difficulty, refill_watermark))
+        if q:
+            return q, topic, "bank/gen"
+
+    if mem.llm:
+        _generate_concurrently(mem, [(t, difficulty) for t in candidates])
+        for topic in candidates:
+            q, _ = _first_unasked(mem, topic, difficulty)
+            if q:
+                return q, topic, "bank/gen"
 
     g = GENERIC.get(difficulty) or GENERIC["easy"]
     for q in g:
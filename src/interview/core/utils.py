@@ -1,8 +1,9 @@
 from __future__ import annotations
-import json
 import re
 from typing import Optional, Dict, Any
 
+from .structured import loads_lenient
+
 def one_sentence(text: Optional[str]) -> Optional[str]:
     if not text:
         return None
@@ -29,13 +30,6 @@ def one_question(text: Optional[str]) -> Optional[str]:
     return x
 
 def safe_json(text: str) -> Optional[Dict[str, Any]]:
-    if not text:
-        return None
-    s = text.strip()
-    m = re.search(r"\{.*\}", s, flags=re.S)
-    if m:
-        s = m.group(0)
-    try:
-        return json.loads(s)
-    except Exception:
-        return None
+    # первый сбалансированный объект + локальный ремонт (см. core.structured)
+    data, _ = loads_lenient(text or "")
+    return data if isinstance(data, dict) else None
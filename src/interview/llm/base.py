@@ -1,7 +1,50 @@
 from __future__ import annotations
+
+import threading
 from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+
+class LLMUnavailable(RuntimeError):
+    """LLM сейчас недоступен (перегрузка, лимиты и т.п.) — вызывающий откатывается на правила."""
+
+
+Message = Dict[str, str]
+
+
+def flatten_messages(messages: List[Message]) -> Tuple[str, str]:
+    # для бэкендов без нативного multi-turn: system отдельно, остальное — одним user
+    system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+    rest = [m for m in messages if m["role"] != "system"]
+    if len(rest) == 1:
+        return system, rest[0]["content"]
+    return system, "\n\n".join(f"[{m['role']}]\n{m['content']}" for m in rest)
+
+
+_usage = threading.local()
+
+
+def report_usage(prompt_tokens: int, completion_tokens: int = 0, cached_tokens: int = 0) -> None:
+    # бэкенд сообщает расход токенов последнего вызова в текущем потоке
+    _usage.last = {
+        "prompt_tokens": int(prompt_tokens or 0),
+        "completion_tokens": int(completion_tokens or 0),
+        "cached_tokens": int(cached_tokens or 0),
+    }
+
+
+def take_usage() -> Optional[Dict[str, int]]:
+    last = getattr(_usage, "last", None)
+    _usage.last = None
+    return last
+
 
 class BaseLLM(ABC):
     @abstractmethod
-    def generate(self, system: str, user: str, temperature: float = 0.3) -> str:
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
         raise NotImplementedError
+
+    def chat(self, messages: List[Message], temperature: float = 0.3, json_mode: bool = False) -> str:
+        # по умолчанию история склеивается в один запрос; нативный multi-turn — в наследниках
+        system, user = flatten_messages(messages)
+        return self.generate(system, user, temperature=temperature, json_mode=json_mode)
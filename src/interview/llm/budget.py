@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from .base import BaseLLM, LLMUnavailable, Message, flatten_messages, report_usage, take_usage
+
+# Бюджеты LLM: на сессию и на тенанта (вызовы, входные/выходные токены,
+# оценка стоимости). Исчерпанный бюджет — это LLMUnavailable: вызывающие
+# и так умеют откатываться на правила и статический банк вопросов.
+
+
+class LLMBudgetExceeded(LLMUnavailable):
+    """Бюджет сессии или тенанта на LLM исчерпан."""
+
+
+@dataclass
+class Budget:
+    # 0 — без ограничения
+    max_calls: int = 0
+    max_input_tokens: int = 0
+    max_output_tokens: int = 0
+    max_cost: float = 0.0
+
+    def violation(self, usage: "Usage", next_input: int = 0) -> Optional[str]:
+        # что будет превышено следующим вызовом с next_input входных токенов
+        if self.max_calls and usage.calls >= self.max_calls:
+            return "calls"
+        if self.max_input_tokens and usage.input_tokens + next_input > self.max_input_tokens:
+            return "input_tokens"
+        if self.max_output_tokens and usage.output_tokens >= self.max_output_tokens:
+            return "output_tokens"
+        if self.max_cost and usage.cost >= self.max_cost:
+            return "cost"
+        return None
+
+
+@dataclass
+class Pricing:
+    # цена за миллион токенов; закешированный префикс обычно дешевле
+    input_per_mtok: float = 0.0
+    cached_per_mtok: float = 0.0
+    output_per_mtok: float = 0.0
+
+    def cost(self, input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+        fresh = max(0, input_tokens - cached_tokens)
+        return (
+            fresh * self.input_per_mtok
+            + cached_tokens * self.cached_per_mtok
+            + output_tokens * self.output_per_mtok
+        ) / 1e6
+
+
+@dataclass
+class Usage:
+    calls: int = 0
+    errors: int = 0
+    rejected: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    estimated_tokens: int = 0   # вызовы, где провайдер не сообщил расход: токены ≈ символы / 4
+    cost: float = 0.0
+
+    def add(self, input_tokens: int, cached_tokens: int, output_tokens: int, cost: float) -> None:
+        self.input_tokens += input_tokens
+        self.cached_tokens += cached_tokens
+        self.output_tokens += output_tokens
+        self.cost += cost
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "output_tokens": self.output_tokens,
+            "estimated_tokens": self.estimated_tokens,
+            "cost": round(self.cost, 6),
+        }
+
+
+def _estimate_tokens(chars: int) -> int:
+    return chars // 4
+
+
+class TenantLedger:
+    """Расход тенантов за окно window_s (фиксированное окно, сброс по истечении)."""
+
+    def __init__(self, budget: Budget, window_s: float = 86400.0):
+        self.budget = budget
+        self.window_s = window_s
+        self._usage: Dict[str, Usage] = {}
+        self._started: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _current(self, tenant: str) -> Usage:
+        now = time.monotonic()
+        if tenant not in self._usage or now - self._started[tenant] >= self.window_s:
+            self._usage[tenant] = Usage()
+            self._started[tenant] = now
+        return self._usage[tenant]
+
+    def admit(self, tenant: str, next_input: int = 0) -> Optional[str]:
+        # проверка и учёт вызова атомарно: параллельные сессии тенанта не проскочат лимит
+        with self._lock:
+            usage = self._current(tenant)
+            reason = self.budget.violation(usage, next_input)
+            if reason is None:
+                usage.calls += 1
+            else:
+                usage.rejected += 1
+            return reason
+
+    def record(self, tenant: str, fn: Callable[[Usage], None]) -> None:
+        with self._lock:
+            fn(self._current(tenant))
+
+    def usage(self, tenant: str) -> Dict[str, Any]:
+        with self._lock:
+            return self._current(tenant).to_dict()
+
+
+class BudgetedLLM(BaseLLM):
+    """
+    Считает расход одной сессии (и её тенанта в общем ledger) и отказывает,
+    когда бюджет исчерпан. Первый отказ запоминается в exhausted — дальше
+    сессия работает на правилах и статическом банке без обращений к LLM.
+    """
+
+    def __init__(
+        self,
+        inner: BaseLLM,
+        budget: Budget,
+        pricing: Optional[Pricing] = None,
+        tenant: str = "default",
+        ledger: Optional[TenantLedger] = None,
+    ):
+        self.inner = inner
+        self.budget = budget
+        self.pricing = pricing or Pricing()
+        self.tenant = tenant
+        self.ledger = ledger
+        self.usage = Usage()
+        self.exhausted: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _admit(self, next_input: int) -> None:
+        with self._lock:
+            reason = self.exhausted or self.budget.violation(self.usage, next_input)
+            if reason is None and self.ledger is not None:
+                tenant_reason = self.ledger.admit(self.tenant, next_input)
+                reason = f"tenant {tenant_reason}" if tenant_reason else None
+            if reason is not None:
+                self.usage.rejected += 1
+                if self.exhausted is None:
+                    self.exhausted = reason
+                raise LLMBudgetExceeded(f"LLM budget exhausted: {reason}")
+            self.usage.calls += 1
+
+    def _charge(self, prompt_chars: int, out_chars: Optional[int], usage: Optional[Dict[str, int]]) -> None:
+        # out_chars=None — вызов упал
+        if usage:
+            inp, cached, outp = usage["prompt_tokens"], usage["cached_tokens"], usage["completion_tokens"]
+            estimated = 0
+        elif out_chars is None:
+            # ошибка без отчёта о расходе (таймаут, отказ планировщика) — токены не списываем
+            inp = cached = outp = estimated = 0
+        else:
+            inp, cached, outp = _estimate_tokens(prompt_chars), 0, _estimate_tokens(out_chars)
+            estimated = inp + outp
+        cost = self.pricing.cost(inp, cached, outp)
+
+        def add(u: Usage) -> None:
+            u.add(inp, cached, outp, cost)
+            u.estimated_tokens += estimated
+            if out_chars is None:
+                u.errors += 1
+
+        with self._lock:
+            add(self.usage)
+        if self.ledger is not None:
+            self.ledger.record(self.tenant, add)
+
+    def guard(self, system: str, user: str, call: Callable[[], Any]) -> Any:
+        """
+        Пропускает вызов call через бюджет. Нужен и для вызовов мимо generate/chat
+        (например, общий батчер Verifier — он сообщает долю пакета через
+        report_usage в потоке сессии); без отчёта расход оценивается по длине текста.
+        """
+        prompt_chars = len(system) + len(user)
+        self._admit(_estimate_tokens(prompt_chars))
+        take_usage()
+        try:
+            out = call()
+        except Exception:
+            self._charge(prompt_chars, None, take_usage())
+            raise
+        usage = take_usage()
+        self._charge(prompt_chars, len(out if isinstance(out, str) else str(out)), usage)
+        if usage:
+            report_usage(usage["prompt_tokens"], usage["completion_tokens"], usage["cached_tokens"])
+        return out
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        return self.guard(
+            system, user,
+            lambda: self.inner.generate(system, user, temperature=temperature, json_mode=json_mode),
+        )
+
+    def chat(self, messages: List[Message], temperature: float = 0.3, json_mode: bool = False) -> str:
+        system, user = flatten_messages(messages)
+        return self.guard(
+            system, user,
+            lambda: self.inner.chat(messages, temperature=temperature, json_mode=json_mode),
+        )
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = self.usage.to_dict()
+        out["tenant"] = self.tenant
+        out["exhausted"] = self.exhausted
+        if self.ledger is not None:
+            out["tenant_usage"] = self.ledger.usage(self.tenant)
+        return out
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ..core.prompts import prompt_kind
+from .base import BaseLLM, LLMUnavailable, Message, flatten_messages
+
+# Кассеты LLM: RecordingLLM пишет каждый вызов (промпты, температура,
+# ответ или ошибка, задержка) строкой JSONL, ReplayLLM отдаёт их обратно
+# без сети. Первая строка кассеты — заголовок с параметрами сессии.
+
+
+class CassetteMiss(LLMUnavailable):
+    """В кассете нет ответа на такой запрос."""
+
+
+def cassette_key(system: str, user: str, temperature: float, json_mode: bool) -> str:
+    h = hashlib.sha1()
+    for part in (system, user, repr(float(temperature)), "json" if json_mode else "text"):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class RecordingLLM(BaseLLM):
+    def __init__(self, inner: BaseLLM, path: str, header: Optional[Dict[str, Any]] = None):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._write({"cassette": 1, "header": header or {}})
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        return self._record(
+            system, user, temperature, json_mode,
+            lambda: self.inner.generate(system, user, temperature=temperature, json_mode=json_mode),
+        )
+
+    def chat(self, messages: List[Message], temperature: float = 0.3, json_mode: bool = False) -> str:
+        # ключ — по склеенной истории: ReplayLLM.chat склеивает её так же
+        system, user = flatten_messages(messages)
+        return self._record(
+            system, user, temperature, json_mode,
+            lambda: self.inner.chat(messages, temperature=temperature, json_mode=json_mode),
+        )
+
+    def _record(self, system: str, user: str, temperature: float, json_mode: bool, call) -> str:
+        started = time.perf_counter()
+        entry: Dict[str, Any] = {
+            "key": cassette_key(system, user, temperature, json_mode),
+            "kind": prompt_kind(system),
+            "at_ms": round((started - self._t0) * 1000.0, 1),
+            "system": system,
+            "user": user,
+            "temperature": temperature,
+            "json_mode": json_mode,
+        }
+        try:
+            out = call()
+            entry["response"] = out
+            return out
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            entry["unavailable"] = isinstance(e, LLMUnavailable)
+            raise
+        finally:
+            entry["latency_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+            self._write(entry)
+
+
+def read_cassette(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    header: Dict[str, Any] = {}
+    entries: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "cassette" in item:
+                header = item.get("header") or {}
+            else:
+                entries.append(item)
+    return header, entries
+
+
+class ReplayLLM(BaseLLM):
+    """
+    Отдаёт записанные ответы по ключу (system, user, temperature, json_mode)
+    в исходном порядке. replay_latency=True воспроизводит и задержки.
+    strict=False при исчерпании повторяет последний ответ на этот ключ.
+    """
+
+    def __init__(self, path: str, replay_latency: bool = False, strict: bool = True):
+        self.path = path
+        self.replay_latency = replay_latency
+        self.strict = strict
+        self.header, entries = read_cassette(path)
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._last: Dict[str, Dict[str, Any]] = {}
+        for e in entries:
+            self._queues[e["key"]].append(e)
+        self.served = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        key = cassette_key(system, user, temperature, json_mode)
+        with self._lock:
+            q = self._queues.get(key)
+            if q:
+                entry = self._last[key] = q.popleft()
+            elif not self.strict and key in self._last:
+                entry = self._last[key]
+            else:
+                self.misses += 1
+                raise CassetteMiss(f"no recorded response for {prompt_kind(system)} prompt")
+            self.served += 1
+
+        if self.replay_latency:
+            time.sleep(float(entry.get("latency_ms") or 0.0) / 1000.0)
+        if "error" in entry:
+            if entry.get("unavailable"):
+                raise LLMUnavailable(entry["error"])
+            raise RuntimeError(entry["error"])
+        return entry["response"]
+
+    def remaining(self) -> int:
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
@@ -3,7 +3,7 @@ from .base import BaseLLM
 
 class DummyLLM(BaseLLM):
 
-    def generate(self, system: str, user: str, temperature: float = 0.3) -> str:
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
         # Возвращаем JSON-ответы для Observer и генератора вопросов
         u = (user or "").lower()
 
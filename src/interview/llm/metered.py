@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import List
+
+from .base import BaseLLM, Message
+
+
+class MeteredLLM(BaseLLM):
+    """Считает вызовы, ошибки и суммарную задержку обёрнутого бэкенда."""
+
+    def __init__(self, inner: BaseLLM):
+        self.inner = inner
+        self.calls = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self._lock = threading.Lock()
+
+    def _metered(self, fn, *args, **kwargs) -> str:
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.calls += 1
+                self.latency_total += time.perf_counter() - t0
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        return self._metered(self.inner.generate, system, user, temperature=temperature, json_mode=json_mode)
+
+    def chat(self, messages: List[Message], temperature: float = 0.3, json_mode: bool = False) -> str:
+        return self._metered(self.inner.chat, messages, temperature=temperature, json_mode=json_mode)
@@ -1,19 +1,49 @@
 from __future__ import annotations
-from .base import BaseLLM
+
+from typing import List
+
+from .base import BaseLLM, Message, report_usage
+
+
+def _cached_tokens(usage) -> int:
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", 0) or 0
+
 
 class MistralLLM(BaseLLM):
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, server_url: str = ""):
         from mistralai import Mistral
-        self.client = Mistral(api_key=api_key)
+        # server_url позволяет направить клиента на локальную заглушку (tools/llm_stub_server)
+        self.client = Mistral(api_key=api_key, server_url=server_url) if server_url else Mistral(api_key=api_key)
         self.model = model
 
-    def generate(self, system: str, user: str, temperature: float = 0.3) -> str:
+    def chat(self, messages: List[Message], temperature: float = 0.3, json_mode: bool = False) -> str:
+        kwargs = {}
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
         resp = self.client.chat.complete(
             model=self.model,
-            messages=[
+            messages=messages,
+            temperature=temperature,
+            **kwargs,
+        )
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            report_usage(
+                getattr(usage, "prompt_tokens", 0),
+                getattr(usage, "completion_tokens", 0),
+                _cached_tokens(usage),
+            )
+        return resp.choices[0].message.content.strip()
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        return self.chat(
+            [
                 {"role": "system", "content": system},
                 {"role": "user", "content": user},
             ],
             temperature=temperature,
+            json_mode=json_mode,
         )
-        return resp.choices[0].message.content.strip()
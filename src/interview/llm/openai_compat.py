@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+import urllib.request
+from typing import List
+
+from .base import BaseLLM, Message, report_usage
+
+
+class OpenAICompatLLM(BaseLLM):
+    """Любой OpenAI-совместимый /chat/completions (vLLM, llama.cpp server, Ollama и т.п.)."""
+
+    def __init__(self, base_url: str, model: str, api_key: str = "", timeout: float = 60.0):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def chat(self, messages: List[Message], temperature: float = 0.3, json_mode: bool = False) -> str:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        req = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            data = json.loads(resp.read().decode("utf-8"))
+        usage = data.get("usage") or {}
+        if usage:
+            report_usage(
+                usage.get("prompt_tokens", 0),
+                usage.get("completion_tokens", 0),
+                (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+            )
+        return (data["choices"][0]["message"]["content"] or "").strip()
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        return self.chat(
+            [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            temperature=temperature,
+            json_mode=json_mode,
+        )
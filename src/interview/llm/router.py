@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .base import BaseLLM, LLMUnavailable, Message, report_usage, take_usage
+from ..core.prompts import prompt_kind
+
+
+class BackendStats:
+    def __init__(self, window: int = 200):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.calls = 0
+        self.hedged_wins = 0
+        # входные токены: сколько из них провайдер взял из кеша префикса
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.calls += 1
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(latency)
+
+    def record_usage(self, usage: Dict[str, int]):
+        with self._lock:
+            self.input_tokens += usage.get("prompt_tokens", 0)
+            self.cached_tokens += usage.get("cached_tokens", 0)
+            self.output_tokens += usage.get("completion_tokens", 0)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.latencies:
+                return None
+            s = sorted(self.latencies)
+        return s[min(len(s) - 1, int(q * (len(s) - 1) + 0.5))]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+
+class RouterLLM(BaseLLM):
+    """
+    Роутер между несколькими бэкендами: выбирает бэкенд по типу промпта,
+    наблюдаемому p95 и доле ошибок; умеет hedged-запросы — если основной
+    бэкенд не ответил за свой перцентиль, параллельно спрашиваем следующий.
+    """
+
+    def __init__(
+        self,
+        backends: Dict[str, BaseLLM],
+        routes: Optional[Dict[str, List[str]]] = None,
+        hedge: bool = True,
+        hedge_percentile: float = 0.95,
+        hedge_min_ms: int = 200,
+        error_penalty: float = 4.0,
+        min_samples: int = 5,
+        failure_latency_s: float = 30.0,
+    ):
+        if not backends:
+            raise ValueError("router needs at least one backend")
+        self.backends = backends
+        self.routes = routes or {}
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min = hedge_min_ms / 1000.0
+        self.error_penalty = error_penalty
+        self.min_samples = min_samples
+        # «задержка» неудачного вызова для оценки: порядка таймаута клиента
+        self.failure_latency = failure_latency_s
+        self.stats: Dict[str, BackendStats] = {name: BackendStats() for name in backends}
+        self._pool = ThreadPoolExecutor(max_workers=max(4, 4 * len(backends)), thread_name_prefix="llm-router")
+
+    def _score(self, name: str) -> float:
+        st = self.stats[name]
+        if len(st.outcomes) < self.min_samples:
+            return 0.0  # мало данных — даём бэкенду шанс набрать статистику
+        # задержки копятся только по успешным вызовам; у бэкенда, который только падает,
+        # их нет — без подстановки p95 был бы 0 и он вечно шёл бы первым
+        p95 = st.percentile(0.95)
+        if p95 is None:
+            p95 = self.failure_latency
+        err = st.error_rate
+        return p95 * (1.0 + self.error_penalty * err) + err * self.failure_latency
+
+    def order(self, kind: str) -> List[str]:
+        names = [n for n in self.routes.get(kind, []) if n in self.backends] or list(self.backends)
+        # порядок из маршрута — тай-брейк при равных оценках
+        return sorted(names, key=lambda n: (self._score(n), names.index(n)))
+
+    def _call(self, name: str, invoke: Callable[[BaseLLM], str]) -> Tuple[str, Optional[Dict[str, int]]]:
+        t0 = time.perf_counter()
+        take_usage()
+        try:
+            out = invoke(self.backends[name])
+        except Exception:
+            self.stats[name].record(time.perf_counter() - t0, ok=False)
+            raise
+        self.stats[name].record(time.perf_counter() - t0, ok=True)
+        usage = take_usage()
+        if usage:
+            self.stats[name].record_usage(usage)
+        return out, usage
+
+    @staticmethod
+    def _settle(result: Tuple[str, Optional[Dict[str, int]]]) -> str:
+        # расход победившего вызова — снова в поток вызывающего: его читают внешние обёртки (бюджет)
+        out, usage = result
+        if usage:
+            report_usage(usage["prompt_tokens"], usage["completion_tokens"], usage["cached_tokens"])
+        return out
+
+    def _route(self, kind: str, invoke: Callable[[BaseLLM], str]) -> str:
+        names = self.order(kind)
+        last_error: Optional[BaseException] = None
+
+        i = 0
+        while i < len(names):
+            primary = names[i]
+            secondary = names[i + 1] if i + 1 < len(names) else None
+
+            if not (self.hedge and secondary):
+                try:
+                    return self._settle(self._call(primary, invoke))
+                except Exception as e:
+                    last_error = e
+                    i += 1
+                    continue
+
+            hedge_after = max(self.hedge_min, self.stats[primary].percentile(self.hedge_percentile) or 0.0)
+            futures = {self._pool.submit(self._call, primary, invoke): primary}
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                futures[self._pool.submit(self._call, secondary, invoke)] = secondary
+
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    if f.exception() is None:
+                        name = futures[f]
+                        if name != primary:
+                            self.stats[name].hedged_wins += 1
+                        return self._settle(f.result())
+                    last_error = f.exception()
+            # оба варианта упали — пробуем следующих по списку
+            i += 2 if len(futures) > 1 else 1
+
+        raise LLMUnavailable(f"all routed backends failed: {last_error!r}")
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        return self._route(
+            prompt_kind(system),
+            lambda llm: llm.generate(system, user, temperature=temperature, json_mode=json_mode),
+        )
+
+    def chat(self, messages: List[Message], temperature: float = 0.3, json_mode: bool = False) -> str:
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        return self._route(
+            prompt_kind(system),
+            lambda llm: llm.chat(messages, temperature=temperature, json_mode=json_mode),
+        )
+
+    def metrics(self) -> Dict[str, Dict[str, object]]:
+        out = {}
+        for name, st in self.stats.items():
+            p50, p95 = st.percentile(0.5), st.percentile(0.95)
+            out[name] = {
+                "calls": st.calls,
+                "error_rate": round(st.error_rate, 3),
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "hedged_wins": st.hedged_wins,
+                "input_tokens": st.input_tokens,
+                "cached_tokens": st.cached_tokens,
+                "output_tokens": st.output_tokens,
+                "cache_hit_rate": round(st.cached_tokens / st.input_tokens, 3) if st.input_tokens else None,
+            }
+        return out
+
+
+def parse_routes(spec: str) -> Dict[str, List[str]]:
+    # "verifier=mistral,local;question_gen=local,mistral"
+    routes: Dict[str, List[str]] = {}
+    for part in (spec or "").split(";"):
+        if "=" in part:
+            kind, _, names = part.partition("=")
+            routes[kind.strip()] = [n.strip() for n in names.split(",") if n.strip()]
+    return routes
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .base import BaseLLM, LLMUnavailable, Message
+from ..core.deadline import Deadline, DeadlineExceeded, current_deadline
+from ..core.prompts import prompt_kind
+
+# классы приоритета: меньше — важнее
+PRIORITY_INTERACTIVE = 0  # проверка ответа кандидата (Verifier)
+PRIORITY_FOLLOWUP = 1     # Observer / уточнения
+PRIORITY_BACKGROUND = 2   # генерация и префетч вопросов
+
+PRIORITY_BY_KIND = {
+    "verifier": PRIORITY_INTERACTIVE,
+    "observer": PRIORITY_FOLLOWUP,
+    "other": PRIORITY_FOLLOWUP,
+    "question_gen": PRIORITY_BACKGROUND,
+    "question_gen_batch": PRIORITY_BACKGROUND,
+    "reference": PRIORITY_BACKGROUND,
+}
+
+
+class LLMOverloaded(LLMUnavailable):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_to_token(self) -> float:
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tenant: str = ""
+
+
+class LLMScheduler:
+    """
+    Token bucket перед общей квотой LLM с очередью по приоритетам,
+    квотами на тенанта и сбросом нагрузки (load shedding), когда ожидаемое
+    ожидание в очереди превышает бюджет по latency.
+    """
+
+    def __init__(
+        self,
+        rate_per_sec: float,
+        burst: float = 1.0,
+        latency_budget_ms: int = 3000,
+        tenant_rate_per_sec: float = 0.0,
+        tenant_burst: float = 1.0,
+    ):
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.latency_budget = latency_budget_ms / 1000.0
+        self.tenant_rate = tenant_rate_per_sec
+        self.tenant_burst = tenant_burst
+        self.tenants: Dict[str, TokenBucket] = {}
+
+        self._cond = threading.Condition()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+
+        self.acquired: Dict[int, int] = defaultdict(int)
+        self.shed: Dict[int, int] = defaultdict(int)
+        self.wait_total: Dict[int, float] = defaultdict(float)
+        self.max_depth = 0
+
+    def _tenant_bucket(self, tenant: str) -> Optional[TokenBucket]:
+        if self.tenant_rate <= 0:
+            return None
+        if tenant not in self.tenants:
+            self.tenants[tenant] = TokenBucket(self.tenant_rate, self.tenant_burst)
+        return self.tenants[tenant]
+
+    def _estimated_wait(self, priority: int) -> float:
+        ahead = sum(1 for w in self._queue if w.priority <= priority)
+        return max(0.0, ahead + 1 - self.bucket.tokens) / self.bucket.rate
+
+    def _next_eligible(self) -> Optional[_Waiter]:
+        for w in sorted(self._queue):
+            tb = self.tenants.get(w.tenant)
+            if tb is None or tb.tokens >= 1.0:
+                return w
+        return None
+
+    def acquire(self, priority: int, tenant: str = "default", deadline: Optional[Deadline] = None) -> float:
+        # deadline — бюджет хода вызывающего: после него токен уже не нужен, ждать бросаем
+        with self._cond:
+            now = time.monotonic()
+            self.bucket.refill(now)
+            if deadline is not None and deadline.expired:
+                self.shed[priority] += 1
+                raise DeadlineExceeded("turn budget spent before an LLM token was granted")
+            if self._estimated_wait(priority) > self.latency_budget:
+                self.shed[priority] += 1
+                raise LLMOverloaded("LLM queue exceeds latency budget")
+
+            started = now
+            me = _Waiter(priority, next(self._seq), tenant)
+            tb = self._tenant_bucket(tenant)
+            heapq.heappush(self._queue, me)
+            self.max_depth = max(self.max_depth, len(self._queue))
+
+            while True:
+                now = time.monotonic()
+                self.bucket.refill(now)
+                for b in self.tenants.values():
+                    b.refill(now)
+
+                if self._next_eligible() is me and self.bucket.tokens >= 1.0:
+                    self.bucket.tokens -= 1.0
+                    if tb is not None:
+                        tb.tokens -= 1.0
+                    self._queue.remove(me)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+
+                    waited = now - started
+                    self.acquired[priority] += 1
+                    self.wait_total[priority] += waited
+                    return waited
+
+                if deadline is not None and deadline.expired:
+                    self._queue.remove(me)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                    self.shed[priority] += 1
+                    raise DeadlineExceeded("turn budget spent while waiting for an LLM token")
+
+                timeout = self.bucket.time_to_token()
+                if tb is not None:
+                    timeout = max(timeout, tb.time_to_token())
+                if deadline is not None:
+                    timeout = min(timeout, deadline.remaining())
+                self._cond.wait(timeout=max(timeout, 0.001))
+
+    def metrics(self) -> Dict[str, object]:
+        with self._cond:
+            depth: Dict[int, int] = defaultdict(int)
+            for w in self._queue:
+                depth[w.priority] += 1
+            return {
+                "queue_depth": dict(depth),
+                "max_queue_depth": self.max_depth,
+                "acquired": dict(self.acquired),
+                "shed": dict(self.shed),
+                "avg_wait_ms": {
+                    p: round(1000.0 * self.wait_total[p] / n, 1) for p, n in self.acquired.items() if n
+                },
+            }
+
+
+class ScheduledLLM(BaseLLM):
+    def __init__(self, inner: BaseLLM, scheduler: LLMScheduler, tenant: str = "default"):
+        self.inner = inner
+        self.scheduler = scheduler
+        self.tenant = tenant
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        priority = PRIORITY_BY_KIND.get(prompt_kind(system), PRIORITY_FOLLOWUP)
+        self.scheduler.acquire(priority, self.tenant, current_deadline())
+        return self.inner.generate(system, user, temperature=temperature, json_mode=json_mode)
+
+    def chat(self, messages: List[Message], temperature: float = 0.3, json_mode: bool = False) -> str:
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        priority = PRIORITY_BY_KIND.get(prompt_kind(system), PRIORITY_FOLLOWUP)
+        self.scheduler.acquire(priority, self.tenant, current_deadline())
+        return self.inner.chat(messages, temperature=temperature, json_mode=json_mode)
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .base import BaseLLM, Message, flatten_messages, take_usage
+from .scheduler import PRIORITY_BACKGROUND, LLMOverloaded, LLMScheduler
+from ..core.prompts import OBSERVER_SYSTEM, VERIFIER_BATCH_SYSTEM, VERIFIER_SYSTEM, prompt_kind
+from ..core.structured import loads_lenient, validate
+
+# Теневой режим: выборка вызовов verifier/observer повторяется в фоне на
+# кандидате (другая модель или ревизия промпта), а ответ сессии всегда
+# берётся у основного бэкенда. Очередь ограничена: когда кандидат не
+# успевает, лишние вызовы отбрасываются, а не копятся. Вызовы кандидата идут
+# через общий планировщик с фоновым приоритетом: они тратят ту же квоту, но
+# уступают интерактивным, а при перегрузке отбрасываются. Каждое сравнение —
+# строка JSONL с вердиктами и задержками обоих; сводка —
+# interview.tools.shadow_report.
+
+_BASE_SYSTEMS = {"verifier": VERIFIER_SYSTEM, "observer": OBSERVER_SYSTEM}
+
+
+def _parse(raw: str, schema_name: str) -> Optional[Dict[str, Any]]:
+    # мимо parse_structured: разбор теневых ответов не должен портить PARSE_STATS
+    data, _ = loads_lenient(raw)
+    if data is None:
+        return None
+    valid, _ = validate(data, schema_name)
+    return valid
+
+
+def _verdicts(system: str, raw: Optional[str]) -> Optional[Dict[str, Any]]:
+    # id пункта -> kind; у одиночного вызова один пункт с id ""
+    if raw is None:
+        return None
+    if system.startswith(VERIFIER_BATCH_SYSTEM):
+        data = _parse(raw, "verifier_batch")
+        if not data:
+            return None
+        return {
+            str(item.get("id")): str(item.get("kind", "")).upper()
+            for item in data["results"]
+            if isinstance(item, dict)
+        }
+    kind = prompt_kind(system)
+    if kind not in _BASE_SYSTEMS:
+        return None
+    data = _parse(raw, kind)
+    return {"": data["kind"]} if data else None
+
+
+class ShadowRunner:
+    """Фоновая проверка кандидата: очередь, воркеры и отчёт JSONL."""
+
+    def __init__(
+        self,
+        candidate: BaseLLM,
+        name: str = "candidate",
+        sample: float = 0.1,
+        kinds: Tuple[str, ...] = ("verifier", "observer"),
+        queue_size: int = 100,
+        workers: int = 1,
+        report_path: str = "",
+        prompts: Optional[Dict[str, str]] = None,
+        seed: Optional[int] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        tenant: str = "shadow",
+    ):
+        self.candidate = candidate
+        self.scheduler = scheduler
+        self.tenant = tenant
+        self.name = name
+        self.sample = sample
+        self.kinds = set(kinds)
+        # ревизия промпта: kind -> новый system (хвост пакетного режима сохраняется)
+        self.prompts = dict(prompts or {})
+        self.report_path = report_path
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._file = None
+        if report_path:
+            os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+            self._file = open(report_path, "a", encoding="utf-8")
+        self.mirrored = 0
+        self.dropped = 0
+        self.compared = 0
+        self.agreed = 0
+        self.errors = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"llm-shadow-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def offer(self, kind: str, call: Dict[str, Any]) -> bool:
+        # на критическом пути — только выборка и put_nowait
+        if kind not in self.kinds:
+            return False
+        with self._lock:
+            if self._rng.random() >= self.sample:
+                return False
+        try:
+            self._queue.put_nowait(call)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.mirrored += 1
+        return True
+
+    def _revise(self, system: str) -> str:
+        kind = prompt_kind(system)
+        revised = self.prompts.get(kind)
+        if revised is None or kind not in _BASE_SYSTEMS:
+            return system
+        return revised + system[len(_BASE_SYSTEMS[kind]):]
+
+    def _replay(self, call: Dict[str, Any]) -> str:
+        if call["messages"] is not None:
+            messages = [
+                dict(m, content=self._revise(m["content"])) if m["role"] == "system" else m
+                for m in call["messages"]
+            ]
+            return self.candidate.chat(messages, temperature=call["temperature"], json_mode=call["json_mode"])
+        return self.candidate.generate(
+            self._revise(call["system"]), call["user"],
+            temperature=call["temperature"], json_mode=call["json_mode"],
+        )
+
+    def _run(self) -> None:
+        while True:
+            call = self._queue.get()
+            if call is None:
+                self._queue.task_done()
+                return
+            try:
+                self._compare(call)
+            except Exception:
+                pass  # отчёт теневого режима не должен ронять воркер
+            finally:
+                self._queue.task_done()
+
+    def _compare(self, call: Dict[str, Any]) -> None:
+        if self.scheduler is not None:
+            try:
+                self.scheduler.acquire(PRIORITY_BACKGROUND, self.tenant)
+            except LLMOverloaded:
+                with self._lock:
+                    self.dropped += 1
+                return
+        # ожидание в очереди планировщика в задержку кандидата не входит
+        t0 = time.perf_counter()
+        error = None
+        try:
+            out: Optional[str] = self._replay(call)
+        except Exception as e:
+            out, error = None, f"{type(e).__name__}: {e}"
+        candidate_ms = (time.perf_counter() - t0) * 1000.0
+        take_usage()  # расход кандидата не должен попасть в учёт сессий
+
+        system = call["system"]
+        primary = _verdicts(system, call["primary"])
+        candidate = _verdicts(system, out)
+        items = sorted(primary) if primary else []
+        matched = sum(1 for k in items if candidate and candidate.get(k) == primary[k])
+        agree = (matched / len(items)) if items and candidate is not None else None
+
+        record = {
+            "ts": round(time.time(), 3),
+            "candidate": self.name,
+            "kind": call["kind"],
+            "items": len(items),
+            "primary": [primary[k] for k in items] if primary else None,
+            "shadow": [candidate.get(k) for k in items] if primary and candidate else None,
+            "agree": agree,
+            "primary_ms": round(call["primary_ms"], 1),
+            "shadow_ms": round(candidate_ms, 1),
+            "latency_diff_ms": round(candidate_ms - call["primary_ms"], 1),
+            "error": error,
+            "shadow_parsed": candidate is not None,
+        }
+        with self._lock:
+            self.compared += 1
+            if error:
+                self.errors += 1
+            if agree == 1.0:
+                self.agreed += 1
+            record["dropped_total"] = self.dropped
+            if self._file is not None:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._file.flush()
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        # дождаться разбора очереди (инструменты и тесты); True — очередь пуста
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "candidate": self.name,
+                "mirrored": self.mirrored,
+                "dropped": self.dropped,
+                "compared": self.compared,
+                "agreed": self.agreed,
+                "errors": self.errors,
+                "queued": self._queue.qsize(),
+            }
+
+    def close(self, timeout: float = 5.0) -> None:
+        for _ in self._threads:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for t in self._threads:
+            t.join(timeout)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ShadowLLM(BaseLLM):
+    """Отвечает основной бэкенд; выборка его вызовов уходит в ShadowRunner."""
+
+    def __init__(self, inner: BaseLLM, runner: ShadowRunner):
+        self.inner = inner
+        self.runner = runner
+
+    def _mirror(self, system: str, call: Dict[str, Any], invoke) -> str:
+        t0 = time.perf_counter()
+        out = invoke()
+        kind = prompt_kind(system)
+        if kind in self.runner.kinds:
+            call.update(kind=kind, system=system, primary=out, primary_ms=(time.perf_counter() - t0) * 1000.0)
+            self.runner.offer(kind, call)
+        return out
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        call = {"messages": None, "user": user, "temperature": temperature, "json_mode": json_mode}
+        return self._mirror(
+            system, call,
+            lambda: self.inner.generate(system, user, temperature=temperature, json_mode=json_mode),
+        )
+
+    def chat(self, messages: List[Message], temperature: float = 0.3, json_mode: bool = False) -> str:
+        system, _ = flatten_messages(messages)
+        call = {"messages": list(messages), "user": None, "temperature": temperature, "json_mode": json_mode}
+        return self._mirror(
+            system, call,
+            lambda: self.inner.chat(messages, temperature=temperature, json_mode=json_mode),
+        )
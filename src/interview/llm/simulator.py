@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .base import BaseLLM, LLMUnavailable, Message, flatten_messages, report_usage
+from .dummy import DummyLLM
+from ..core.prompts import prompt_kind
+
+
+class SimulatedLLMError(LLMUnavailable):
+    """Смоделированный отказ бэкенда — сессия откатывается на правила, как при настоящем."""
+
+
+class SimulatedLLMTimeout(SimulatedLLMError):
+    pass
+
+
+_DEFAULT_BY_KIND = {
+    "verifier": (
+        '{"kind":"NORMAL","confidence":80,"reason":"sim","fact_check_notes":"",'
+        '"return_to_topic_text":"","need_followup":false,"followup_question":""}'
+    ),
+    "reference": '{"answer":"Эталонный ответ (sim).","key_points":["определение","пример"]}',
+}
+
+
+def _question_gen_batch(user: str) -> str:
+    # ответ на пакетную генерацию: по 3 вопроса на каждую строку "- тема: сложность"
+    topics: Dict[str, Dict[str, List[str]]] = {}
+    for m in re.finditer(r"^- (.+?): (easy|medium|hard)\s*$", user, re.M):
+        topic, difficulty = m.group(1).strip(), m.group(2)
+        topics.setdefault(topic, {})[difficulty] = [
+            f"Вопрос {i} по теме {topic} ({difficulty}, sim)?" for i in range(1, 4)
+        ]
+    return json.dumps({"topics": topics}, ensure_ascii=False)
+
+
+@dataclass
+class SimConfig:
+    # "fixed:200" | "uniform:100,400" | "lognormal:300,0.5" (медиана, sigma) | "exp:250"
+    latency: str = "fixed:0"
+    tokens_per_sec: float = 0.0  # 0 — без учёта скорости генерации
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    timeout_ms: int = 30000
+    malformed_rate: float = 0.0
+    seed: Optional[int] = None
+    # [{"match": "regex", "response": "...", "kind": "verifier"}]
+    scripts: List[Dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SimConfig":
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+    @classmethod
+    def from_env(cls) -> "SimConfig":
+        raw = os.getenv("SIM_LLM_CONFIG", "").strip()
+        if not raw:
+            return cls()
+        if os.path.exists(raw):
+            with open(raw, "r", encoding="utf-8") as f:
+                raw = f.read()
+        return cls.from_dict(json.loads(raw))
+
+
+def _sample_latency(spec: str, rng: random.Random) -> float:
+    name, _, args = (spec or "fixed:0").partition(":")
+    vals = [float(x) for x in args.split(",") if x.strip()] or [0.0]
+    name = name.strip().lower()
+    if name == "uniform":
+        ms = rng.uniform(vals[0], vals[1] if len(vals) > 1 else vals[0])
+    elif name == "lognormal":
+        ms = rng.lognormvariate(math.log(max(vals[0], 1e-3)), vals[1] if len(vals) > 1 else 0.5)
+    elif name == "exp":
+        ms = rng.expovariate(1.0 / max(vals[0], 1e-3))
+    else:
+        ms = vals[0]
+    return max(0.0, ms) / 1000.0
+
+
+def _malform(text: str, rng: random.Random) -> str:
+    variants = [
+        lambda t: t[: max(1, len(t) // 2)],                 # обрыв посередине
+        lambda t: "```json\n" + t + "\n```",                # markdown-обёртка
+        lambda t: re.sub(r"}\s*$", ",}", t),                # висячая запятая
+        lambda t: t.replace('"', "'"),                      # одинарные кавычки
+        lambda t: "Вот результат анализа: " + t + " Надеюсь, помог!",
+    ]
+    return rng.choice(variants)(text)
+
+
+class SimulatedLLM(BaseLLM):
+    """
+    Имитация провайдера для нагрузочных и resilience-тестов: задержки по
+    распределению, скорость генерации, ошибки, таймауты, битый JSON и
+    сценарные ответы по регуляркам.
+    """
+
+    def __init__(self, config: Optional[SimConfig] = None):
+        self.config = config or SimConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._fallback = DummyLLM()
+        self._scripts = [
+            (re.compile(s["match"], re.I | re.S), s.get("response", ""), s.get("kind"))
+            for s in self.config.scripts
+            if s.get("match")
+        ]
+        self.calls = 0
+        # «кеш префиксов» провайдера: хеши уже виденных префиксов истории
+        self._prefixes: "OrderedDict[int, int]" = OrderedDict()
+
+    def _cached_tokens(self, messages: List[Message]) -> int:
+        cached = 0
+        h = 0
+        tokens = 0
+        with self._lock:
+            for i, m in enumerate(messages):
+                h = hash((h, m["role"], m["content"]))
+                tokens += len(m["content"]) // 4
+                if h in self._prefixes and i < len(messages) - 1:
+                    cached = tokens
+                    self._prefixes.move_to_end(h)
+                else:
+                    self._prefixes[h] = tokens  # весь запрос тоже попадает в кеш
+            while len(self._prefixes) > 10000:
+                self._prefixes.popitem(last=False)
+        return cached
+
+    def respond(self, system: str, user: str, temperature: float = 0.3) -> str:
+        kind = prompt_kind(system)
+        text = f"{system}\n{user}"
+        for rx, response, only_kind in self._scripts:
+            if only_kind and only_kind != kind:
+                continue
+            if rx.search(text):
+                return response
+        if kind in _DEFAULT_BY_KIND:
+            return _DEFAULT_BY_KIND[kind]
+        if kind == "question_gen_batch":
+            return _question_gen_batch(user)
+        return self._fallback.generate(system, user, temperature=temperature)
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        out = self._complete(system, user, temperature)
+        report_usage((len(system) + len(user)) // 4, len(out) // 4)
+        return out
+
+    def chat(self, messages: List[Message], temperature: float = 0.3, json_mode: bool = False) -> str:
+        cached = self._cached_tokens(messages)
+        system, user = flatten_messages(messages)
+        out = self._complete(system, user, temperature)
+        report_usage(sum(len(m["content"]) for m in messages) // 4, len(out) // 4, cached)
+        return out
+
+    def _complete(self, system: str, user: str, temperature: float) -> str:
+        cfg = self.config
+        with self._lock:
+            self.calls += 1
+            delay = _sample_latency(cfg.latency, self._rng)
+            roll_timeout = self._rng.random() < cfg.timeout_rate
+            roll_error = self._rng.random() < cfg.error_rate
+            roll_malformed = self._rng.random() < cfg.malformed_rate
+
+        if roll_timeout:
+            time.sleep(cfg.timeout_ms / 1000.0)
+            raise SimulatedLLMTimeout("simulated LLM timeout")
+
+        out = self.respond(system, user, temperature=temperature)
+        if cfg.tokens_per_sec > 0:
+            delay += (len(out) / 4.0) / cfg.tokens_per_sec
+        time.sleep(delay)
+
+        if roll_error:
+            raise SimulatedLLMError("simulated LLM error")
+        if roll_malformed:
+            with self._lock:
+                out = _malform(out, self._rng)
+        return out
@@ -1,35 +1,263 @@
 from __future__ import annotations
 
-import re
+import json
+import os
+import threading
+import uuid
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 
 from .config import settings
+from .llm.base import BaseLLM
 from .llm.dummy import DummyLLM
-from .llm.mistral_llm import MistralLLM
+from .llm.scheduler import LLMScheduler, ScheduledLLM
+from .llm.budget import Budget, BudgetedLLM, Pricing, TenantLedger
 
 from .core.memory import Memory
-from .core.topics import extract_tech_stack, pick_next_question
-from .core.feedback import build_feedback
-from .core.logging import InterviewLog, TurnLog
+from .core.topics import cancel_refills, extract_tech_stack, pick_next_question, prefetch_questions, schedule_refills
+from .core.feedback import Scorecard
+from .core.logging import InterviewLog, TurnLog, meta_path
 from .core.utils import one_question
+from .core.classifier import load_classifier
+from .core.deadline import Deadline
+from .core.profiling import TurnProfiler
+from .core.adaptive import AbilityEstimate
+from .core.stopping import settled_decision
+from .core.analysis import AnalyzedMessage, analyze_message
+from .core.knowledge import shared_index
+from .core.references import shared_store
 
 from .agents.observer import ObserverAgent
+from .agents.verifier_batcher import VerifierBatcher
 from .agents.interviewer import InterviewerAgent
 
-STOP_RE = re.compile(r"(^/stop\b|\bстоп интервью\b|\bстоп\b)", re.I)
+_scheduler: Optional[LLMScheduler] = None
+
+
+def shared_scheduler() -> Optional[LLMScheduler]:
+    # квота у провайдера одна на процесс — и планировщик тоже один
+    global _scheduler
+    if settings.llm_rate_per_sec <= 0:
+        return None
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            rate_per_sec=settings.llm_rate_per_sec,
+            burst=settings.llm_burst,
+            latency_budget_ms=settings.llm_latency_budget_ms,
+            tenant_rate_per_sec=settings.llm_tenant_rate_per_sec,
+            tenant_burst=settings.llm_tenant_burst,
+        )
+    return _scheduler
+
+
+def _make_backend(name: str, model: str = "") -> Optional[BaseLLM]:
+    # бэкенды импортируем по требованию: короткоживущим воркерам не нужен mistralai
+    if name == "sim":
+        from .llm.simulator import SimConfig, SimulatedLLM
+        return SimulatedLLM(SimConfig.from_env())
+    if name == "openai":
+        from .llm.openai_compat import OpenAICompatLLM
+        return OpenAICompatLLM(settings.openai_base_url, model or settings.openai_model, api_key=settings.openai_api_key)
+    if name == "mistral" and settings.use_mistral and settings.mistral_api_key:
+        from .llm.mistral_llm import MistralLLM
+        return MistralLLM(settings.mistral_api_key, model or settings.mistral_model, server_url=settings.mistral_server_url)
+    if name == "replay" and settings.replay_cassette:
+        from .llm.cassette import ReplayLLM
+        return ReplayLLM(settings.replay_cassette, replay_latency=settings.replay_latency)
+    if name == "dummy":
+        return DummyLLM()
+    return None
+
+
+_router = None
+
+
+def shared_router():
+    # статистика задержек копится по всем сессиям процесса
+    global _router
+    if _router is None:
+        from .llm.router import RouterLLM, parse_routes
+        backends = {}
+        for name in settings.router_backends.split(","):
+            name = name.strip()
+            llm = _make_backend(name) if name else None
+            if llm is not None:
+                backends[name] = llm
+        if not backends:
+            return None
+        _router = RouterLLM(
+            backends,
+            routes=parse_routes(settings.router_routes),
+            hedge=settings.router_hedge,
+            hedge_percentile=settings.router_hedge_percentile,
+            hedge_min_ms=settings.router_hedge_min_ms,
+        )
+    return _router
+
+
+_shadow = None
+_shadow_loaded = False
+_shadow_lock = threading.Lock()
+
+
+SHADOW_TENANT = "shadow"
+
+
+def shared_shadow():
+    # один кандидат, очередь и отчёт на процесс; кандидат делит квоту планировщика
+    global _shadow, _shadow_loaded
+    with _shadow_lock:
+        if not _shadow_loaded:
+            _shadow_loaded = True
+            name = settings.shadow_backend.strip()
+            candidate = _make_backend(name, model=settings.shadow_model) if name else None
+            if candidate is not None:
+                from .llm.shadow import ShadowRunner
+                prompts = None
+                if settings.shadow_prompts:
+                    with open(settings.shadow_prompts, "r", encoding="utf-8") as f:
+                        prompts = json.load(f)
+                _shadow = ShadowRunner(
+                    candidate,
+                    name=f"{name}:{settings.shadow_model}" if settings.shadow_model else name,
+                    sample=settings.shadow_sample,
+                    kinds=tuple(k.strip() for k in settings.shadow_kinds.split(",") if k.strip()),
+                    queue_size=settings.shadow_queue,
+                    workers=settings.shadow_workers,
+                    report_path=settings.shadow_report,
+                    prompts=prompts,
+                    scheduler=shared_scheduler(),
+                    tenant=SHADOW_TENANT,
+                )
+        return _shadow
+
+
+def resolve_backend(name: str = "") -> str:
+    backend = (name or settings.llm_backend or "auto").lower()
+    return "mistral" if backend == "auto" else backend
+
+
+def make_llm(tenant: str = "default"):
+    backend = resolve_backend()
+
+    llm = shared_router() if backend == "router" else _make_backend(backend)
+    name = backend
+    if llm is None:
+        return DummyLLM(), "dummy"
+    if backend == "dummy":
+        return llm, name
+
+    # тень — под планировщиком: сравниваем задержку самих бэкендов, без ожидания в очереди
+    shadow = shared_shadow()
+    if shadow:
+        from .llm.shadow import ShadowLLM
+        llm = ShadowLLM(llm, shadow)
+
+    scheduler = shared_scheduler()
+    if scheduler:
+        llm = ScheduledLLM(llm, scheduler, tenant=tenant)
+    return llm, name
+
+
+_tenant_ledger: Optional[TenantLedger] = None
+_tenant_ledger_lock = threading.Lock()
+
+
+def shared_tenant_ledger() -> TenantLedger:
+    # расход тенанта складывается по всем его сессиям процесса
+    global _tenant_ledger
+    with _tenant_ledger_lock:
+        if _tenant_ledger is None:
+            _tenant_ledger = TenantLedger(
+                Budget(
+                    max_calls=settings.llm_tenant_max_calls,
+                    max_input_tokens=settings.llm_tenant_max_input_tokens,
+                    max_output_tokens=settings.llm_tenant_max_output_tokens,
+                    max_cost=settings.llm_tenant_max_cost,
+                ),
+                window_s=settings.llm_tenant_budget_window_s,
+            )
+        return _tenant_ledger
+
+
+def budget_llm(llm: BaseLLM, tenant: str) -> BudgetedLLM:
+    return BudgetedLLM(
+        llm,
+        Budget(
+            max_calls=settings.llm_session_max_calls,
+            max_input_tokens=settings.llm_session_max_input_tokens,
+            max_output_tokens=settings.llm_session_max_output_tokens,
+            max_cost=settings.llm_session_max_cost,
+        ),
+        pricing=Pricing(
+            input_per_mtok=settings.llm_price_input_per_mtok,
+            cached_per_mtok=settings.llm_price_cached_per_mtok,
+            output_per_mtok=settings.llm_price_output_per_mtok,
+        ),
+        tenant=tenant,
+        ledger=shared_tenant_ledger(),
+    )
+
+
+_verifier_batcher: Optional[VerifierBatcher] = None
+_verifier_batcher_lock = threading.Lock()
+
+
+# тенант планировщика для пакетов Verifier: в пакете ходы разных сессий и тенантов
+VERIFIER_BATCH_TENANT = "verifier-batch"
+
+
+def shared_verifier_batcher() -> Optional[VerifierBatcher]:
+    # один батчер на процесс: иначе запросы разных сессий не склеятся. LLM у него свой,
+    # без обёрток какой-либо сессии (кассета, бюджет, тенант): пакет общий
+    global _verifier_batcher
+    if settings.verifier_batch_ms <= 0:
+        return None
+    with _verifier_batcher_lock:
+        if _verifier_batcher is None:
+            llm, _ = make_llm(tenant=VERIFIER_BATCH_TENANT)
+            _verifier_batcher = VerifierBatcher(
+                llm,
+                max_wait_ms=settings.verifier_batch_ms,
+                max_items=settings.verifier_batch_size,
+            )
+        return _verifier_batcher
+
 
+_profiler: Optional[TurnProfiler] = None
 
-def make_llm():
-    if settings.use_mistral and settings.mistral_api_key:
-        return MistralLLM(settings.mistral_api_key, settings.mistral_model), "mistral"
-    return DummyLLM(), "dummy"
+
+def shared_profiler() -> Optional[TurnProfiler]:
+    # счётчик ходов общий на процесс: «каждый N-й» считается по всем сессиям
+    global _profiler
+    if settings.profile_every_n <= 0 and settings.profile_slow_ms <= 0:
+        return None
+    if _profiler is None:
+        _profiler = TurnProfiler(
+            settings.profile_dir,
+            every_n=settings.profile_every_n,
+            slow_ms=settings.profile_slow_ms,
+            interval_ms=settings.profile_interval_ms,
+        )
+    return _profiler
 
 
 class InterviewSession:
 
 
-    def __init__(self, position: str, grade: str, experience: str, candidate_name: str, scenario_id: int):
+    def __init__(
+        self,
+        position: str,
+        grade: str,
+        experience: str,
+        candidate_name: str,
+        scenario_id: int,
+        tenant: str = "default",
+        session_id: Optional[str] = None,
+        llm: Optional[BaseLLM] = None,
+        llm_name: str = "custom",
+        log_path: Optional[str] = None,
+    ):
         tech = extract_tech_stack(f"{position} {grade} {experience}")
         self.mem = Memory(
             candidate_name=candidate_name,
@@ -39,24 +267,67 @@ class InterviewSession:
             tech_stack=tech,
         )
         self.mem.apply_defaults()
-
-        llm, llm_name = make_llm()
+        if settings.use_message_history:
+            self.mem.conversations = {}
+        if settings.question_strategy == "irt":
+            self.mem.ability = AbilityEstimate.for_grade(self.mem.grade)
+
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+
+        if llm is None:
+            llm, llm_name = make_llm(tenant)
+        # запись и воспроизведение кассеты — без общего батчера: его пакеты не принадлежат сессии
+        from .llm.cassette import RecordingLLM, ReplayLLM
+        replayable = bool(settings.cassette_dir) or isinstance(llm, ReplayLLM)
+        if settings.cassette_dir:
+            llm = RecordingLLM(
+                llm,
+                os.path.join(settings.cassette_dir, f"{self.session_id}.jsonl"),
+                header={
+                    "session_id": self.session_id,
+                    "llm_name": llm_name,
+                    "position": position,
+                    "grade": grade,
+                    "experience": experience,
+                    "candidate_name": candidate_name,
+                    "scenario_id": scenario_id,
+                },
+            )
         self.llm_name = llm_name
-        self.mem.llm = llm
-
-        self.observer = ObserverAgent(llm=llm)
+        self.tenant = tenant
+        # бюджет сессии — внешний слой: исчерпанный бюджет выглядит как недоступный LLM
+        self.budget = budget_llm(llm, tenant)
+        self.mem.llm = self.budget
+
+        self.observer = ObserverAgent(
+            llm=self.budget,
+            classifier=load_classifier(settings.classifier_path),
+            classifier_min_confidence=settings.classifier_min_confidence,
+            verifier_batcher=None if replayable else shared_verifier_batcher(),
+            verifier_min_confidence=settings.observer_verifier_min_confidence,
+            relevance_min_overlap=settings.observer_relevance_min_overlap,
+            use_verifier=settings.observer_use_verifier,
+            use_observer_llm=settings.observer_use_llm,
+            knowledge=shared_index() if settings.knowledge_fact_check else None,
+            knowledge_top_k=settings.knowledge_top_k,
+            references=shared_store(settings.reference_answers_path),
+        )
         self.interviewer = InterviewerAgent()
 
         self.turn_id = 0
         self.scenario_id = scenario_id
+        self.log_path = log_path
 
         # Для правильной траектории финального теста:
         self.first_question_asked = False  # вопрос показали пользователю
         self.awaiting_first_answer = True  # ждём ответ на первый вопрос
 
+        self.scorecard = Scorecard()
+        self.profiler = shared_profiler()
         self.log = InterviewLog(
             participant_name=candidate_name,
             session_meta={
+                "session_id": self.session_id,
                 "llm_provider": llm_name,
                 "llm_model": settings.mistral_model if llm_name == "mistral" else None,
                 "started_at": datetime.now(timezone.utc).isoformat(),
@@ -64,20 +335,76 @@ class InterviewSession:
                 "grade": grade,
                 "experience": experience,
                 "scenario_id": scenario_id,
+                "tenant": tenant,
             },
         )
 
-    def _apply_difficulty(self, action: str):
+    def _apply_difficulty(self, action: str, kind: Optional[str] = None):
+        if self.mem.ability is not None:
+            # IRT: обновляем оценку способности, уровень следующего вопроса выберет _choose_question.
+            # Ответ на уточнение (followup_streak > 0) — тот же пункт, что и исходный вопрос:
+            # он уже учтён, второй раз его не считаем
+            if self.mem.followup_streak == 0:
+                self.mem.ability.update(self.mem.last_difficulty, kind or "")
+            return
         if action == "UP":
             self.mem.bump_up()
         elif action == "DOWN":
             self.mem.bump_down()
 
     def _choose_question(self, topic_hint: Optional[str] = None, force_difficulty: Optional[str] = None):
-        q, topic, source = pick_next_question(self.mem, topic_hint=topic_hint, force_difficulty=force_difficulty)
+        if self.mem.ability is not None and force_difficulty is None:
+            self.mem.difficulty = self.mem.ability.best_difficulty()
+        q, topic, source = pick_next_question(
+            self.mem,
+            topic_hint=topic_hint,
+            force_difficulty=force_difficulty,
+            refill_watermark=settings.question_refill_watermark,
+        )
+        self.mem.last_difficulty = force_difficulty or self.mem.difficulty
         self.mem.remember_question(q, topic)  # sets last_question/last_topic
+        schedule_refills(self.mem)
         return q, (topic or "generic"), source
 
+    def _start_turn(self):
+        self.mem.deadline = Deadline(settings.turn_budget_ms) if settings.turn_budget_ms > 0 else None
+        self.mem.degraded = []
+
+    def _record_turn(self, question_answered, topic_answered, user_message, obs, source, next_q, msg=None):
+        thoughts = [
+            {"role": "Observer", "content": f"kind={obs.kind} diff={obs.difficulty_action} reason={obs.reason}"},
+            {"role": "Interviewer", "content": "Сформулировать краткий вывод и задать следующий вопрос по теме."},
+        ]
+        degraded = list(self.mem.degraded)
+        if self.budget.exhausted and "llm_budget_exhausted" not in self.log.session_meta:
+            self.log.session_meta["llm_budget_exhausted"] = {"turn_id": self.turn_id, "reason": self.budget.exhausted}
+            thoughts.append({"role": "System", "content": f"LLM budget exhausted ({self.budget.exhausted}): rules and static bank"})
+        if degraded:
+            thoughts.append({"role": "System", "content": f"degraded to rules: {', '.join(degraded)}"})
+            self.log.session_meta.setdefault("degraded_turns", []).append(self.turn_id)
+
+        turn = TurnLog(
+            turn_id=self.turn_id,
+            agent_visible_message=question_answered or "",
+            user_message=user_message,
+            internal_thoughts=thoughts,
+            meta={
+                "kind": obs.kind,
+                "topic": topic_answered or "generic",
+                "source": source,
+                "question_answered": question_answered,
+                "question_asked": next_q,
+                "expected_answer_short": obs.expected_answer_short,
+                "degraded": degraded,
+            }
+        )
+        if self.mem.ability is not None:
+            turn.meta["ability"] = self.mem.ability.to_dict()
+        self.log.add_turn(turn)
+        self.scorecard.add(
+            obs.kind, topic_answered, question_answered or "", user_message, obs.expected_answer_short, msg=msg
+        )
+
     def first_message(self) -> str:
 
         stack = ", ".join(self.mem.tech_stack) if self.mem.tech_stack else "пока не распознан (скажи 2–3 технологии)"
@@ -90,16 +417,64 @@ class InterviewSession:
         primary_hint = self.mem.tech_stack[0] if self.mem.tech_stack else None
         first_q, topic, source = self._choose_question(topic_hint=primary_hint)
         self.first_question_asked = True
+        if settings.batch_question_gen:
+            prefetch_questions(self.mem)
 
         # Показываем приветствие + первый вопрос
         return f"{greeting}\n\n{first_q}"
 
+    def status(self) -> str:
+        text = self.scorecard.status(self.mem.grade)
+        if self.mem.ability is not None and self.mem.ability.answers:
+            a = self.mem.ability
+            grade, conf = a.grade()
+            text += f"\nОценка уровня: {grade} ({conf:.0%}), θ={a.mean:+.2f} ± {a.sd:.2f}."
+        return text
+
     def step(self, user_message: str) -> str:
+        # реплика разбирается один раз; дальше весь ход работает с msg
+        msg = analyze_message(user_message)
+
         # /stop завершает и возвращает final_feedback
-        if STOP_RE.search(user_message or ""):
+        if msg.is_stop:
             self.finish()
             return self.log.final_feedback or "Интервью завершено."
 
+        # /status — живое промежуточное решение, ход не засчитывается
+        if msg.is_status:
+            return self.status()
+
+        self._start_turn()
+        probe = self.profiler.start() if self.profiler else None
+        try:
+            reply = self._answer(user_message, msg)
+        finally:
+            if probe is not None:
+                probe.finish(self.session_id, self.turn_id)
+        return self._stop_if_settled() or reply
+
+    def _stop_if_settled(self) -> Optional[str]:
+        # решение уже не изменится за оставшиеся ходы — завершаем интервью сами
+        if not settings.early_stop or self.scorecard.turns < settings.early_stop_min_turns:
+            return None
+        decision = settled_decision(
+            self.scorecard.counts,
+            self.mem.grade,
+            horizon=settings.early_stop_horizon,
+            strict=settings.early_stop_strict,
+        )
+        if decision is None:
+            return None
+        grade, rec, conf = decision
+        note = f"early stop: decision settled ({rec}, {conf}%) for next {settings.early_stop_horizon} turns"
+        last = self.log.turns[-1] if self.log.turns else None
+        if last is not None and isinstance(last.internal_thoughts, list):
+            last.internal_thoughts.append({"role": "System", "content": note})
+        self.log.session_meta["early_stop"] = {"turn_id": self.turn_id, "recommendation": rec, "confidence": conf}
+        self.finish()
+        return self.log.final_feedback
+
+    def _answer(self, user_message: str, msg: AnalyzedMessage) -> str:
         # Первый вопрос уже был показан в first_message() тут пришёл ответ на него.
         if self.awaiting_first_answer:
             self.awaiting_first_answer = False
@@ -108,12 +483,12 @@ class InterviewSession:
             topic_answered = self.mem.last_topic
 
             self.mem.remember_user(user_message)
-            extra = extract_tech_stack(user_message)
+            extra = msg.tech_stack
             if extra:
                 self.mem.tech_stack = list(dict.fromkeys(self.mem.tech_stack + extra))
 
-            obs = self.observer.analyze(user_message, self.mem)
-            self._apply_difficulty(obs.difficulty_action)
+            obs = self.observer.analyze(user_message, self.mem, msg)
+            self._apply_difficulty(obs.difficulty_action, obs.kind)
             self.mem.mark_topic(self.mem.last_topic, obs.kind)
 
             # выбираем следующий вопрос
@@ -136,23 +511,7 @@ class InterviewSession:
                 fact_check_notes=obs.fact_check_notes,
             )
 
-            self.log.add_turn(TurnLog(
-                turn_id=self.turn_id,
-                agent_visible_message=question_answered or "",
-                user_message=user_message,
-                internal_thoughts=[
-                    {"role": "Observer", "content": f"kind={obs.kind} diff={obs.difficulty_action} reason={obs.reason}"},
-                    {"role": "Interviewer", "content": "Сформулировать краткий вывод и задать следующий вопрос по теме."},
-                ],
-                meta={
-                    "kind": obs.kind,
-                    "topic": topic_answered or "generic",
-                    "source": source,
-                    "question_answered": question_answered,
-                    "question_asked": next_q,
-                    "expected_answer_short": obs.expected_answer_short,
-                }
-            ))
+            self._record_turn(question_answered, topic_answered, user_message, obs, source, next_q, msg)
 
             return reply
 
@@ -160,15 +519,15 @@ class InterviewSession:
         self.turn_id += 1
         self.mem.remember_user(user_message)
 
-        extra = extract_tech_stack(user_message)
+        extra = msg.tech_stack
         if extra:
             self.mem.tech_stack = list(dict.fromkeys(self.mem.tech_stack + extra))
 
         question_answered = self.mem.last_question
         topic_answered = self.mem.last_topic
 
-        obs = self.observer.analyze(user_message, self.mem)
-        self._apply_difficulty(obs.difficulty_action)
+        obs = self.observer.analyze(user_message, self.mem, msg)
+        self._apply_difficulty(obs.difficulty_action, obs.kind)
         self.mem.mark_topic(self.mem.last_topic, obs.kind)
 
         sticky_hint = obs.topic_hint or self.mem.last_topic
@@ -194,30 +553,16 @@ class InterviewSession:
             fact_check_notes=obs.fact_check_notes,
         )
 
-        self.log.add_turn(TurnLog(
-            turn_id=self.turn_id,
-            agent_visible_message=question_answered or "",
-            user_message=user_message,
-            internal_thoughts=[
-                {"role": "Observer", "content": f"kind={obs.kind} diff={obs.difficulty_action} reason={obs.reason}"},
-                {"role": "Interviewer", "content": "Сформулировать краткий вывод и задать следующий вопрос по теме."},
-            ],
-            meta={
-                "kind": obs.kind,
-                "topic": topic_answered or "generic",
-                "source": source,
-                "question_answered": question_answered,
-                "question_asked": next_q,
-                "expected_answer_short": obs.expected_answer_short,
-            }
-        ))
+        self._record_turn(question_answered, topic_answered, user_message, obs, source, next_q, msg)
 
         return reply
 
     def finish(self):
+        cancel_refills(self.mem)
         # финальный фидбек
-        turns = [t.__dict__ for t in self.log.turns]
-        self.log.final_feedback = build_feedback(turns, self.mem.grade)
+        self.log.final_feedback = self.scorecard.render(self.mem.grade)
+        self.log.session_meta["llm_usage"] = self.budget.report()
 
-        filename = f"interview_log_{self.scenario_id}.json"
+        filename = self.log_path or f"interview_log_{self.scenario_id}.json"
         self.log.save(filename)
+        self.log.save_meta(meta_path(filename))  # расход LLM и прочее служебное — рядом, публичный файл строгий
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import time
+from typing import List
+
+from ..core.archive import ArchiveReader, ArchiveWriter
+from ..core.logging import is_meta_path
+
+# Конвертер JSON-логов интервью <-> компактный архив.
+#   pack    logs/*.json -o logs.iva [--zstd]
+#   unpack  logs.iva -o out_dir/
+#   verify  logs/*.json [--zstd]   — проверка round-trip и размеры
+
+
+def _expand(patterns: List[str]) -> List[str]:
+    files: List[str] = []
+    for p in patterns:
+        files.extend(sorted(glob.glob(p)) if any(ch in p for ch in "*?[") else [p])
+    # служебные <лог>.meta.json — не интервью
+    return [f for f in files if not is_meta_path(f)]
+
+
+def _load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def pack(files: List[str], out: str, compress: bool) -> int:
+    n = 0
+    with ArchiveWriter(out, compress=compress) as w:
+        for path in files:
+            w.write(_load(path), name=os.path.basename(path))
+            n += 1
+    return n
+
+
+def unpack(archive: str, out_dir: str) -> int:
+    os.makedirs(out_dir, exist_ok=True)
+    n = 0
+    with ArchiveReader(archive) as r:
+        for name, data in r:
+            n += 1
+            # имя из архива — только имя файла: без каталогов и выхода за out_dir
+            name = os.path.basename((name or "").replace("\\", "/"))
+            if name in ("", ".", ".."):
+                name = f"interview_{n:06d}.json"
+            path = os.path.join(out_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+    return n
+
+
+def verify(files: List[str], compress: bool) -> bool:
+    tmp = f".verify-{os.getpid()}.iva"
+    try:
+        t0 = time.perf_counter()
+        pack(files, tmp, compress)
+        t_pack = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with ArchiveReader(tmp) as r:
+            restored = list(r)
+        t_read = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        originals = [_load(p) for p in files]
+        t_json = time.perf_counter() - t0
+
+        ok = len(restored) == len(files)
+        for path, orig, (name, data) in zip(files, originals, restored):
+            if name != os.path.basename(path) or data != orig:
+                print(f"MISMATCH: {path}")
+                ok = False
+
+        json_bytes = sum(os.path.getsize(p) for p in files)
+        arc_bytes = os.path.getsize(tmp)
+        print(f"files: {len(files)}  json: {json_bytes} B  archive: {arc_bytes} B  "
+              f"ratio: {arc_bytes / max(1, json_bytes):.3f}")
+        print(f"read json: {t_json * 1000:.1f} ms  read archive: {t_read * 1000:.1f} ms  "
+              f"pack: {t_pack * 1000:.1f} ms")
+        print("round-trip: OK" if ok else "round-trip: FAILED")
+        return ok
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Архив логов интервью")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("pack")
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("-o", "--out", required=True)
+    p.add_argument("--zstd", action="store_true", help="сжать zstd (нужен пакет zstandard)")
+
+    p = sub.add_parser("unpack")
+    p.add_argument("archive")
+    p.add_argument("-o", "--out", required=True)
+
+    p = sub.add_parser("verify")
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("--zstd", action="store_true")
+
+    args = parser.parse_args()
+    if args.cmd == "pack":
+        n = pack(_expand(args.inputs), args.out, args.zstd)
+        print(f"packed {n} interviews -> {args.out}")
+    elif args.cmd == "unpack":
+        n = unpack(args.archive, args.out)
+        print(f"unpacked {n} interviews -> {args.out}")
+    else:
+        raise SystemExit(0 if verify(_expand(args.inputs), args.zstd) else 1)
+
+
+if __name__ == "__main__":
+    main()
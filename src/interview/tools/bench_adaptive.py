@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import random
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+from ..core.adaptive import LEVEL_B, AbilityEstimate, grade_of, p_correct
+from ..core.classifier import _KIND_RE
+from ..core.logging import load_log
+from ..core.memory import difficulty_from_grade, normalize_grade
+from ..core.topics import QUESTION_BANK
+
+# Сравнение стратегий выбора сложности по числу ходов до решения о грейде.
+# По логам оценивается «истинная» способность кандидатов, затем интервью
+# проигрываются заново по модели 2PL для стратегий ladder и irt.
+#   python -m interview.tools.bench_adaptive 'logs/*.json' --reps 200
+
+_UP = {"easy": "medium", "medium": "hard", "hard": "hard"}
+_DOWN = {"easy": "easy", "medium": "easy", "hard": "medium"}
+
+
+def _level_index() -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for levels in QUESTION_BANK.values():
+        for level, qs in levels.items():
+            for q in qs:
+                out[q] = level
+    return out
+
+
+def abilities_from_logs(paths: List[str]) -> List[Tuple[float, str]]:
+    """(θ, заявленный грейд) по каждому логу: EAP по ответам на вопросы из банка."""
+    levels = _level_index()
+    out: List[Tuple[float, str]] = []
+    for path in paths:
+        try:
+            data = load_log(path)
+        except Exception:
+            continue
+        if data is None:
+            continue
+        grade = normalize_grade(((data.get("session_meta") or {}).get("grade")) or "middle")
+        est = AbilityEstimate.for_grade(grade)
+        for t in data.get("turns", []):
+            meta = t.get("meta") or {}
+            kind = meta.get("kind")
+            if not kind:
+                m = _KIND_RE.search(str(t.get("internal_thoughts") or ""))
+                kind = m.group(1) if m else None
+            question = meta.get("question_answered") or t.get("agent_visible_message") or ""
+            est.update(levels.get(question, "medium"), kind or "")
+        if est.answers:
+            out.append((est.mean, grade))
+    return out
+
+
+def simulate(
+    theta: float,
+    grade: str,
+    strategy: str,
+    rng: random.Random,
+    threshold: float,
+    max_turns: int,
+) -> Tuple[Optional[int], bool]:
+    est = AbilityEstimate.for_grade(grade)
+    level = difficulty_from_grade(grade)
+    for turn in range(1, max_turns + 1):
+        if strategy == "irt":
+            level = est.best_difficulty()
+        correct = rng.random() < p_correct(theta, LEVEL_B[level], est.discrimination)
+        est.update(level, "STRONG" if correct else "WEAK")
+        if strategy == "ladder":
+            level = _UP[level] if correct else _DOWN[level]
+        name, conf = est.grade()
+        if conf >= threshold:
+            return turn, name == grade_of(theta)
+    name, _ = est.grade()
+    return None, name == grade_of(theta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ходы до решения: ladder против irt")
+    parser.add_argument("logs", nargs="*", help="JSON-логи интервью (по умолчанию — сетка θ от -2 до 2)")
+    parser.add_argument("--reps", type=int, default=100, help="прогонов на кандидата")
+    parser.add_argument("--threshold", type=float, default=0.8, help="уверенность в грейде для решения")
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    files: List[str] = []
+    for p in args.logs:
+        files.extend(sorted(glob.glob(p)) if any(ch in p for ch in "*?[") else [p])
+    people = abilities_from_logs(files) if files else []
+    if not people:
+        people = [(round(-2.0 + 0.25 * i, 2), g) for i in range(17) for g in ("junior", "middle", "senior")]
+    print(f"candidates: {len(people)}  reps: {args.reps}  threshold: {args.threshold}")
+
+    print(f"{'strategy':<8} {'turns_avg':>9} {'turns_p50':>9} {'turns_p90':>9} {'decided':>8} {'accuracy':>8}")
+    for strategy in ("ladder", "irt"):
+        rng = random.Random(args.seed)
+        turns: List[int] = []
+        correct = undecided = total = 0
+        for theta, grade in people:
+            for _ in range(args.reps):
+                n, ok = simulate(theta, grade, strategy, rng, args.threshold, args.max_turns)
+                total += 1
+                correct += ok
+                if n is None:
+                    undecided += 1
+                else:
+                    turns.append(n)
+        q = statistics.quantiles(turns, n=10) if len(turns) >= 2 else [float("nan")] * 9
+        print(
+            f"{strategy:<8} {statistics.mean(turns) if turns else float('nan'):>9.2f} "
+            f"{statistics.median(turns) if turns else float('nan'):>9.1f} {q[8]:>9.1f} "
+            f"{(total - undecided) / total:>8.1%} {correct / total:>8.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
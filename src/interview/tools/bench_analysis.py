@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import random
+import re
+import time
+from typing import Callable, List, Tuple
+
+from ..agents.observer import ObserverAgent
+from ..core.analysis import STATUS_RE, STOP_RE, analyze_message, is_gibberish, normalize_text, tokenize
+from ..core.feedback import CLARITY_MARKERS, _short
+from ..core.topics import QUESTION_BANK, extract_tech_stack
+
+# CPU на разбор реплики за ход: прежняя цепочка (каждый этап заново
+# нормализует и токенизирует текст) против одного AnalyzedMessage.
+# Берётся худший путь правил — реплика проходит все проверки observer.
+#   python -m interview.tools.bench_analysis 'logs/*.json' --lengths 200,2000,8000
+
+_FILLER = (
+    "Я бы начал с того, что это зависит от нагрузки: например, индексы в postgres ускоряют чтение, "
+    "но замедляют запись, потому что каждое изменение обновляет дерево. Затем смотрел бы план запроса "
+    "через EXPLAIN ANALYZE, в итоге выбирал бы составной индекс под фильтр и сортировку. "
+    "Python-сервис на FastAPI ходит в базу через пул соединений, Redis держит горячие ключи, Docker и k8s для деплоя. "
+)
+
+
+def _corpus(paths: List[str]) -> Tuple[List[str], List[str]]:
+    answers: List[str] = []
+    questions: List[str] = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            continue
+        for t in data.get("turns", []):
+            if t.get("user_message"):
+                answers.append(t["user_message"])
+            if t.get("agent_visible_message"):
+                questions.append(t["agent_visible_message"])
+    questions = questions or [q for levels in QUESTION_BANK.values() for qs in levels.values() for q in qs]
+    return answers or [_FILLER], questions
+
+
+def _long_answers(seed_answers: List[str], length: int, n: int, rng: random.Random) -> List[str]:
+    out: List[str] = []
+    for _ in range(n):
+        parts: List[str] = []
+        size = 0
+        while size < length:
+            p = rng.choice(seed_answers + [_FILLER])
+            parts.append(p)
+            size += len(p) + 1
+        out.append(" ".join(parts)[:length])
+    return out
+
+
+# прежние помощники observer — только для сравнения
+def _legacy_relevant(answer: str, question: str) -> bool:
+    if not answer or not question:
+        return False
+    a = set(tokenize(normalize_text(answer)))
+    q = set(tokenize(normalize_text(question)))
+    return bool(a and q and a & q)
+
+
+def _legacy_contains_word(text: str, word: str) -> bool:
+    return re.search(rf"(^|[^a-zа-я0-9_]){re.escape(word)}([^a-zа-я0-9_]|$)", text) is not None
+
+
+def legacy_turn(text: str, question: str) -> None:
+    # как было до AnalyzedMessage: step -> observer.analyze -> Scorecard.add
+    STOP_RE.search(text)
+    STATUS_RE.search(text)
+    extract_tech_stack(text)
+    low = normalize_text(text)
+    is_gibberish((text or "").strip())
+    any(ph in low for ph in ObserverAgent.REFUSAL_WORDS)
+    any(ph in low for ph in ObserverAgent.ROLE_REVERSAL_WORDS)
+    _legacy_relevant(text, question)
+    any(_legacy_contains_word(low, w) for w in ObserverAgent.OFFTOPIC_WORDS)
+    any(ph in low for ph in ObserverAgent.WEAK_WORDS)
+    _legacy_relevant(text, question)
+    "?" in text
+    len(_short(text)) >= 40 and any(x in text.lower() for x in CLARITY_MARKERS)
+
+
+def analyzed_turn(text: str, question: str) -> None:
+    msg = analyze_message(text)
+    msg.is_stop, msg.is_status, msg.tech_stack, msg.gibberish
+    msg.first_phrase(ObserverAgent.REFUSAL_WORDS)
+    msg.first_phrase(ObserverAgent.ROLE_REVERSAL_WORDS)
+    msg.relevant_to(question)
+    any(msg.has_word(w) for w in ObserverAgent.OFFTOPIC_WORDS)
+    msg.first_phrase(ObserverAgent.WEAK_WORDS)
+    msg.relevant_to(question)
+    msg.has_question
+    msg.compact_length >= 40 and msg.clarity_marker
+
+
+def _time(fn: Callable[[str, str], None], pairs: List[Tuple[str, str]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for text, q in pairs:
+            fn(text, q)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(pairs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU на разбор реплики: прежняя цепочка против AnalyzedMessage")
+    parser.add_argument("logs", nargs="*", help="JSON-логи интервью — источник реплик и вопросов")
+    parser.add_argument("--lengths", default="200,2000,8000", help="длины ответов в символах")
+    parser.add_argument("--n", type=int, default=300, help="ответов на каждую длину")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    files: List[str] = []
+    for p in args.logs:
+        files.extend(sorted(glob.glob(p)) if any(ch in p for ch in "*?[") else [p])
+    answers, questions = _corpus(files)
+    rng = random.Random(args.seed)
+
+    # прогрев: общий regex словаря стека и кеши собираются лениво
+    legacy_turn(_FILLER, questions[0])
+    analyzed_turn(_FILLER, questions[0])
+
+    print(f"{'chars':>6} {'legacy_us':>10} {'analyzed_us':>11} {'saved_us':>9} {'speedup':>7}")
+    for length in [int(x) for x in re.split(r"[,\s]+", args.lengths) if x]:
+        texts = _long_answers(answers, length, args.n, rng)
+        pairs = [(t, rng.choice(questions)) for t in texts]
+        old = _time(legacy_turn, pairs, args.repeat)
+        new = _time(analyzed_turn, pairs, args.repeat)
+        print(f"{length:>6} {old:>10.1f} {new:>11.1f} {old - new:>9.1f} {old / max(new, 1e-9):>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Бенчмарк холодного старта: импорт модуля в свежем процессе, N повторов.
+# Код выхода 1, если медиана превышает бюджет — удобно для CI.
+
+
+def _env():
+    env = dict(os.environ)
+    src = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env["PYTHONPATH"] = src + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+    return env
+
+
+def measure(module: str, runs: int):
+    env = _env()
+    baseline, full = [], []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+        baseline.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], env=env, check=True)
+        full.append(time.perf_counter() - t0)
+    return statistics.median(baseline), statistics.median(full)
+
+
+def top_imports(module: str, limit: int = 10):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [x.strip() for x in line.split(":", 1)[1].split("|")]
+        rows.append((int(cumulative_us), int(self_us), name))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время импорта в холодном процессе с бюджетом")
+    parser.add_argument("--module", default="interview.session")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="бюджет на импорт сверх голого интерпретатора")
+    parser.add_argument("--top", type=int, default=10, help="показать самые дорогие импорты (-X importtime)")
+    args = parser.parse_args()
+
+    base, full = measure(args.module, args.runs)
+    cost_ms = (full - base) * 1000.0
+    print(f"interpreter: {base * 1000:.1f} ms, with {args.module}: {full * 1000:.1f} ms")
+    print(f"import cost: {cost_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    if args.top:
+        print("slowest imports (cumulative us | self us | module):")
+        for cumulative, self_us, name in top_imports(args.module, args.top):
+            print(f"  {cumulative:>9} | {self_us:>8} | {name}")
+
+    if cost_ms > args.budget_ms:
+        print("FAIL: import budget exceeded")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
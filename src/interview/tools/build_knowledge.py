@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import argparse
+import os
+
+from ..core import knowledge
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Собрать индекс BM25 локальной базы знаний для проверки фактов")
+    parser.add_argument("--corpus", default=knowledge.CORPUS_PATH, help="JSONL со справками")
+    parser.add_argument("--out", default=knowledge.INDEX_PATH)
+    args = parser.parse_args()
+
+    passages = knowledge.read_corpus(args.corpus)
+    data = knowledge.build_index(passages, knowledge.corpus_fingerprint(args.corpus))
+    knowledge.save_index(data, args.out)
+    topics = sorted({p.topic for p in passages})
+    claims = sum(len(p.contradicts) for p in passages)
+    print(
+        f"knowledge: {args.out} passages={len(passages)} terms={len(data['postings'])} "
+        f"claims={claims} topics={','.join(topics)} size={os.path.getsize(args.out)}B "
+        f"fingerprint={data['fingerprint'][:12]}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..core import references
+from ..core.prompts import REFERENCE_SYSTEM, REFERENCE_USER_TEMPLATE
+from ..core.structured import parse_structured
+from ..core.topics import QUESTION_BANK
+from ..core.utils import one_sentence
+from ..session import _make_backend, resolve_backend
+
+# Эталонные ответы для всего QUESTION_BANK одной пачкой: вопросы раздаются
+# пулу процессов, у каждого свой клиент LLM. Уже готовые эталоны с тем же
+# промптом переиспользуются — перегенерируются только новые вопросы.
+#   LLM_BACKEND=mistral python -m interview.tools.build_references --workers 8
+
+_llm = None
+
+
+def _init_worker(backend: str) -> None:
+    global _llm
+    _llm = _make_backend(backend)
+    if _llm is None:
+        raise RuntimeError(f"backend {backend!r} is not available")
+
+
+def _generate(job: Tuple[str, str, str, str], attempts: int = 2) -> Tuple[str, Optional[str], str]:
+    qid, topic, difficulty, question = job
+    user = REFERENCE_USER_TEMPLATE.format(topic=topic, difficulty=difficulty, question=question)
+    error = ""
+    for _ in range(attempts):
+        try:
+            raw = _llm.generate(REFERENCE_SYSTEM, user, temperature=0.0, json_mode=True)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            continue
+        data = parse_structured(raw, "reference")
+        if data and data.get("answer"):
+            return qid, " ".join(str(data["answer"]).split()), ""
+        error = "unparsable response"
+    return qid, None, error
+
+
+def bank_jobs(topics: Optional[List[str]] = None) -> List[Tuple[str, str, str, str]]:
+    jobs = []
+    seen = set()
+    for topic, levels in QUESTION_BANK.items():
+        if topics and topic not in topics:
+            continue
+        for difficulty, questions in levels.items():
+            for q in questions:
+                qid = references.question_id(q)
+                if qid not in seen:
+                    seen.add(qid)
+                    jobs.append((qid, topic, difficulty, q))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сгенерировать эталонные ответы на вопросы банка")
+    parser.add_argument("--out", default=settings.reference_answers_path)
+    parser.add_argument("--llm", default=settings.llm_backend, help="бэкенд: mistral | openai | sim | ...")
+    parser.add_argument("--workers", type=int, default=4, help="процессов в пуле")
+    parser.add_argument("--topics", default="", help="только эти темы через запятую")
+    parser.add_argument("--force", action="store_true", help="перегенерировать и уже готовые эталоны")
+    args = parser.parse_args()
+
+    backend = resolve_backend(args.llm)
+    if _make_backend(backend) is None:
+        parser.error(f"backend {backend!r} is not available")
+    topics = [t.strip() for t in args.topics.split(",") if t.strip()]
+    jobs = bank_jobs(topics)
+    fp = references.prompt_fingerprint()
+
+    # готовые эталоны с тем же промптом переносим как есть; с --force перегенерируются
+    # только выбранные темы, эталоны остальных тем остаются в файле
+    entries: Dict[str, Dict[str, Any]] = {}
+    old = references.ReferenceStore.open(args.out)
+    if old is not None:
+        if not old.stale:
+            for qid, item in old.items():
+                if not args.force or (topics and item["topic"] not in topics):
+                    entries[qid] = item
+        old.close()
+    meta = {job[0]: {"topic": job[1], "difficulty": job[2], "question": job[3]} for job in jobs}
+    todo = [job for job in jobs if job[0] not in entries]
+
+    t0 = time.perf_counter()
+    failed: List[Tuple[str, str]] = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=_init_worker, initargs=(backend,)) as pool:
+            for qid, answer, error in pool.map(_generate, todo, chunksize=4):
+                if answer is None:
+                    failed.append((meta[qid]["question"], error))
+                    continue
+                entries[qid] = dict(meta[qid], answer=answer)
+    elapsed = time.perf_counter() - t0
+
+    references.write_store(
+        args.out,
+        sorted(entries.items()),
+        meta={"prompt_fingerprint": fp, "backend": backend, "created": int(time.time())},
+    )
+    print(
+        f"references: {args.out} entries={len(entries)} generated={len(todo) - len(failed)} "
+        f"reused={len(jobs) - len(todo)} failed={len(failed)} workers={args.workers} elapsed={elapsed:.1f}s"
+    )
+    for question, error in failed[:10]:
+        print(f"  failed: {one_sentence(question)} ({error})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..agents.observer import ObserverAgent
+from ..config import settings
+from ..core.classifier import Example, export_examples, load_classifier
+from ..core.knowledge import shared_index
+from ..core.memory import Memory
+from ..core.prompts import prompt_kind
+from ..core.topics import QUESTION_BANK, extract_tech_stack
+from ..llm.base import BaseLLM
+from ..llm.metered import MeteredLLM
+from .personas import PERSONAS
+
+# Точность против задержки для каскада Observer (правила → классификатор →
+# Verifier → LLM Observer). Каждая конфигурация прогоняется по размеченному
+# набору (question, answer, kind); выводятся precision/recall по kind, вызовы
+# LLM и задержка на ход, а также Парето-фронт по macro-F1 и задержке.
+#   python -m interview.tools.eval_observer labeled.jsonl --llm standin
+#   python -m interview.tools.eval_observer 'logs/*.json' --llm replay:eval.jsonl
+#   python -m interview.tools.eval_observer --synthetic 600 --configs rules,full,full@80
+
+KINDS = ["STRONG", "NORMAL", "WEAK", "OFFTOPIC", "HALLUCINATION", "ROLE_REVERSAL", "NO_STACK", "REFUSAL"]
+
+PERSONA_KIND = {
+    "strong": "STRONG",
+    "weak": "WEAK",
+    "offtopic": "OFFTOPIC",
+    "hallucinating": "HALLUCINATION",
+    "role_reversal": "ROLE_REVERSAL",
+    "refusal": "REFUSAL",
+}
+
+
+class StandInLLM(BaseLLM):
+    """
+    Подставной LLM для оценки: знает правильный kind текущего примера (gold)
+    и с вероятностью 1 - accuracy отвечает другим. Задержка не спится, а
+    копится в virtual_ms — так сетка конфигураций считается за секунды.
+    """
+
+    def __init__(self, accuracy: float = 0.9, latency_ms: float = 400.0, seed: int = 7):
+        self.accuracy = accuracy
+        self.latency_ms = latency_ms
+        self.rng = random.Random(seed)
+        self.gold: Optional[str] = None
+        self.virtual_ms = 0.0
+
+    def generate(self, system: str, user: str, temperature: float = 0.3, json_mode: bool = False) -> str:
+        if self.latency_ms > 0:
+            self.virtual_ms += self.rng.lognormvariate(math.log(self.latency_ms), 0.4)
+        gold = self.gold or "NORMAL"
+        correct = self.rng.random() < self.accuracy
+        kind = gold if correct else self.rng.choice([k for k in KINDS if k != gold and k != "NO_STACK"])
+        stage = prompt_kind(system)
+        if stage == "verifier":
+            return json.dumps({
+                "kind": kind,
+                "confidence": self.rng.randint(70, 98) if correct else self.rng.randint(40, 90),
+                "reason": "stand-in",
+                "fact_check_notes": "",
+                "return_to_topic_text": "",
+                "need_followup": False,
+                "followup_question": "",
+            })
+        if stage == "observer":
+            return json.dumps({"kind": kind, "reason": "stand-in", "difficulty_action": "SAME"})
+        return "{}"
+
+
+def _make_llm(spec: str, seed: int, accuracy: float, latency_ms: float) -> Optional[BaseLLM]:
+    if spec == "standin":
+        return StandInLLM(accuracy=accuracy, latency_ms=latency_ms, seed=seed)
+    if spec.startswith("replay:"):
+        from ..llm.cassette import ReplayLLM
+        return ReplayLLM(spec.split(":", 1)[1], strict=False)
+    from ..session import _make_backend
+    llm = _make_backend(spec)
+    if llm is None:
+        raise SystemExit(f"backend {spec!r} is not available")
+    return llm
+
+
+def default_configs(verifier_levels=(60, 70, 80, 90)) -> Dict[str, Dict[str, Any]]:
+    # ключи — аргументы ObserverAgent плюс llm/classifier/knowledge: включать ли их вообще
+    configs: Dict[str, Dict[str, Any]] = {
+        "rules": {"llm": False},
+        "rules+classifier": {"llm": False, "classifier": True},
+    }
+    for level in verifier_levels:
+        configs[f"rules+verifier@{level}"] = {"use_observer_llm": False, "verifier_min_confidence": level}
+    for level in verifier_levels:
+        configs[f"full@{level}"] = {"verifier_min_confidence": level}
+    configs["full+overlap2"] = {"relevance_min_overlap": 2}
+    configs["full+classifier"] = {"classifier": True}
+    configs["llm-only"] = {"use_verifier": False}
+    configs["rules+knowledge"] = {"llm": False, "knowledge": True}
+    configs["full+knowledge"] = {"knowledge": True}
+    return configs
+
+
+def load_examples(paths: List[str]) -> List[Example]:
+    out: List[Example] = []
+    logs: List[str] = []
+    for p in paths:
+        if p.endswith(".jsonl"):
+            with open(p, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        item = json.loads(line)
+                        out.append(Example(item["question"], item["answer"], str(item["kind"]).upper()))
+        else:
+            logs.append(p)
+    if logs:
+        out.extend(export_examples(logs))
+    return out
+
+
+def synthetic_examples(n: int, seed: int) -> List[Example]:
+    rng = random.Random(seed)
+    questions = [q for levels in QUESTION_BANK.values() for qs in levels.values() for q in qs]
+    names = list(PERSONA_KIND)
+    out: List[Example] = []
+    for i in range(n):
+        q = rng.choice(questions)
+        persona = names[i % len(names)]
+        out.append(Example(q, PERSONAS[persona](q, rng), PERSONA_KIND[persona]))
+    return out
+
+
+def _memory(position: str, grade: str, question: str) -> Memory:
+    mem = Memory(
+        candidate_name="eval",
+        position=position,
+        grade=grade,
+        experience="",
+        tech_stack=extract_tech_stack(position),
+    )
+    mem.apply_defaults()
+    mem.last_question = question
+    return mem
+
+
+def evaluate(
+    name: str,
+    config: Dict[str, Any],
+    examples: List[Example],
+    llm: Optional[BaseLLM],
+    classifier: Any,
+    position: str,
+    grade: str,
+    lenient: bool,
+    standin: Optional[StandInLLM] = None,
+) -> Dict[str, Any]:
+    kwargs = {k: v for k, v in config.items() if k not in {"llm", "classifier", "knowledge"}}
+    metered = MeteredLLM(llm) if llm is not None and config.get("llm", True) else None
+    if config.get("classifier") and classifier is None:
+        return {"config": name, "skipped": "no classifier model"}
+    observer = ObserverAgent(
+        llm=metered,
+        classifier=classifier if config.get("classifier") else None,
+        classifier_min_confidence=settings.classifier_min_confidence,
+        knowledge=shared_index() if config.get("knowledge") else None,
+        **kwargs,
+    )
+    confusion: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    latencies: List[float] = []
+    for ex in examples:
+        gold = ex.kind
+        if standin is not None:
+            standin.gold = gold
+            virtual0 = standin.virtual_ms
+        t0 = time.perf_counter()
+        pred = observer.analyze(ex.answer, _memory(position, grade, ex.question)).kind
+        ms = (time.perf_counter() - t0) * 1000.0
+        if standin is not None:
+            ms += standin.virtual_ms - virtual0
+        latencies.append(ms)
+        if lenient:
+            gold, pred = ("STRONG" if gold == "NORMAL" else gold), ("STRONG" if pred == "NORMAL" else pred)
+        confusion[gold][pred] += 1
+
+    per_kind: Dict[str, Dict[str, Optional[float]]] = {}
+    for kind in sorted(confusion):
+        tp = confusion[kind][kind]
+        predicted = sum(row.get(kind, 0) for row in confusion.values())
+        actual = sum(confusion[kind].values())
+        p = tp / predicted if predicted else None
+        r = tp / actual if actual else None
+        f1 = 2 * p * r / (p + r) if p and r else 0.0
+        per_kind[kind] = {"precision": p, "recall": r, "f1": f1, "support": actual}
+
+    total = sum(sum(row.values()) for row in confusion.values())
+    correct = sum(confusion[k][k] for k in confusion)
+    q = statistics.quantiles(latencies, n=20) if len(latencies) >= 2 else latencies * 19
+    return {
+        "config": name,
+        "accuracy": correct / total if total else 0.0,
+        "macro_f1": statistics.mean(v["f1"] for v in per_kind.values()) if per_kind else 0.0,
+        "llm_calls_per_turn": (metered.calls / total) if metered is not None and total else 0.0,
+        "latency_ms_mean": statistics.mean(latencies) if latencies else 0.0,
+        "latency_ms_p95": q[18] if q else 0.0,
+        "per_kind": per_kind,
+    }
+
+
+def _objectives(r: Dict[str, Any]) -> Tuple[float, float, float]:
+    # все три — «больше лучше»
+    return r["macro_f1"], -r["latency_ms_mean"], -r["llm_calls_per_turn"]
+
+
+def pareto(results: List[Dict[str, Any]]) -> None:
+    # фронт по (macro-F1 ↑, задержка ↓, вызовы ↓): точку не доминирует ни одна другая
+    rows = [r for r in results if "skipped" not in r]
+    for r in rows:
+        mine = _objectives(r)
+        r["pareto"] = not any(
+            all(a >= b for a, b in zip(_objectives(o), mine)) and _objectives(o) != mine
+            for o in rows
+        )
+
+
+def _fmt(v: Optional[float]) -> str:
+    return "  -  " if v is None else f"{v:.2f}"
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    rows = sorted((r for r in results if "skipped" not in r), key=lambda r: r["latency_ms_mean"])
+    print(f"{'config':<22} {'acc':>5} {'macroF1':>7} {'calls/turn':>10} {'ms/turn':>8} {'p95_ms':>8} pareto")
+    for r in rows:
+        print(
+            f"{r['config']:<22} {r['accuracy']:>5.2f} {r['macro_f1']:>7.3f} {r['llm_calls_per_turn']:>10.2f} "
+            f"{r['latency_ms_mean']:>8.1f} {r['latency_ms_p95']:>8.1f} {'*' if r['pareto'] else ''}"
+        )
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['config']:<22} skipped: {r['skipped']}")
+
+    kinds = sorted({k for r in rows for k in r["per_kind"]})
+    print()
+    print("precision/recall by kind")
+    print(f"{'config':<22} " + " ".join(f"{k[:13]:>13}" for k in kinds))
+    for r in rows:
+        cells = []
+        for k in kinds:
+            v = r["per_kind"].get(k)
+            cells.append(f"{_fmt(v['precision']) + '/' + _fmt(v['recall']) if v else '-':>13}")
+        print(f"{r['config']:<22} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Точность против задержки для каскада Observer")
+    parser.add_argument("data", nargs="*", help="JSONL (question, answer, kind) или JSON-логи интервью")
+    parser.add_argument("--synthetic", type=int, default=0, help="добавить N примеров от синтетических персон")
+    parser.add_argument("--llm", default="standin",
+                        help="standin | replay:<cassette.jsonl> | sim | mistral | openai | dummy")
+    parser.add_argument("--record", default=None, help="записать вызовы LLM в кассету (для повтора через replay:)")
+    parser.add_argument("--standin-accuracy", type=float, default=0.9)
+    parser.add_argument("--standin-latency-ms", type=float, default=400.0)
+    parser.add_argument("--configs", default="", help="имена конфигураций через запятую (по умолчанию все)")
+    parser.add_argument("--position", default="Python backend developer")
+    parser.add_argument("--grade", default="middle")
+    parser.add_argument("--lenient", action="store_true", help="не различать STRONG и NORMAL")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="вывести результаты в JSON")
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    if args.synthetic:
+        examples.extend(synthetic_examples(args.synthetic, args.seed))
+    if not examples:
+        raise SystemExit("Нет размеченных примеров: передайте JSONL/логи или --synthetic N.")
+
+    configs = default_configs()
+    if args.configs:
+        wanted = [c.strip() for c in args.configs.split(",") if c.strip()]
+        unknown = [c for c in wanted if c not in configs]
+        if unknown:
+            raise SystemExit(f"unknown configs: {', '.join(unknown)}; known: {', '.join(configs)}")
+        configs = {c: configs[c] for c in wanted}
+
+    classifier = load_classifier(settings.classifier_path)
+    results: List[Dict[str, Any]] = []
+    for name, config in configs.items():
+        # у каждой конфигурации свой LLM с тем же seed: одинаковые условия для сравнения
+        base = _make_llm(args.llm, args.seed, args.standin_accuracy, args.standin_latency_ms)
+        llm = base
+        if args.record and llm is not None:
+            from ..llm.cassette import RecordingLLM
+            llm = RecordingLLM(llm, args.record, header={"eval_observer": name})
+        results.append(evaluate(
+            name, config, examples, llm, classifier, args.position, args.grade, args.lenient,
+            standin=base if isinstance(base, StandInLLM) else None,
+        ))
+    pareto(results)
+
+    if args.json:
+        print(json.dumps({"examples": len(examples), "results": results}, ensure_ascii=False, indent=2))
+        return
+    print(f"examples: {len(examples)}  llm: {args.llm}")
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import html
+import os
+import pstats
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Слияние профилей ходов (.collapsed от семплера и .pstats от cProfile)
+# в один folded-файл (формат flamegraph.pl / speedscope) и простой SVG.
+
+
+def _label(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def load_collapsed(path: str) -> Counter:
+    out: Counter = Counter()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            stack, _, n = line.rstrip("\n").rpartition(" ")
+            if stack and n.isdigit():
+                out[stack] += int(n)
+    return out
+
+
+def load_pstats(path: str, max_depth: int = 40) -> Counter:
+    # pstats хранит только рёбра caller→callee; стек восстанавливаем по
+    # самому «тяжёлому» вызывающему — приближение, но для flame graph хватает
+    stats = pstats.Stats(path).stats
+    out: Counter = Counter()
+    for func, (_, _, tottime, _, callers) in stats.items():
+        weight = int(tottime * 1_000_000)
+        if weight <= 0:
+            continue
+        chain = [_label(func)]
+        seen = {func}
+        cur = callers
+        while cur and len(chain) < max_depth:
+            parent = max(cur.items(), key=lambda kv: kv[1][3])[0]
+            if parent in seen:
+                break
+            seen.add(parent)
+            chain.append(_label(parent))
+            cur = stats.get(parent, (0, 0, 0, 0, {}))[4]
+        out[";".join(reversed(chain))] += weight
+    return out
+
+
+def _tree(folded: Counter) -> Dict:
+    root: Dict = {"name": "all", "value": 0, "children": {}}
+    for stack, n in folded.items():
+        root["value"] += n
+        node = root
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"name": frame, "value": 0, "children": {}})
+            node["value"] += n
+    return root
+
+
+def render_svg(folded: Counter, width: int = 1200, row: int = 16) -> str:
+    root = _tree(folded)
+    rects: List[str] = []
+    max_depth = [0]
+
+    def walk(node, x: float, depth: int):
+        max_depth[0] = max(max_depth[0], depth)
+        w = width * node["value"] / max(1, root["value"])
+        if w < 0.5:
+            return
+        hue = 20 + (hash(node["name"]) % 40)
+        title = html.escape(f"{node['name']} ({node['value']})")
+        label = html.escape(node["name"][: int(w / 7)]) if w > 30 else ""
+        rects.append(
+            f'<g><title>{title}</title><rect x="{x:.1f}" y="{{y{depth}}}" width="{w:.1f}" height="{row - 1}" '
+            f'fill="hsl({hue},80%,60%)"/><text x="{x + 3:.1f}" y="{{t{depth}}}" font-size="11">{label}</text></g>'
+        )
+        cx = x
+        for child in sorted(node["children"].values(), key=lambda c: c["name"]):
+            walk(child, cx, depth + 1)
+            cx += width * child["value"] / max(1, root["value"])
+
+    walk(root, 0.0, 0)
+    height = (max_depth[0] + 1) * row
+    body = "\n".join(rects)
+    for d in range(max_depth[0] + 1):
+        y = height - (d + 1) * row
+        body = body.replace(f"{{y{d}}}", str(y)).replace(f"{{t{d}}}", str(y + row - 4))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace">\n'
+        f"{body}\n</svg>\n"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Слить профили ходов в flame graph")
+    parser.add_argument("inputs", nargs="+", help="файлы или glob: *.collapsed, *.pstats, папки")
+    parser.add_argument("--out", default="flamegraph.folded", help="итоговый folded-файл")
+    parser.add_argument("--svg", default=None, help="дополнительно нарисовать SVG")
+    args = parser.parse_args()
+
+    files: List[str] = []
+    for p in args.inputs:
+        if os.path.isdir(p):
+            files += glob.glob(os.path.join(p, "*.collapsed")) + glob.glob(os.path.join(p, "*.pstats"))
+        else:
+            files += glob.glob(p)
+
+    merged: Counter = Counter()
+    for path in sorted(set(files)):
+        merged.update(load_pstats(path) if path.endswith(".pstats") else load_collapsed(path))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        for stack, n in merged.most_common():
+            f.write(f"{stack} {n}\n")
+    print(f"merged {len(files)} profiles, {len(merged)} stacks -> {args.out}")
+
+    if args.svg:
+        with open(args.svg, "w", encoding="utf-8") as f:
+            f.write(render_svg(merged))
+        print(f"svg -> {args.svg}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ..llm.simulator import SimConfig, SimulatedLLM, SimulatedLLMError, SimulatedLLMTimeout
+
+# Локальная заглушка Mistral chat API поверх SimulatedLLM.
+# Клиент: MISTRAL_SERVER_URL=http://127.0.0.1:8089 MISTRAL_API_KEY=sim
+
+
+def _split_messages(messages):
+    system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = "\n".join(m.get("content", "") for m in messages if m.get("role") != "system")
+    return system, user
+
+
+def make_handler(llm: SimulatedLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, code: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"message": "not found"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                req = json.loads(self.rfile.read(length) or b"{}")
+            except Exception:
+                self._send(400, {"message": "bad json"})
+                return
+
+            system, user = _split_messages(req.get("messages") or [])
+            try:
+                content = llm.generate(system, user, temperature=float(req.get("temperature") or 0.3))
+            except SimulatedLLMTimeout:
+                self._send(504, {"message": "simulated timeout"})
+                return
+            except SimulatedLLMError as e:
+                self._send(503, {"message": str(e)})
+                return
+
+            prompt_tokens = (len(system) + len(user)) // 4
+            completion_tokens = len(content) // 4
+            self._send(200, {
+                "id": uuid.uuid4().hex,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": req.get("model") or "sim",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная заглушка Mistral chat API с имитацией задержек и сбоев")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--config", default=None, help="JSON-файл SimConfig (иначе SIM_LLM_CONFIG)")
+    args = parser.parse_args()
+
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = SimConfig.from_dict(json.load(f))
+    else:
+        config = SimConfig.from_env()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(SimulatedLLM(config)))
+    print(f"LLM stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
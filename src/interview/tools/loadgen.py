@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from ..core.structured import parse_stats
+from ..llm.metered import MeteredLLM
+from ..session import InterviewSession, make_llm, shared_shadow
+from .personas import PERSONAS, parse_mix, pick
+
+POSITIONS = [
+    ("Backend", "Junior", "1 год Python, SQL"),
+    ("Backend", "Middle", "3 года Go, Postgres, Docker"),
+    ("Backend", "Senior", "6 лет Go, Kubernetes, Linux"),
+    ("Data", "Middle", "2 года Python, SQL"),
+]
+
+
+@dataclass
+class Stats:
+    turn_latencies: List[float] = field(default_factory=list)
+    llm_calls: int = 0
+    turns: int = 0
+    errors: int = 0
+    sessions: int = 0
+    finished_early: int = 0  # интервью, завершённые сервером до /stop (досрочная остановка)
+    by_persona: Dict[str, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = min(len(s) - 1, max(0, int(round(q * (len(s) - 1)))))
+    return s[k]
+
+
+def _asked(reply: str) -> str:
+    # вопрос интервьюера — последняя строка ответа
+    lines = [x for x in (reply or "").splitlines() if x.strip()]
+    return lines[-1] if lines else ""
+
+
+class _LocalClient:
+    def __init__(self, idx: int, session_kwargs: Dict[str, object]):
+        llm, llm_name = make_llm(tenant=f"load-{idx % 4}")
+        self.metered = MeteredLLM(llm)
+        self.session = InterviewSession(llm=self.metered, llm_name=llm_name, **session_kwargs)
+
+    def start(self) -> str:
+        return self.session.first_message()
+
+    def step(self, message: str) -> str:
+        return self.session.step(message)
+
+    @property
+    def llm_calls(self) -> int:
+        return self.metered.calls
+
+
+class _RemoteClient:
+    def __init__(self, dispatcher, idx: int, session_kwargs: Dict[str, object]):
+        self.dispatcher = dispatcher
+        self.kwargs = dict(session_kwargs, tenant=f"load-{idx % 4}")
+        self.session_id = ""
+        self.llm_calls = 0
+
+    def start(self) -> str:
+        self.session_id, reply = self.dispatcher.create(**self.kwargs)
+        return reply
+
+    def step(self, message: str) -> str:
+        # зависший воркер не вешает прогон: по request_timeout — TimeoutError, ход считается ошибкой
+        reply, info = self.dispatcher.wait(self.dispatcher.submit("step", self.session_id, {"message": message}))
+        self.llm_calls = info.get("llm_calls", self.llm_calls)
+        return reply
+
+
+def run_one(idx: int, turns: int, mix: Dict[str, float], seed: int, log_dir: str, stats: Stats, dispatcher=None):
+    rng = random.Random(seed + idx)
+    persona = pick(mix, rng)
+    position, grade, experience = rng.choice(POSITIONS)
+    session_kwargs = dict(
+        position=position,
+        grade=grade,
+        experience=experience,
+        candidate_name=f"Кандидат {idx}",
+        scenario_id=idx,
+        log_path=os.path.join(log_dir, f"interview_log_{idx}.json"),
+    )
+
+    latencies: List[float] = []
+    errors = 0
+    finished = False
+    client = None
+    try:
+        client = _RemoteClient(dispatcher, idx, session_kwargs) if dispatcher else _LocalClient(idx, session_kwargs)
+        question = _asked(client.start())
+
+        for _ in range(turns):
+            # персона задаёт основной стиль, но кандидаты не идеально последовательны
+            style = persona if rng.random() < 0.7 else pick(mix, rng)
+            answer = PERSONAS[style](question, rng)
+            t0 = time.perf_counter()
+            try:
+                reply = client.step(answer)
+            except Exception:
+                errors += 1
+                continue
+            finally:
+                latencies.append(time.perf_counter() - t0)
+            if reply.startswith("## A) Decision"):
+                finished = True
+                break
+            question = _asked(reply)
+
+        if not finished:
+            t0 = time.perf_counter()
+            try:
+                client.step("/stop")
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+    except Exception:
+        errors += 1
+
+    with stats.lock:
+        stats.sessions += 1
+        stats.finished_early += finished
+        stats.turns += len(latencies)
+        stats.turn_latencies.extend(latencies)
+        stats.llm_calls += client.llm_calls if client else 0
+        stats.errors += errors
+        stats.by_persona[persona] = stats.by_persona.get(persona, 0) + 1
+
+
+def report(stats: Stats, wall: float) -> Dict[str, object]:
+    lat = stats.turn_latencies
+    out: Dict[str, object] = {
+        "sessions": stats.sessions,
+        "turns": stats.turns,
+        "wall_s": round(wall, 2),
+        "throughput_turns_per_s": round(stats.turns / wall, 2) if wall else 0.0,
+        "turn_latency_ms": {
+            "p50": round(1000 * _percentile(lat, 0.50), 1),
+            "p95": round(1000 * _percentile(lat, 0.95), 1),
+            "p99": round(1000 * _percentile(lat, 0.99), 1),
+            "max": round(1000 * max(lat), 1) if lat else 0.0,
+        },
+        "finished_early": stats.finished_early,
+        "llm_calls_per_turn": round(stats.llm_calls / stats.turns, 2) if stats.turns else 0.0,
+        "error_rate": round(stats.errors / stats.turns, 4) if stats.turns else 0.0,
+        "personas": stats.by_persona,
+        "structured_output": parse_stats(),
+    }
+    shadow = shared_shadow()
+    if shadow is not None:
+        # теневые вызовы дорабатывают в фоне — дожидаемся их для сводки
+        shadow.drain()
+        out["shadow"] = shadow.stats()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный генератор синтетических интервью")
+    parser.add_argument("--sessions", type=int, default=50, help="сколько интервью провести")
+    parser.add_argument("--concurrency", type=int, default=10, help="сколько интервью одновременно")
+    parser.add_argument("--rate", type=float, default=5.0, help="целевая частота старта интервью, в секунду")
+    parser.add_argument("--turns", type=int, default=6, help="ответов кандидата на интервью (без /stop)")
+    parser.add_argument("--mix", default="", help="смесь персон, например strong=0.5,weak=0.3,offtopic=0.2")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-dir", default=None, help="куда писать логи интервью (по умолчанию временная папка)")
+    parser.add_argument("--workers", type=int, default=0, help="прогнать через N процессов-воркеров (interview.workers)")
+    parser.add_argument("--request-timeout", type=float, default=120.0, help="сколько ждать ответа воркера на ход, с")
+    parser.add_argument("--json", action="store_true", help="вывести отчёт в JSON")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix="interview-load-")
+    os.makedirs(log_dir, exist_ok=True)
+
+    dispatcher = None
+    if args.workers > 0:
+        from ..workers import Dispatcher
+        dispatcher = Dispatcher(args.workers, request_timeout_s=args.request_timeout)
+
+    stats = Stats()
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+            for i in range(args.sessions):
+                pool.submit(run_one, i, args.turns, mix, args.seed, log_dir, stats, dispatcher)
+                # пуассоновский поток прибытий
+                if args.rate > 0:
+                    time.sleep(rng.expovariate(args.rate))
+    finally:
+        wall = time.perf_counter() - started
+        if dispatcher:
+            dispatcher.close()
+
+    rep = report(stats, wall)
+    if args.json:
+        print(json.dumps(rep, ensure_ascii=False, indent=2))
+        return
+
+    lat = rep["turn_latency_ms"]
+    print(f"sessions={rep['sessions']} turns={rep['turns']} wall={rep['wall_s']}s")
+    print(f"throughput: {rep['throughput_turns_per_s']} turns/s")
+    print(f"turn latency ms: p50={lat['p50']} p95={lat['p95']} p99={lat['p99']} max={lat['max']}")
+    print(f"llm calls/turn: {rep['llm_calls_per_turn']}  error rate: {rep['error_rate']}")
+    print(f"personas: {rep['personas']}  finished early: {rep['finished_early']}")
+    for name, st in rep["structured_output"].items():
+        print(f"parse {name}: total={st.get('total', 0)} repaired={st.get('repaired', 0)} failure_rate={st['failure_rate']}")
+    if "shadow" in rep:
+        sh = rep["shadow"]
+        print(
+            f"shadow {sh['candidate']}: mirrored={sh['mirrored']} compared={sh['compared']} "
+            f"agreed={sh['agreed']} errors={sh['errors']} dropped={sh['dropped']}"
+        )
+    print(f"logs: {log_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import random
+import re
+from typing import Callable, Dict, List
+
+# Библиотека синтетических кандидатов. Каждая персона по вопросу интервьюера
+# выдаёт ответ, характерный для одного из kind, которые различает ObserverAgent.
+
+_WORD_RE = re.compile(r"[A-Za-zА-Яа-яЁё0-9_/+-]{4,}")
+
+
+def _key_terms(question: str, rng: random.Random, n: int = 2) -> List[str]:
+    words = [w for w in _WORD_RE.findall(question or "") if not w.istitle() or len(w) > 5]
+    rng.shuffle(words)
+    return words[:n] or ["это"]
+
+
+def strong(question: str, rng: random.Random) -> str:
+    a, *rest = _key_terms(question, rng)
+    b = rest[0] if rest else a
+    return rng.choice([
+        f"{a} — это механизм, который отличается от {b} тем, что работает изолированно; например, в проде я использовал его для фоновых задач, потому что так проще масштабировать.",
+        f"Если коротко, {a} решает задачу разделения ответственности. Затем важно учитывать {b}: например, при высокой нагрузке это влияет на latency, в итоге мы добавили метрики и лимиты.",
+    ])
+
+
+def weak(question: str, rng: random.Random) -> str:
+    a = _key_terms(question, rng, 1)[0]
+    return rng.choice([
+        f"Не уверен, про {a} помню только в общих чертах.",
+        f"Честно, не знаю точно, как работает {a}.",
+        "Сложно сказать, не сталкивался.",
+    ])
+
+
+def offtopic(question: str, rng: random.Random) -> str:
+    return rng.choice([
+        "Кстати, какая сегодня погода? У меня кот опять разбросал вещи.",
+        "Давайте лучше про фильм поговорим, вчера смотрел отличный сериал.",
+        "Расскажу анекдот про собаку, вам понравится.",
+    ])
+
+
+def hallucinating(question: str, rng: random.Random) -> str:
+    a = _key_terms(question, rng, 1)[0]
+    return rng.choice([
+        f"{a} в следующей версии полностью удалят, это уже официально объявили, поэтому учить его бессмысленно.",
+        "В Python 4.0 уберут циклы for, вместо них будут только goroutine.",
+        "HTTP работает поверх UDP, а TCP там вообще не используется с 2010 года.",
+    ])
+
+
+def role_reversal(question: str, rng: random.Random) -> str:
+    return rng.choice([
+        "А какая у вас зарплата для этой позиции?",
+        "Сначала расскажите, что за проект и какая команда?",
+        "Какие условия и бенефиты в компании?",
+    ])
+
+
+def refusal(question: str, rng: random.Random) -> str:
+    return rng.choice(["Не хочу отвечать на это.", "Не буду, не интересно.", "Отстань, не надо."])
+
+
+Persona = Callable[[str, random.Random], str]
+
+PERSONAS: Dict[str, Persona] = {
+    "strong": strong,
+    "weak": weak,
+    "offtopic": offtopic,
+    "hallucinating": hallucinating,
+    "role_reversal": role_reversal,
+    "refusal": refusal,
+}
+
+# реалистичная смесь по умолчанию: большинство отвечает по делу
+DEFAULT_MIX: Dict[str, float] = {
+    "strong": 0.45,
+    "weak": 0.25,
+    "offtopic": 0.08,
+    "hallucinating": 0.08,
+    "role_reversal": 0.07,
+    "refusal": 0.07,
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    # "strong=0.5,weak=0.3,offtopic=0.2"
+    mix: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, _, w = part.partition("=")
+            name = name.strip()
+            if name not in PERSONAS:
+                raise ValueError(f"unknown persona: {name}")
+            mix[name] = float(w)
+    return mix or dict(DEFAULT_MIX)
+
+
+def pick(mix: Dict[str, float], rng: random.Random) -> str:
+    names = list(mix)
+    return rng.choices(names, weights=[mix[n] for n in names], k=1)[0]
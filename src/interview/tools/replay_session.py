@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from ..llm.cassette import ReplayLLM
+from ..session import InterviewSession
+
+# Офлайн-воспроизведение интервью по кассете LLM и логу:
+# реплики кандидата берутся из лога, ответы LLM — из кассеты.
+#   python -m interview.tools.replay_session cassettes/<session_id>.jsonl --log interview_log_7.json
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизвести интервью по кассете LLM")
+    parser.add_argument("cassette", help="JSONL-кассета, записанная с LLM_CASSETTE_DIR")
+    parser.add_argument("--log", required=True, help="JSON-лог интервью (реплики кандидата)")
+    parser.add_argument("--latency", action="store_true", help="воспроизводить записанные задержки")
+    parser.add_argument("--loose", action="store_true", help="повторять последний ответ при нехватке записей")
+    parser.add_argument("--out", default=None, help="куда сохранить лог воспроизведения")
+    args = parser.parse_args()
+
+    llm = ReplayLLM(args.cassette, replay_latency=args.latency, strict=not args.loose)
+    h = llm.header
+    with open(args.log, "r", encoding="utf-8") as f:
+        original = json.load(f)
+
+    out = args.out or os.path.join(tempfile.mkdtemp(prefix="interview-replay-"), "replay.json")
+    session = InterviewSession(
+        position=h.get("position", ""),
+        grade=h.get("grade", ""),
+        experience=h.get("experience", ""),
+        candidate_name=h.get("candidate_name") or original.get("participant_name", ""),
+        scenario_id=h.get("scenario_id", 0),
+        session_id=h.get("session_id"),
+        llm=llm,
+        llm_name=h.get("llm_name", "replay"),
+        log_path=out,
+    )
+
+    t0 = time.perf_counter()
+    session.first_message()
+    finished = False
+    for t in original.get("turns", []):
+        reply = session.step(t.get("user_message") or "")
+        if reply.startswith("## A) Decision") or session.log.final_feedback:
+            finished = True
+            break
+    if not finished:
+        session.step("/stop")
+    elapsed = time.perf_counter() - t0
+
+    replayed = session.log.to_public_dict()
+    diverged = 0
+    for a, b in zip(original.get("turns", []), replayed["turns"]):
+        for field in ("agent_visible_message", "internal_thoughts"):
+            if a.get(field) != b.get(field):
+                diverged += 1
+                print(f"turn {a.get('turn_id')}: {field} differs")
+                print(f"  recorded: {str(a.get(field))[:200]!r}")
+                print(f"  replayed: {str(b.get(field))[:200]!r}")
+                break
+    same_feedback = original.get("final_feedback", "") == replayed["final_feedback"]
+
+    print(f"turns: {len(replayed['turns'])}  diverged: {diverged}  final_feedback same: {same_feedback}")
+    print(f"llm served: {llm.served}  misses: {llm.misses}  unused: {llm.remaining()}")
+    print(f"elapsed: {elapsed:.2f}s  log: {out}")
+    raise SystemExit(0 if diverged == 0 and llm.misses == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+from ..config import settings
+from .loadgen import _percentile
+
+# Сводка теневого режима (llm/shadow.py): согласие кандидата с основным
+# бэкендом по вердиктам и разница задержек, по кандидату и типу запроса.
+#   python -m interview.tools.shadow_report shadow/shadow.jsonl
+
+
+def load_records(paths: List[str]) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    out.append(json.loads(line))
+    return out
+
+
+def summarize(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    groups: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    for r in records:
+        groups[(r.get("candidate", "?"), r.get("kind", "?"))].append(r)
+
+    rows = []
+    for (candidate, kind), rs in sorted(groups.items()):
+        scored = [r for r in rs if r.get("agree") is not None]
+        items = sum(r.get("items", 0) for r in scored)
+        matched = sum(r["agree"] * r.get("items", 0) for r in scored)
+        flips: Counter = Counter()
+        for r in scored:
+            for p, s in zip(r.get("primary") or [], r.get("shadow") or []):
+                if p != s:
+                    flips[f"{p}->{s}"] += 1
+        primary_ms = [r["primary_ms"] for r in rs]
+        shadow_ms = [r["shadow_ms"] for r in rs if not r.get("error")]
+        diff_ms = [r["latency_diff_ms"] for r in rs if not r.get("error")]
+        rows.append({
+            "candidate": candidate,
+            "kind": kind,
+            "calls": len(rs),
+            "verdicts": items,
+            "agreement": round(matched / items, 4) if items else None,
+            "shadow_errors": sum(1 for r in rs if r.get("error")),
+            "shadow_unparsed": sum(1 for r in rs if not r.get("error") and not r.get("shadow_parsed")),
+            "dropped": max((r.get("dropped_total", 0) for r in rs), default=0),
+            "primary_ms": {"p50": _percentile(primary_ms, 0.5), "p95": _percentile(primary_ms, 0.95)},
+            "shadow_ms": {"p50": _percentile(shadow_ms, 0.5), "p95": _percentile(shadow_ms, 0.95)},
+            "diff_ms": {"p50": _percentile(diff_ms, 0.5), "p95": _percentile(diff_ms, 0.95)},
+            "flips": dict(flips.most_common(5)),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сводка теневого режима: согласие и задержки кандидата")
+    parser.add_argument("reports", nargs="*", help="JSONL теневого режима (можно glob)")
+    parser.add_argument("--json", action="store_true", help="вывести сводку в JSON")
+    args = parser.parse_args()
+
+    files: List[str] = []
+    for p in args.reports or [settings.shadow_report]:
+        files.extend(sorted(glob.glob(p)) if any(ch in p for ch in "*?[") else [p])
+    rows = summarize(load_records(files))
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    if not rows:
+        print("нет записей")
+        return
+
+    print(
+        f"{'candidate':<24} {'kind':<9} {'calls':>6} {'agree':>6} {'err':>4} {'unparsed':>8} {'dropped':>7} "
+        f"{'prim_p50':>8} {'shad_p50':>8} {'diff_p50':>8} {'diff_p95':>8}"
+    )
+    for r in rows:
+        agree = f"{r['agreement']:.3f}" if r["agreement"] is not None else "-"
+        print(
+            f"{r['candidate']:<24} {r['kind']:<9} {r['calls']:>6} {agree:>6} {r['shadow_errors']:>4} "
+            f"{r['shadow_unparsed']:>8} {r['dropped']:>7} {r['primary_ms']['p50']:>8.1f} {r['shadow_ms']['p50']:>8.1f} "
+            f"{r['diff_ms']['p50']:>8.1f} {r['diff_ms']['p95']:>8.1f}"
+        )
+        if r["flips"]:
+            print("    расхождения: " + ", ".join(f"{k} x{v}" for k, v in r["flips"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import argparse
+import json
+from collections import Counter
+
+from ..config import settings
+from ..core.classifier import MIN_CALIBRATION_EXAMPLES, export_examples, train
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обучить локальный классификатор ответов по логам интервью")
+    parser.add_argument("logs", nargs="+", help="JSON-логи интервью (можно glob)")
+    parser.add_argument("--out", default=settings.classifier_path, help="куда сохранить модель")
+    parser.add_argument("--export", default=None, help="дополнительно выгрузить примеры в JSONL")
+    parser.add_argument("--epochs", type=int, default=30)
+    args = parser.parse_args()
+
+    examples = export_examples(args.logs)
+    if not examples:
+        raise SystemExit("В логах не нашлось размеченных ходов.")
+
+    if args.export:
+        with open(args.export, "w", encoding="utf-8") as f:
+            for e in examples:
+                f.write(json.dumps(e.__dict__, ensure_ascii=False) + "\n")
+
+    model = train(examples, epochs=args.epochs)
+    if not model.n_val:
+        raise SystemExit(
+            f"Примеров {len(examples)} — меньше {MIN_CALIBRATION_EXAMPLES}, отложенной выборки для калибровки нет; "
+            "модель не сохранена."
+        )
+    model.save(args.out)
+
+    print(f"examples: {len(examples)} {dict(Counter(e.kind for e in examples))}")
+    print(f"classes: {model.classes} temperature={model.temperature} (train={model.n_train} val={model.n_val})")
+    print(f"saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import gc
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Tuple
+
+# Режим развёртывания: диспетчер + N процессов-воркеров.
+# Сессия «прилипает» к воркеру по session_id, поэтому её состояние живёт
+# в одном процессе и не сериализуется между ходами. Неизменяемые данные
+# (банк вопросов, матчер словаря, промпты) прогреваются в родителе и
+# замораживаются gc.freeze() до fork — воркеры делят эти страницы
+# copy-on-write вместо собственных копий. Сгенерированные LLM вопросы
+# складываются в общий пул через менеджер.
+
+
+class WorkerDied(RuntimeError):
+    """Процесс-воркер завершился (или очередь ответов закрыта), не ответив на запрос."""
+
+
+def _warm_shared_data():
+    from .core import topics
+    from . import session  # noqa: F401  импорт тянет агентов, промпты и бэкенды
+    topics._vocab_matcher()
+
+
+def _worker_main(idx: int, inbox, outbox, shared_pool):
+    from .llm.metered import MeteredLLM
+    from .session import InterviewSession, make_llm
+
+    sessions: Dict[str, Tuple[InterviewSession, MeteredLLM]] = {}
+    while True:
+        msg = inbox.get()
+        if msg is None:
+            break
+        req_id, op, session_id, payload = msg
+        t0 = time.perf_counter()
+        try:
+            if op == "create":
+                llm, llm_name = make_llm(payload.pop("tenant", "default"))
+                metered = MeteredLLM(llm)
+                s = InterviewSession(session_id=session_id, llm=metered, llm_name=llm_name, **payload)
+                s.mem.shared_pool = shared_pool
+                sessions[session_id] = (s, metered)
+                result = s.first_message()
+            elif op == "step":
+                s, metered = sessions[session_id]
+                result = s.step(payload["message"])
+            elif op == "status":
+                result = sessions[session_id][0].status()
+            elif op == "close":
+                sessions.pop(session_id, None)
+                result = None
+            else:
+                raise ValueError(f"unknown op: {op}")
+            calls = sessions[session_id][1].calls if session_id in sessions else 0
+            if op == "step" and sessions[session_id][0].log.final_feedback is not None:
+                sessions.pop(session_id, None)  # /stop — сессия завершена
+            outbox.put((req_id, True, result, {"worker": idx, "cpu_s": time.perf_counter() - t0, "llm_calls": calls}))
+        except Exception as e:
+            outbox.put((req_id, False, f"{type(e).__name__}: {e}", {"worker": idx}))
+
+
+class Dispatcher:
+    def __init__(self, workers: int = 0, request_timeout_s: float = 120.0):
+        self.n = workers or os.cpu_count() or 1
+        self.request_timeout = request_timeout_s
+        ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+
+        _warm_shared_data()
+        self._manager = ctx.Manager()
+        self.shared_pool = self._manager.dict()
+
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+
+        self._outbox = ctx.Queue()
+        self._inboxes = [ctx.Queue() for _ in range(self.n)]
+        self._procs = [
+            ctx.Process(target=_worker_main, args=(i, self._inboxes[i], self._outbox, self.shared_pool), daemon=True)
+            for i in range(self.n)
+        ]
+        for p in self._procs:
+            p.start()
+        if hasattr(gc, "unfreeze"):
+            gc.unfreeze()
+
+        self._seq = itertools.count()
+        self._pending: Dict[int, Tuple[Future, int]] = {}  # req_id -> (future, воркер)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+    def worker_for(self, session_id: str) -> int:
+        return zlib.crc32(session_id.encode("utf-8")) % self.n
+
+    def _fail_pending(self, worker: Optional[int], reason: str) -> None:
+        # worker=None — все ожидающие запросы (очередь ответов закрыта)
+        with self._lock:
+            dead = [
+                (req_id, fut) for req_id, (fut, w) in self._pending.items()
+                if worker is None or w == worker
+            ]
+            for req_id, _ in dead:
+                del self._pending[req_id]
+        for _, fut in dead:
+            if not fut.done():
+                fut.set_exception(WorkerDied(reason))
+
+    def _check_workers(self) -> None:
+        for i, p in enumerate(self._procs):
+            if not p.is_alive():
+                self._fail_pending(i, f"worker {i} exited with code {p.exitcode}")
+
+    def _read_results(self):
+        checked = time.monotonic()
+        while not self._closed:
+            # живость воркеров проверяем и под нагрузкой, а не только когда очередь пуста
+            if time.monotonic() - checked >= 0.2:
+                self._check_workers()
+                checked = time.monotonic()
+            try:
+                req_id, ok, result, info = self._outbox.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError) as e:
+                self._fail_pending(None, f"result queue closed: {type(e).__name__}")
+                break
+            with self._lock:
+                entry = self._pending.pop(req_id, None)
+            if entry is None:
+                continue
+            fut = entry[0]
+            if ok:
+                fut.set_result((result, info))
+            else:
+                fut.set_exception(RuntimeError(result))
+        if self._closed:
+            self._fail_pending(None, "dispatcher closed")
+
+    def submit(self, op: str, session_id: str, payload: Optional[Dict[str, Any]] = None) -> Future:
+        fut: Future = Future()
+        worker = self.worker_for(session_id)
+        if self._closed:
+            fut.set_exception(WorkerDied("dispatcher closed"))
+            return fut
+        if not self._procs[worker].is_alive():
+            fut.set_exception(WorkerDied(f"worker {worker} exited with code {self._procs[worker].exitcode}"))
+            return fut
+        req_id = next(self._seq)
+        with self._lock:
+            self._pending[req_id] = (fut, worker)
+        self._inboxes[worker].put((req_id, op, session_id, dict(payload or {})))
+        fut.req_id = req_id
+        return fut
+
+    def wait(self, fut: Future) -> Tuple[Any, Dict[str, Any]]:
+        # (результат, info) запроса из submit, не дольше request_timeout
+        try:
+            return fut.result(timeout=self.request_timeout)
+        except FutureTimeout:
+            # ответ уже не ждём; если он всё же придёт, reader его отбросит
+            with self._lock:
+                self._pending.pop(getattr(fut, "req_id", None), None)
+            raise
+
+    def _call(self, op: str, session_id: str, payload: Optional[Dict[str, Any]] = None) -> Any:
+        result, _ = self.wait(self.submit(op, session_id, payload))
+        return result
+
+    def create(self, session_id: Optional[str] = None, **session_kwargs) -> Tuple[str, str]:
+        session_id = session_id or uuid.uuid4().hex[:12]
+        return session_id, self._call("create", session_id, session_kwargs)
+
+    def step(self, session_id: str, message: str) -> str:
+        return self._call("step", session_id, {"message": message})
+
+    def status(self, session_id: str) -> str:
+        return self._call("status", session_id)
+
+    def close(self):
+        if self._closed:
+            return
+        for q in self._inboxes:
+            q.put(None)
+        for p in self._procs:
+            p.join(timeout=5)
+        self._closed = True
+        self._reader.join(timeout=1)
+        self._manager.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()